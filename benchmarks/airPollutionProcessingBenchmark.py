@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Air Pollution Processing Benchmark
+#
+# Compares `AirPollutionData.processAirPollution` (one dictionary per entry) with the columnar `processAirPollutionColumns` on synthetic hourly "list" payloads of 10k, 100k and 1M entries, and fails if the list view of the columnar result differs from the original output.
+#
+# - "columnar" is the time to build the arrays and compute the AQI descriptions and timestamps; "columnar + toList" also builds every dictionary through the list view.
+# - Usage: `python benchmarks/airPollutionProcessingBenchmark.py [--sizes 10000 100000 1000000] [--repeat N]`
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherForcastingProject import AirPollutionData
+
+componentNames: tuple = ("co", "no", "no2", "o3", "so2", "pm2_5", "pm10", "nh3")
+
+
+def buildAirPollutionList(size: int, seed: int = 0) -> list:
+    generator: random.Random = random.Random(seed)
+    start: int = 1_600_000_000 - 1_600_000_000 % 3600
+    return [
+        {
+            "main": {"aqi": generator.randint(1, 5)},
+            "components": {name: round(generator.uniform(0, 300), 2) for name in componentNames},
+            "dt": start + index * 3600
+        }
+        for index in range(size)
+    ]
+
+
+def timeCall(function, size: int, repeat: int) -> float:
+    timings: list = []
+    for _ in range(repeat):
+        airPollutionList: list = buildAirPollutionList(size)
+        start: float = time.perf_counter()
+        function(airPollutionList)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the dictionary and columnar air pollution processing paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    airPollution: AirPollutionData = AirPollutionData(35.69, 51.39)
+
+    def columnar(airPollutionList: list) -> None:
+        columns = airPollution.processAirPollutionColumns(airPollutionList)
+        columns.airQualityDescription
+        columns.dateTime
+
+    sample: list = buildAirPollutionList(2000, seed=1)
+    if airPollution.processAirPollutionColumns(sample).toList() != airPollution.processAirPollution(buildAirPollutionList(2000, seed=1)):
+        sys.exit("The columnar list view differs from processAirPollution")
+
+    print(f"{'entries':>10} {'dictionaries':>14} {'columnar':>10} {'columnar + toList':>18} {'speedup':>8}")
+    for size in arguments.sizes:
+        dictionaries: float = timeCall(airPollution.processAirPollution, size, arguments.repeat)
+        columns: float = timeCall(columnar, size, arguments.repeat)
+        listView: float = timeCall(lambda entries: airPollution.processAirPollutionColumns(entries).toList(), size, arguments.repeat)
+        print(
+            f"{size:>10} {dictionaries * 1000:>11.1f} ms {columns * 1000:>7.1f} ms {listView * 1000:>15.1f} ms"
+            f" {dictionaries / columns:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Async Report Benchmark
+#
+# Compares a full per-location report fetched serially with the sync classes against the same report gathered concurrently by `weatherAsync.fetchLocationReport`, both against `MockOpenWeatherServer` with injected latency per endpoint.
+#
+# - The async report should take about as long as the slowest single endpoint, not the sum of all of them. The benchmark fails if it takes more than `--tolerance` times the slowest endpoint latency.
+# - Usage: `python benchmarks/asyncReportBenchmark.py [--runs N] [--tolerance X]`
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherServer
+from weatherAsync import AsyncHttpTransport, fetchLocationReport
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    HourlyWeatherForecast,
+)
+from weatherTransport import HttpTransport
+
+endpointLatency: dict = {
+    "data/2.5/air_pollution": 0.05,
+    "data/2.5/air_pollution/forecast": 0.08,
+    "data/2.5/air_pollution/history": 0.15,
+    "data/2.5/weather": 0.05,
+    "data/2.5/forecast/hourly": 0.10,
+    "data/2.5/forecast/daily": 0.06,
+    "data/2.5/forecast": 0.12,
+}
+latitude: float = 35.6892
+longitude: float = 51.389
+
+
+def serialReport(transport: HttpTransport, startTimestamp: int, stopTimestamp: int) -> dict:
+    return {
+        "currentAirPollution": AirPollutionData(latitude, longitude, transport).currentAirPollution(),
+        "airPollutionForecast": AirPollutionForecast(latitude, longitude, transport).airPollutionForecast(),
+        "airPollutionHistory": AirPollutionHistory(
+            latitude, longitude, startTimestamp, stopTimestamp, transport
+        ).airPollutionHistory(),
+        "currentWeather": CurrentWeather(latitude, longitude, transport).currentWeather(),
+        "hourlyForecast": HourlyWeatherForecast(latitude, longitude, transport).hourlyForecast(),
+        "dailyForecast": DailyWeatherForecast(latitude, longitude, transport).dailyForecast(),
+        "fiveDaysThreeHoursForecast": FiveDaysThreeHoursWeatherForecast(latitude, longitude, transport).getForecastedData(),
+    }
+
+
+async def concurrentReports(url: str, runs: int, startTimestamp: int, stopTimestamp: int) -> tuple:
+    timings: list = []
+    report: dict = None
+    async with AsyncHttpTransport(baseUrlOverride=url) as transport:
+        for _ in range(runs):
+            start: float = time.perf_counter()
+            report = await fetchLocationReport(latitude, longitude, startTimestamp, stopTimestamp, transport)
+            timings.append(time.perf_counter() - start)
+    return min(timings), report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serial vs concurrent per-location report latency.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    arguments = parser.parse_args()
+
+    stopTimestamp: int = int(time.time())
+    startTimestamp: int = stopTimestamp - 7 * 24 * 3600
+    slowest: float = max(endpointLatency.values())
+    total: float = sum(endpointLatency.values())
+
+    with MockOpenWeatherServer(endpointLatency=endpointLatency) as server:
+        with HttpTransport(baseUrlOverride=server.url) as transport:
+            serialTimings: list = []
+            for _ in range(arguments.runs):
+                start: float = time.perf_counter()
+                serial: dict = serialReport(transport, startTimestamp, stopTimestamp)
+                serialTimings.append(time.perf_counter() - start)
+
+        concurrent, report = asyncio.run(concurrentReports(server.url, arguments.runs, startTimestamp, stopTimestamp))
+
+    missing: list = [key for key, value in report.items() if value is None]
+    if missing or serial.keys() != report.keys():
+        sys.exit(f"Incomplete async report, missing: {missing}")
+
+    print(f"sum of endpoint latencies: {total * 1000:.0f} ms, slowest endpoint: {slowest * 1000:.0f} ms")
+    print(f"serial report:     {min(serialTimings) * 1000:.0f} ms")
+    print(f"concurrent report: {concurrent * 1000:.0f} ms")
+
+    if concurrent > slowest * arguments.tolerance:
+        sys.exit(f"Concurrent report took {concurrent * 1000:.0f} ms, more than "
+                 f"{arguments.tolerance}x the slowest endpoint")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the City Search Benchmark
+#
+# Searches every city of `cities.db` through `CitySearchIndex` three ways: by its exact name, by its first four letters and with one typo (a deleted, replaced or swapped letter), and prints the median and worst search time and how often the city is the first result or among the first five.
+#
+# - It also passes every US state name ("New York", "Texas") to `CitySelector.chooseCity` and checks that none is silently replaced by the state's capital: the user is asked, and pressing Enter keeps the name as typed.
+# - It fails if the median search takes 1 ms or more, if an exact name does not rank first or if a state name is accepted without asking.
+# - Usage: `python benchmarks/citySearchBenchmark.py [--seed N]`
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherCitySearch import CitySearchIndex
+from weatherForcastingProject import CitySelector
+
+
+def withTypo(name: str, generator: random.Random) -> str:
+    position: int = generator.randrange(1, len(name) - 1)
+    edit: str = generator.choice(("delete", "replace", "swap"))
+    if edit == "delete":
+        return name[:position] + name[position + 1:]
+    if edit == "replace":
+        return name[:position] + generator.choice(string.ascii_lowercase) + name[position + 1:]
+    return name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the local city search and check its ranking.")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    start: float = time.perf_counter()
+    index: CitySearchIndex = CitySearchIndex.fromDatabase()
+    print(f"indexed {len(index)} cities in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    generator: random.Random = random.Random(arguments.seed)
+    cities: list = index.candidates
+    kinds: dict = {
+        "exact": [city["city"] for city in cities],
+        "prefix": [city["city"][:4] for city in cities],
+        "typo": [withTypo(city["city"], generator) if len(city["city"]) >= 5 else city["city"] for city in cities],
+    }
+
+    timings: list = []
+    exactFailures: int = 0
+    print(f"{'query':<8} {'top 1':>7} {'top 5':>7}")
+    for kind, queries in kinds.items():
+        top1: int = 0
+        top5: int = 0
+        for city, query in zip(cities, queries):
+            searchStart: float = time.perf_counter()
+            matches: list = index.search(query)
+            timings.append(time.perf_counter() - searchStart)
+
+            # Ties (e.g. two capitals of the same name) count as found
+            bestScore: float = matches[0][1] if matches else 0.0
+            found: list = [candidate["entry"] for candidate, score in matches]
+            top1 += any(candidate["entry"] == city["entry"] and score == bestScore for candidate, score in matches)
+            top5 += city["entry"] in found
+            if kind == "exact" and not any(candidate["entry"] == city["entry"] and score == bestScore for candidate, score in matches):
+                exactFailures += 1
+        print(f"{kind:<8} {top1 / len(queries):>7.1%} {top5 / len(queries):>7.1%}")
+
+    median: float = statistics.median(timings)
+    print(f"search: median {median * 1e6:.0f} us, max {max(timings) * 1e6:.0f} us over {len(timings)} queries")
+
+    # State names are confirmed by the user; pressing Enter (an empty answer) keeps what was typed
+    selector: CitySelector = CitySelector(searchIndex=index)
+    stateNames: list = sorted({city["region"] for city in cities if city["table"] == "USStates"})
+    prompts: list = []
+    originalInput = builtins.input
+    builtins.input = lambda prompt="": prompts.append(prompt) or ""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            replacedStates: list = [(name, chosen) for name in stateNames if (chosen := selector.chooseCity(name)) != name]
+    finally:
+        builtins.input = originalInput
+    print(f"state names: {len(stateNames)} asked {len(prompts)} times, {len(replacedStates)} replaced {replacedStates[:3]}")
+
+    if median >= 0.001 or exactFailures or replacedStates or len(prompts) != len(stateNames):
+        sys.exit("City search is too slow, misses exact names or accepts state names without asking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Forecast Processing Micro-Benchmark
+#
+# Times the forecast processors on `MockOpenWeatherServer` payloads and counts their allocations with `tracemalloc`:
+#
+# - "legacy" is the previous implementation (mutating the input, a second loop with strptime/strftime and a final copy), kept here as a baseline.
+# - "process" is the current `process...` method (records converted with `to_dict`).
+# - "records" only consumes the `iter...` generator.
+#
+# For every processor and path it prints the median time per call, the number of memory blocks allocated per call and the peak traced memory. It fails if "process" returns something different from "legacy".
+#
+# - Usage: `python benchmarks/forecastProcessingBenchmark.py [--repeat N] [--size N]`
+
+import argparse
+import copy
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import buildPayload, forecastEntry
+from weatherForcastingProject import DailyWeatherForecast, FiveDaysThreeHoursWeatherForecast, HourlyWeatherForecast
+
+query: dict = {"lat": "35.69", "lon": "51.39", "cnt": "7"}
+
+
+def legacyProcessForecastedData(forecastList: list) -> list:
+    processedForecast: list = []
+    for forecastData in forecastList:
+        forecastData['dt'] = datetime.utcfromtimestamp(forecastData['dt']).strftime('%Y-%m-%d %H:%M:%S')
+        weatherInfo: dict = {}
+        for key in ["dt", "main", "weather"]:
+            if key == "main" and 'temp' in forecastData['main']:
+                weatherInfo[key] = forecastData['main']['temp']
+            elif key == "weather":
+                weatherInfo[key] = (
+                    forecastData.get("weather", [{}])[0].get("main", "") + " - " +
+                    forecastData.get("weather", [{}])[0].get("description", "")
+                )
+            else:
+                weatherInfo[key] = forecastData.get(key)
+        processedForecast.append(weatherInfo)
+    for entry in processedForecast:
+        entry['dt'] = datetime.strptime(entry['dt'], '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M:%S')
+        keyMapping: dict = {'dt': 'dateTime', 'main': 'temperature', 'weather': 'condition'}
+    return [{keyMapping.get(key, key): value for key, value in entry.items()} for entry in processedForecast]
+
+
+def legacyProcessHourlyForecast(hourlyForecastData: dict) -> list:
+    # The previous version only read "Temperature" and "weatherCondition" from the first entry; the
+    # baseline copies them onto every entry so that its output can be compared with the current one
+    hourlyForecastList: list = hourlyForecastData["list"][:25]
+    for forecastData in hourlyForecastList:
+        forecastData["Temperature"] = forecastData["main"]
+        forecastData["weatherCondition"] = forecastData["weather"]
+    return [
+        {
+            key: (
+                forecastData.get("Temperature", {}).get("temp") if key == "Temperature" else
+                (
+                    forecastData.get("weatherCondition", [{}])[0].get("main", "") + " - " +
+                    forecastData.get("weatherCondition", [{}])[0].get("description", "")
+                ) if key == "weatherCondition" else
+                forecastData.get(key)
+            )
+            for key in ["dt_txt", "Temperature", "weatherCondition"]
+        }
+        for forecastData in hourlyForecastList
+    ]
+
+
+def legacyProcessDailyForecast(dailyForecastData: dict) -> list:
+    return [
+        {
+            "date": datetime.utcfromtimestamp(forecast["dt"]).strftime('%Y-%m-%d'),
+            "temperature": {"day": forecast["temp"]["day"], "night": forecast["temp"]["night"]},
+            "weather": {"main": forecast["weather"][0]["main"], "description": forecast["weather"][0]["description"]}
+        }
+        for forecast in dailyForecastData["list"]
+    ]
+
+
+def measure(function, payloads: list) -> tuple:
+    # The legacy processors modify their input, so every call gets its own payload
+    timings: list = []
+    for payload in payloads[1:]:
+        start: float = time.perf_counter()
+        function(payload)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.clear_traces()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = function(payloads[0])
+    after = tracemalloc.take_snapshot()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks: int = sum(max(statistic.count_diff, 0) for statistic in after.compare_to(before, "lineno"))
+    del result
+    return statistics.median(timings), blocks, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the forecast processors and count their allocations.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--size", type=int, default=40, help="entries of the 5-days 3-hours forecast")
+    arguments = parser.parse_args()
+
+    fiveDays: FiveDaysThreeHoursWeatherForecast = FiveDaysThreeHoursWeatherForecast(35.69, 51.39)
+    hourly: HourlyWeatherForecast = HourlyWeatherForecast(35.69, 51.39)
+    daily: DailyWeatherForecast = DailyWeatherForecast(35.69, 51.39)
+
+    forecastList: list = [forecastEntry(1_700_000_000 + step * 10800, 35.69, 51.39) for step in range(arguments.size)]
+    processors: list = [
+        ("5-days 3-hours", {"list": forecastList}, lambda payload: payload["list"],
+         legacyProcessForecastedData, fiveDays.processForecastedData, fiveDays.iterForecastedData),
+        ("hourly", buildPayload("data/2.5/forecast/hourly", query), lambda payload: payload,
+         legacyProcessHourlyForecast, hourly.processHourlyForecast, hourly.iterHourlyForecast),
+        ("daily", buildPayload("data/2.5/forecast/daily", query), lambda payload: payload,
+         legacyProcessDailyForecast, daily.processDailyForecast, daily.iterDailyForecast),
+    ]
+
+    failed: bool = False
+    print(f"{'processor':<15} {'path':<8} {'time':>10} {'blocks':>8} {'peak':>10}")
+    for name, payload, argument, legacy, process, records in processors:
+        if legacy(argument(copy.deepcopy(payload))) != process(argument(copy.deepcopy(payload))):
+            print(f"{name}: process... output differs from the legacy output")
+            failed = True
+
+        for path, function in (("legacy", legacy), ("process", process), ("records", lambda data: list(records(data)))):
+            payloads: list = [argument(copy.deepcopy(payload)) for _ in range(arguments.repeat + 1)]
+            seconds, blocks, peak = measure(function, payloads)
+            print(f"{name:<15} {path:<8} {seconds * 1e6:>7.1f} us {blocks:>8} {peak / 1024:>7.1f} KiB")
+
+    if failed:
+        sys.exit("The forecast processors changed their output")
+
+
+if __name__ == "__main__":
+    main()
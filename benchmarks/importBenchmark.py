@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Import Benchmark
+#
+# Times `import weatherForcastingProject` in fresh interpreters and checks that it stays under a few milliseconds.
+#
+# - The module is byte-compiled first, so the timing reflects a normal worker start rather than a first-time compile.
+# - Every run patches `input()` and `socket.socket` to raise, so any prompt or network call at import time fails the benchmark.
+# - Usage: `python benchmarks/importBenchmark.py [--runs N] [--limit-ms MS]`
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+
+projectRoot: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+importProbe: str = """
+import builtins, socket, sys, time
+
+def forbidden(*args, **kwargs):
+    raise RuntimeError("I/O at import time")
+
+builtins.input = forbidden
+socket.socket = forbidden
+sys.path.insert(0, sys.argv[1])
+
+start = time.perf_counter()
+import weatherForcastingProject
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measureImport() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", importProbe, projectRoot],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time importing weatherForcastingProject.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit-ms", type=float, default=5.0)
+    arguments = parser.parse_args()
+
+    compileall.compile_file(os.path.join(projectRoot, "weatherForcastingProject.py"), quiet=1)
+
+    timings: list = [measureImport() for _ in range(arguments.runs)]
+    median: float = statistics.median(timings)
+    print(f"import weatherForcastingProject: median {median:.2f} ms, "
+          f"min {min(timings):.2f} ms, max {max(timings):.2f} ms over {arguments.runs} runs")
+
+    if median > arguments.limit_ms:
+        sys.exit(f"Import took {median:.2f} ms, above the {arguments.limit_ms} ms limit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Incremental Refresh Benchmark
+#
+# Simulates `--polls` polls of the hourly, 3-hour and air pollution forecasts of one location. Every `--polls-per-step` polls the list moves forward by one step (the first entry expires, a new one is appended), and between two polls `--change-rate` of the entries get a new value. Each poll is processed in full (`processHourlyForecast`, ...) and incrementally (`processHourlyForecastDelta`, ...) from freshly decoded JSON.
+#
+# - It prints the processing time and the JSON size pushed downstream per poll for both.
+# - The air pollution forecast is compared with the full processing of the same daily entries (`dailyForecastSamples`, at 00:00 UTC) that its incremental mode keeps.
+# - It also feeds a response that lists one `dt` twice, and checks that it is tracked once, with its last entry, and that the next poll reports no change.
+# - It fails if, after any poll, the tracked entries differ from the full processing, if a repeated `dt` is tracked wrongly, or if the incremental mode is not faster.
+# - Usage: `python benchmarks/incrementalRefreshBenchmark.py [--polls N] [--polls-per-step N] [--change-rate R]`
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import airPollutionEntry, forecastEntry, hourSeconds
+from weatherForcastingProject import AirPollutionData, AirPollutionForecast, FiveDaysThreeHoursWeatherForecast, HourlyWeatherForecast
+
+latitude: float = 35.69
+longitude: float = 51.39
+startTimestamp: int = 1700000000 // hourSeconds * hourSeconds
+
+
+def buildPolls(arguments, length: int, step: int, makeEntry, change) -> list:
+    generator: random.Random = random.Random(7)
+    entries: list = [makeEntry(startTimestamp + index * step, latitude, longitude) for index in range(length)]
+    bodies: list = []
+    for poll in range(1, arguments.polls + 1):
+        bodies.append(json.dumps({"list": entries}))
+        if poll % arguments.polls_per_step == 0:
+            entries = entries[1:] + [makeEntry(entries[-1]["dt"] + step, latitude, longitude)]
+        for entry in entries:
+            if generator.random() < arguments.change_rate:
+                change(entry, generator)
+    return bodies
+
+
+def changeTemperature(entry: dict, generator: random.Random) -> None:
+    entry["main"] = dict(entry["main"], temp=round(entry["main"]["temp"] + generator.uniform(-2, 2), 2))
+
+
+def changeAirQuality(entry: dict, generator: random.Random) -> None:
+    entry["main"] = {"aqi": generator.randint(1, 5)}
+
+
+def run(name: str, bodies: list, full, incremental, current) -> bool:
+    fullSeconds: float = 0
+    incrementalSeconds: float = 0
+    fullBytes: int = 0
+    deltaBytes: int = 0
+
+    for body in bodies:
+        payload: dict = json.loads(body)
+        start: float = time.perf_counter()
+        processed: list = full(payload)
+        fullSeconds += time.perf_counter() - start
+        fullBytes += len(json.dumps(processed))
+
+        payload = json.loads(body)
+        start = time.perf_counter()
+        delta = incremental(payload)
+        incrementalSeconds += time.perf_counter() - start
+        deltaBytes += len(json.dumps(delta.to_dict()))
+
+        if current() != processed:
+            sys.exit(f"{name}: the tracked entries differ from the full processing")
+
+    polls: int = len(bodies)
+    print(f"{name:>14} {fullSeconds / polls * 1e6:>9.1f} us {incrementalSeconds / polls * 1e6:>9.1f} us "
+          f"{fullSeconds / incrementalSeconds:>6.1f}x {fullBytes // polls:>8} B {deltaBytes // polls:>7} B")
+    return incrementalSeconds < fullSeconds
+
+
+def checkRepeatedTimestamp() -> None:
+    # The second entry for a dt replaces the first; the same response polled again is unchanged
+    forecast: FiveDaysThreeHoursWeatherForecast = FiveDaysThreeHoursWeatherForecast(latitude, longitude)
+    entries: list = [forecastEntry(startTimestamp + index * 3 * hourSeconds, latitude, longitude) for index in range(4)]
+    repeated: dict = forecastEntry(entries[1]["dt"], latitude, longitude)
+    repeated["main"]["temp"] += 5
+    payload: list = entries[:2] + [repeated] + entries[2:]
+
+    first = forecast.processForecastedDataDelta(json.loads(json.dumps(payload)))
+    second = forecast.processForecastedDataDelta(json.loads(json.dumps(payload)))
+    expected: list = forecast.processForecastedData(entries[:1] + [repeated] + entries[2:])
+    if len(first.added) != 4 or second or forecast.forecastTracker.current() != expected:
+        sys.exit(f"A repeated dt is tracked wrongly: {first!r}, then {second!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Full against incremental processing of repeated forecast polls.")
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--polls-per-step", type=int, default=6)
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    arguments = parser.parse_args()
+
+    hourly: HourlyWeatherForecast = HourlyWeatherForecast(latitude, longitude)
+    threeHour: FiveDaysThreeHoursWeatherForecast = FiveDaysThreeHoursWeatherForecast(latitude, longitude)
+    airPollution: AirPollutionForecast = AirPollutionForecast(latitude, longitude)
+
+    print(f"{'forecast':>14} {'full':>12} {'incremental':>12} {'speedup':>7} {'full JSON':>10} {'delta':>9}")
+    faster: list = [
+        run("hourly", buildPolls(arguments, 96, hourSeconds, forecastEntry, changeTemperature),
+            hourly.processHourlyForecast, hourly.processHourlyForecastDelta, lambda: hourly.forecastTracker.current()),
+        run("3-hour", buildPolls(arguments, 40, 3 * hourSeconds, forecastEntry, changeTemperature),
+            lambda payload: threeHour.processForecastedData(payload["list"]),
+            lambda payload: threeHour.processForecastedDataDelta(payload["list"]),
+            lambda: threeHour.forecastTracker.current()),
+        run("air pollution", buildPolls(arguments, 96, hourSeconds, airPollutionEntry, changeAirQuality),
+            lambda payload: AirPollutionData.processAirPollution(airPollution, AirPollutionForecast.dailyForecastSamples(payload["list"])),
+            airPollution.processAirPollutionForecastDelta,
+            lambda: airPollution.forecastTracker.current()),
+    ]
+
+    checkRepeatedTimestamp()
+    if not all(faster):
+        sys.exit("The incremental mode was slower than full processing")
+
+
+if __name__ == "__main__":
+    main()
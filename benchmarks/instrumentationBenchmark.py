@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Instrumentation Overhead Benchmark
+#
+# Times `CurrentWeather.currentWeather` and `FiveDaysThreeHoursWeatherForecast.getForecastedData` over a `ReplayTransport` (no network, so the hooks' own cost is not hidden by I/O) three times: before instrumentation, with `enableInstrumentation` (trace log included) and after `disableInstrumentation`.
+#
+# - It fails if disabling does not restore the original functions, and prints the per-call cost of the enabled hooks.
+# - Usage: `python benchmarks/instrumentationBenchmark.py [--calls N]`
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import buildPayload
+import weatherForcastingProject
+from weatherForcastingProject import CurrentWeather, FiveDaysThreeHoursWeatherForecast
+from weatherMetrics import Instrumentation, disableInstrumentation, enableInstrumentation
+from weatherReplay import Cassette, ReplayTransport
+
+latitude: float = 35.6892
+longitude: float = 51.389
+
+
+def timeCalls(function, calls: int) -> float:
+    timings: list = []
+    for _ in range(calls):
+        start: float = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost of the instrumentation hooks, enabled and disabled.")
+    parser.add_argument("--calls", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cassette: Cassette = Cassette(directory)
+        transport: ReplayTransport = ReplayTransport(cassette)
+        for fetcher, request in ((CurrentWeather(latitude, longitude, transport), "currentWeatherRequest"),
+                                 (FiveDaysThreeHoursWeatherForecast(latitude, longitude, transport), "fiveDaysThreeHoursForcastRequest")):
+            parameters: dict = getattr(fetcher, request)()
+            endpoint: str = parameters["endpoint"].strip("/")
+            cassette.save(cassette.keyFor(f"http://api.openweathermap.org/{endpoint}", parameters["extraParameters"]),
+                          buildPayload(endpoint, parameters["extraParameters"]))
+
+        calls: dict = {
+            "currentWeather": CurrentWeather(latitude, longitude, transport).currentWeather,
+            "getForecastedData": FiveDaysThreeHoursWeatherForecast(latitude, longitude, transport).getForecastedData,
+        }
+        originals: tuple = (weatherForcastingProject.constructUrl, CurrentWeather.__dict__["processCurrentWeather"])
+
+        results: dict = {name: [timeCalls(call, arguments.calls)] for name, call in calls.items()}
+        enableInstrumentation(Instrumentation(traceLog=io.StringIO()))
+        for name, call in calls.items():
+            results[name].append(timeCalls(call, arguments.calls))
+        disableInstrumentation()
+        for name, call in calls.items():
+            results[name].append(timeCalls(call, arguments.calls))
+
+    print(f"{'call':<18} {'before':>10} {'enabled':>10} {'disabled':>10} {'hook cost':>10}")
+    for name, (before, enabled, disabled) in results.items():
+        print(f"{name:<18} {before * 1e6:>7.1f} us {enabled * 1e6:>7.1f} us {disabled * 1e6:>7.1f} us {(enabled - before) * 1e6:>7.1f} us")
+
+    if (weatherForcastingProject.constructUrl, CurrentWeather.__dict__["processCurrentWeather"]) != originals:
+        sys.exit("disableInstrumentation did not restore the original functions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Location Index Benchmark
+#
+# Builds a `LocationIndex` over random locations (plus a few at the poles and on the ±180° meridian), times `nearest` and `withinRadius` queries from random points and checks every answer against a brute-force haversine scan.
+#
+# - It fails if an answer differs from the brute-force one or if the median query takes 1 ms or more.
+# - Usage: `python benchmarks/locationIndexBenchmark.py [--locations N] [--queries N] [--radius KM]`
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherLocationIndex import LocationIndex, haversineKm
+from weatherRecords import Geolocation
+
+
+def randomLocations(count: int, generator: np.random.Generator) -> list:
+    # Uniform on the sphere, so polar cells are not overcrowded
+    latitudes: np.ndarray = np.degrees(np.arcsin(generator.uniform(-1, 1, count)))
+    longitudes: np.ndarray = generator.uniform(-180, 180, count)
+    edgeCases: list = [(90.0, 0.0), (-90.0, 45.0), (0.0, 180.0), (0.0, -180.0), (64.1, -179.99), (64.1, 179.99)]
+    return [Geolocation(f"City{index}", "MC", float(latitude), float(longitude))
+            for index, (latitude, longitude) in enumerate(list(zip(latitudes, longitudes)) + edgeCases)]
+
+
+def timeQueries(function, queries: np.ndarray) -> tuple:
+    timings: list = []
+    results: list = []
+    for latitude, longitude in queries:
+        start: float = time.perf_counter()
+        results.append(function(float(latitude), float(longitude)))
+        timings.append(time.perf_counter() - start)
+    return results, statistics.median(timings), max(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time and check nearest-location and radius queries.")
+    parser.add_argument("--locations", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius", type=float, default=50.0)
+    arguments = parser.parse_args()
+
+    generator: np.random.Generator = np.random.default_rng(0)
+    locations: list = randomLocations(arguments.locations, generator)
+    queries: np.ndarray = np.column_stack((
+        np.degrees(np.arcsin(generator.uniform(-1, 1, arguments.queries))),
+        generator.uniform(-180, 180, arguments.queries)
+    ))
+    queries = np.vstack((queries, [[89.9, 10.0], [0.0, 179.9], [64.1, -180.0]]))
+
+    start: float = time.perf_counter()
+    index: LocationIndex = LocationIndex(locations)
+    print(f"built an index of {len(index)} locations in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    latitudes: np.ndarray = np.array([location.latitude for location in locations])
+    longitudes: np.ndarray = np.array([location.longitude for location in locations])
+    failures: int = 0
+
+    nearestResults, nearestMedian, nearestMax = timeQueries(index.nearest, queries)
+    radiusResults, radiusMedian, radiusMax = timeQueries(lambda latitude, longitude: index.withinRadius(latitude, longitude, arguments.radius), queries)
+
+    for (latitude, longitude), nearest, withinRadius in zip(queries, nearestResults, radiusResults):
+        distances: np.ndarray = haversineKm(latitude, longitude, latitudes, longitudes)
+        if abs(nearest[1] - distances.min()) > 1e-6:
+            failures += 1
+        if sorted(location.name for location, _ in withinRadius) != sorted(locations[i].name for i in np.flatnonzero(distances <= arguments.radius)):
+            failures += 1
+
+    print(f"nearest:            median {nearestMedian * 1e6:.0f} us, max {nearestMax * 1e6:.0f} us")
+    print(f"within {arguments.radius:g} km:       median {radiusMedian * 1e6:.0f} us, max {radiusMax * 1e6:.0f} us")
+    print(f"{failures} answers differ from the brute-force scan")
+
+    if failures or max(nearestMedian, radiusMedian) >= 0.001:
+        sys.exit("Location index queries are wrong or too slow")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Mock OpenWeather Server
+#
+# `MockOpenWeatherServer` is a local stand-in for api.openweathermap.org and pro.openweathermap.org, used by the benchmarks so they never spend real API quota.
+#
+# - It answers every endpoint the module uses: `/geo/1.0/direct`, `/data/2.5/air_pollution` (current, `/forecast`, `/history`), `/data/2.5/weather`, `/data/2.5/forecast`, `/data/2.5/forecast/hourly` and `/data/2.5/forecast/daily`, with payloads shaped like the real responses.
+# - `latency` delays every response (in seconds) and `endpointLatency` overrides it per endpoint, e.g. `{"data/2.5/forecast/daily": 0.2}`.
+# - `errorRate` answers that fraction of requests with `errorStatus` (503 by default) instead of a payload, and `endpointErrorRate` overrides it per endpoint. Errors are drawn from a generator seeded with `seed`, so a run fails the same requests every time.
+# - `payloadScale` multiplies the number of entries in the "list" of the forecast and air pollution forecast responses (and the geocoder matches), e.g. 10 for ten times larger bodies. History responses are sized by their `start`/`end` range.
+# - `callCounts` counts the requests received per endpoint and `errorCounts` the errors sent.
+# - Point a transport at it with `baseUrlOverride=server.url`.
+# - `MockOpenWeatherProcess` runs the same server in a child process, for benchmarks whose memory or CPU measurements must not include the server's own work.
+# - Run it standalone with `python benchmarks/mockOpenWeather.py [--port N] [--latency S] [--error-rate R] [--error-status N] [--payload-scale X]`.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+hourSeconds: int = 3600
+conditions: list = [
+    {"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"},
+    {"id": 801, "main": "Clouds", "description": "few clouds", "icon": "02d"},
+    {"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"},
+    {"id": 600, "main": "Snow", "description": "light snow", "icon": "13d"},
+]
+
+
+def seedFor(*values) -> int:
+    return int(hashlib.md5(repr(values).encode()).hexdigest()[:8], 16)
+
+
+def airPollutionEntry(timestamp: int, latitude: float, longitude: float) -> dict:
+    seed: int = seedFor(timestamp, latitude, longitude)
+    return {
+        "main": {"aqi": seed % 5 + 1},
+        "components": {
+            "co": 200 + seed % 400 + 0.37,
+            "no": seed % 7 + 0.01,
+            "no2": seed % 40 + 0.6,
+            "o3": seed % 90 + 0.1,
+            "so2": seed % 20 + 0.4,
+            "pm2_5": seed % 60 + 0.5,
+            "pm10": seed % 80 + 0.9,
+            "nh3": seed % 5 + 0.2,
+        },
+        "dt": timestamp,
+    }
+
+
+def forecastEntry(timestamp: int, latitude: float, longitude: float) -> dict:
+    seed: int = seedFor(timestamp, latitude, longitude)
+    temperature: float = round(10 + (seed % 250) / 10, 2)
+    return {
+        "dt": timestamp,
+        "main": {
+            "temp": temperature,
+            "feels_like": temperature - 1.2,
+            "temp_min": temperature - 2,
+            "temp_max": temperature + 2,
+            "pressure": 1000 + seed % 30,
+            "humidity": seed % 100,
+        },
+        "weather": [conditions[seed % len(conditions)]],
+        "clouds": {"all": seed % 100},
+        "wind": {"speed": (seed % 120) / 10, "deg": seed % 360},
+        "visibility": 10000,
+        "pop": (seed % 100) / 100,
+        "sys": {"pod": "d"},
+        "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(timestamp)),
+    }
+
+
+def dailyEntry(timestamp: int, latitude: float, longitude: float) -> dict:
+    seed: int = seedFor(timestamp, latitude, longitude)
+    day: float = round(12 + (seed % 200) / 10, 2)
+    return {
+        "dt": timestamp,
+        "sunrise": timestamp + 5 * hourSeconds,
+        "sunset": timestamp + 18 * hourSeconds,
+        "temp": {"day": day, "min": day - 6, "max": day + 3, "night": day - 5, "eve": day - 2, "morn": day - 4},
+        "feels_like": {"day": day - 1, "night": day - 6, "eve": day - 3, "morn": day - 5},
+        "pressure": 1000 + seed % 30,
+        "humidity": seed % 100,
+        "weather": [conditions[seed % len(conditions)]],
+        "speed": (seed % 120) / 10,
+        "deg": seed % 360,
+        "clouds": seed % 100,
+        "pop": (seed % 100) / 100,
+    }
+
+
+def cityPayload(latitude: float, longitude: float) -> dict:
+    return {"id": seedFor(latitude, longitude) % 1000000, "name": "Mock City",
+            "coord": {"lat": latitude, "lon": longitude}, "country": "MC", "timezone": 0}
+
+
+def scaled(count: int, payloadScale: float) -> int:
+    return max(1, round(count * payloadScale))
+
+
+def buildPayload(path: str, query: dict, payloadScale: float = 1.0):
+    latitude: float = float(query.get("lat", 35.6892))
+    longitude: float = float(query.get("lon", 51.389))
+    now: int = int(time.time()) // hourSeconds * hourSeconds
+
+    if path == "geo/1.0/direct":
+        parts: list = [part.strip() for part in query.get("q", "Tehran").split(",")]
+        name: str = parts[0]
+        seed: int = seedFor(name.lower())
+        return [{
+            "name": name,
+            "lat": round((seed % 18000) / 100 - 90, 4),
+            "lon": round((seed // 18000 % 36000) / 100 - 180, 4),
+            "country": parts[-1].upper() if len(parts) > 1 else "MC",
+        }] * scaled(1, payloadScale)
+    if path == "data/2.5/air_pollution":
+        return {"coord": {"lat": latitude, "lon": longitude}, "list": [airPollutionEntry(now, latitude, longitude)]}
+    if path == "data/2.5/air_pollution/forecast":
+        return {"coord": {"lat": latitude, "lon": longitude},
+                "list": [airPollutionEntry(now + hour * hourSeconds, latitude, longitude) for hour in range(scaled(96, payloadScale))]}
+    if path == "data/2.5/air_pollution/history":
+        start: int = int(query.get("start", now - 7 * 24 * hourSeconds)) // hourSeconds * hourSeconds
+        end: int = int(query.get("end", now))
+        return {"coord": {"lat": latitude, "lon": longitude},
+                "list": [airPollutionEntry(timestamp, latitude, longitude) for timestamp in range(start, end + 1, hourSeconds)]}
+    if path == "data/2.5/weather":
+        entry: dict = forecastEntry(now, latitude, longitude)
+        return {
+            "coord": {"lat": latitude, "lon": longitude},
+            "weather": entry["weather"],
+            "base": "stations",
+            "main": entry["main"],
+            "visibility": entry["visibility"],
+            "wind": entry["wind"],
+            "clouds": entry["clouds"],
+            "dt": now,
+            "sys": {"country": "MC", "sunrise": now - 6 * hourSeconds, "sunset": now + 6 * hourSeconds},
+            "timezone": 0,
+            "id": seedFor(latitude, longitude) % 1000000,
+            "name": "Mock City",
+            "cod": 200,
+        }
+    if path == "data/2.5/forecast/hourly":
+        entries: list = [forecastEntry(now + hour * hourSeconds, latitude, longitude) for hour in range(scaled(96, payloadScale))]
+        return {"cod": "200", "message": 0, "cnt": len(entries), "list": entries, "city": cityPayload(latitude, longitude)}
+    if path == "data/2.5/forecast/daily":
+        count: int = scaled(int(query.get("cnt", 7)), payloadScale)
+        today: int = now // (24 * hourSeconds) * 24 * hourSeconds
+        entries = [dailyEntry(today + day * 24 * hourSeconds, latitude, longitude) for day in range(count)]
+        return {"city": cityPayload(latitude, longitude), "cod": "200", "message": 0, "cnt": count, "list": entries}
+    if path == "data/2.5/forecast":
+        entries = [forecastEntry(now + step * 3 * hourSeconds, latitude, longitude) for step in range(scaled(40, payloadScale))]
+        return {"cod": "200", "message": 0, "cnt": len(entries), "list": entries, "city": cityPayload(latitude, longitude)}
+    return None
+
+
+class MockOpenWeatherServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        endpointLatency: dict = None,
+        errorRate: float = 0.0,
+        endpointErrorRate: dict = None,
+        errorStatus: int = 503,
+        payloadScale: float = 1.0,
+        seed: int = 0
+    ):
+        self.latency: float = latency
+        self.endpointLatency: dict = endpointLatency or {}
+        self.errorRate: float = errorRate
+        self.endpointErrorRate: dict = endpointErrorRate or {}
+        self.errorStatus: int = errorStatus
+        self.payloadScale: float = payloadScale
+        self.random: random.Random = random.Random(seed)
+        self.callCounts: Counter = Counter()
+        self.errorCounts: Counter = Counter()
+        self.callCountsLock: threading.Lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle's algorithm and delayed ACKs add ~40 ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                server.handle(self)
+
+        self.httpServer: ThreadingHTTPServer = ThreadingHTTPServer((host, port), Handler)
+        self.httpServer.daemon_threads = True
+        self.thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpServer.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        target = urlsplit(request.path)
+        path: str = target.path.strip("/")
+        query: dict = {key: values[-1] for key, values in parse_qs(target.query).items()}
+
+        with self.callCountsLock:
+            self.callCounts[path] += 1
+            failed: bool = self.random.random() < self.endpointErrorRate.get(path, self.errorRate)
+            if failed:
+                self.errorCounts[path] += 1
+
+        delay: float = self.endpointLatency.get(path, self.latency)
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            self.respond(request, self.errorStatus, {"cod": str(self.errorStatus), "message": "Injected error"})
+            return
+
+        payload = buildPayload(path, query, self.payloadScale)
+        if payload is None:
+            self.respond(request, 404, {"cod": "404", "message": "Not found"})
+        else:
+            self.respond(request, 200, payload)
+
+    def respond(self, request: BaseHTTPRequestHandler, status: int, payload) -> None:
+        body: bytes = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> "MockOpenWeatherServer":
+        self.thread = threading.Thread(target=self.httpServer.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+
+    def __enter__(self) -> "MockOpenWeatherServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class MockOpenWeatherProcess:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        errorRate: float = 0.0,
+        errorStatus: int = 503,
+        payloadScale: float = 1.0,
+        seed: int = 0,
+        startupTimeout: float = 10.0
+    ):
+        self.latency: float = latency
+        self.errorRate: float = errorRate
+        self.errorStatus: int = errorStatus
+        self.payloadScale: float = payloadScale
+        self.seed: int = seed
+        self.startupTimeout: float = startupTimeout
+        self.process: subprocess.Popen = None
+        self.port: int = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "MockOpenWeatherProcess":
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--port", str(self.port), "--latency", str(self.latency),
+             "--error-rate", str(self.errorRate), "--error-status", str(self.errorStatus),
+             "--payload-scale", str(self.payloadScale), "--seed", str(self.seed)],
+            stdout=subprocess.DEVNULL
+        )
+        deadline: float = time.monotonic() + self.startupTimeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("The mock OpenWeather server did not start")
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait()
+
+    def __enter__(self) -> "MockOpenWeatherProcess":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenWeather endpoints.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    server = MockOpenWeatherServer(
+        port=arguments.port, latency=arguments.latency, errorRate=arguments.error_rate,
+        errorStatus=arguments.error_status, payloadScale=arguments.payload_scale, seed=arguments.seed
+    )
+    print(f"Mock OpenWeather server listening on {server.url}")
+    try:
+        server.httpServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpServer.server_close()
+
+
+if __name__ == "__main__":
+    main()
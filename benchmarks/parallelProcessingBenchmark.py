@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Parallel Processing Benchmark
+#
+# Processes a batch of raw response bodies (hourly, daily and 3-hour forecasts and air pollution forecasts of `--cities` distinct locations, built by the mock server) serially in one process, then with `BatchProcessor` at 1, 2, 4, ... workers up to the CPU count, and prints the throughput and speedup of each.
+#
+# - It fails if any parallel result differs from the serial one, or, on a machine with more than one CPU, if the most workers are not faster than one worker.
+# - Usage: `python benchmarks/parallelProcessingBenchmark.py [--cities N] [--max-workers N]`
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import buildPayload
+from weatherParallel import BatchProcessor, processChunk
+
+kindEndpoints: dict = {
+    "hourlyForecast": "data/2.5/forecast/hourly",
+    "dailyForecast": "data/2.5/forecast/daily",
+    "forecastedData": "data/2.5/forecast",
+    "airPollutionForecast": "data/2.5/air_pollution/forecast",
+}
+
+
+def buildBatches(cities: int) -> dict:
+    batches: dict = {}
+    for kind, endpoint in kindEndpoints.items():
+        batches[kind] = [
+            json.dumps(buildPayload(endpoint, {"lat": -60 + index * 0.01, "lon": 10 + index * 0.01, "cnt": 16})).encode()
+            for index in range(cities)
+        ]
+    return batches
+
+
+def serialResults(batches: dict) -> tuple:
+    start: float = time.perf_counter()
+    results: dict = {kind: json.loads(processChunk(kind, b"[" + b",".join(bodies) + b"]")) for kind, bodies in batches.items()}
+    return results, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of BatchProcessor from one worker to all CPUs.")
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    arguments = parser.parse_args()
+
+    batches: dict = buildBatches(arguments.cities)
+    payloads: int = sum(len(bodies) for bodies in batches.values())
+    megabytes: float = sum(len(body) for bodies in batches.values() for body in bodies) / 2 ** 20
+    print(f"{payloads} payloads ({megabytes:.1f} MiB of JSON), {os.cpu_count()} CPUs")
+
+    serial, serialSeconds = serialResults(batches)
+    print(f"{'workers':>8} {'seconds':>9} {'payloads/s':>11} {'speedup':>8}")
+    print(f"{'serial':>8} {serialSeconds:>9.2f} {payloads / serialSeconds:>11.0f} {1:>7.2f}x")
+
+    workerCounts: list = []
+    workers: int = 1
+    while workers < arguments.max_workers:
+        workerCounts.append(workers)
+        workers *= 2
+    workerCounts.append(arguments.max_workers)
+
+    throughputs: dict = {}
+    for workers in workerCounts:
+        with BatchProcessor(workers) as processor:
+            # Start the worker processes (and their imports) before timing
+            list(processor.executor.map(processChunk, ["currentWeather"] * workers, [b"[]"] * workers))
+
+            start: float = time.perf_counter()
+            results: dict = {kind: processor.process(kind, bodies) for kind, bodies in batches.items()}
+            seconds: float = time.perf_counter() - start
+
+        if results != serial:
+            sys.exit(f"Results with {workers} workers differ from the serial ones")
+        throughputs[workers] = payloads / seconds
+        print(f"{workers:>8} {seconds:>9.2f} {throughputs[workers]:>11.0f} {serialSeconds / seconds:>7.2f}x")
+
+    if (os.cpu_count() or 1) > 1 and len(throughputs) > 1 and throughputs[workerCounts[-1]] <= throughputs[1]:
+        sys.exit("More workers did not increase the throughput")
+
+
+if __name__ == "__main__":
+    main()
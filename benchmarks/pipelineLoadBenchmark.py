@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Pipeline Load Benchmark
+#
+# Runs the full per-city pipeline (geocoding, then current weather, current air pollution, air pollution forecast and history, hourly, daily and 5-day forecasts, each processed by its fetch class) for the first `--cities` cities of `cities.db`, at several concurrency levels, and reports the p50/p95/p99 per-city latency, the throughput and the failed cities of each level.
+#
+# - By default the requests go to `MockOpenWeatherProcess` (in a child process, so its work does not compete with the pipeline for the GIL) with `--latency`, `--error-rate` and `--payload-scale`.
+# - `--record DIR` also saves every response to a `Cassette` (see `weatherReplay.py`); `--replay DIR` then runs offline from those recordings with no server at all, which measures the processing cost alone.
+# - Injected errors are not retried (`--retries 0` by default), so the failure count matches the error rate. It fails if any city fails while no errors are injected.
+# - Usage: `python benchmarks/pipelineLoadBenchmark.py [--cities N] [--concurrency 1 4 16] [--latency S] [--error-rate R] [--payload-scale X] [--record DIR | --replay DIR]`
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherProcess
+from weatherCities import geocodeQuery, loadCities
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+)
+from weatherReplay import Cassette, ReplayTransport
+from weatherTransport import HttpTransport
+
+# Fixed, so the requests (and their recordings) are the same on every run
+stopTimestamp: int = 1700000000 // 3600 * 3600
+startTimestamp: int = stopTimestamp - 7 * 24 * 3600
+
+
+def runPipeline(city: dict, transport) -> tuple:
+    start: float = time.perf_counter()
+    geolocationData: dict = GeolocationDataFetcher(transport).getGeolocationData(geocodeQuery(city["entry"], city["table"]))
+    if not geolocationData:
+        return time.perf_counter() - start, False
+
+    latitude: float = geolocationData["lat"]
+    longitude: float = geolocationData["lon"]
+    results: list = [
+        CurrentWeather(latitude, longitude, transport).currentWeather(),
+        AirPollutionData(latitude, longitude, transport).currentAirPollution(),
+        AirPollutionForecast(latitude, longitude, transport).airPollutionForecast(),
+        AirPollutionHistory(latitude, longitude, startTimestamp, stopTimestamp, transport).airPollutionHistory(),
+        HourlyWeatherForecast(latitude, longitude, transport).hourlyForecast(),
+        DailyWeatherForecast(latitude, longitude, transport).dailyForecast(),
+        FiveDaysThreeHoursWeatherForecast(latitude, longitude, transport).getForecastedData(),
+    ]
+    return time.perf_counter() - start, all(result is not None for result in results)
+
+
+def runLevel(cities: list, transport, concurrency: int) -> dict:
+    # The fetch classes print their errors; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start: float = time.perf_counter()
+        results: list = list(executor.map(lambda city: runPipeline(city, transport), cities))
+        elapsed: float = time.perf_counter() - start
+
+    latencies: list = [latency for latency, _ in results]
+    percentiles: list = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50": percentiles[49],
+        "p95": percentiles[94],
+        "p99": percentiles[98],
+        "throughput": len(cities) / elapsed,
+        "failed": sum(1 for _, succeeded in results if not succeeded),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-city pipeline latency percentiles and throughput at several concurrency levels.")
+    parser.add_argument("--cities", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--retries", type=int, default=0)
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument("--record", metavar="DIR", help="save every response to this cassette directory")
+    recording.add_argument("--replay", metavar="DIR", help="answer every request from this cassette directory")
+    arguments = parser.parse_args()
+
+    cities: list = (loadCities(table="world") + loadCities(table="USStates"))[:arguments.cities]
+
+    with contextlib.ExitStack() as stack:
+        if arguments.replay:
+            cassette: Cassette = Cassette(arguments.replay)
+            print(f"replaying {len(cassette)} recorded responses from {arguments.replay}")
+        else:
+            server: MockOpenWeatherProcess = stack.enter_context(MockOpenWeatherProcess(
+                latency=arguments.latency, errorRate=arguments.error_rate, payloadScale=arguments.payload_scale
+            ))
+            print(f"mock server: {arguments.latency * 1000:g} ms latency, {arguments.error_rate:.0%} errors, "
+                  f"payload scale {arguments.payload_scale:g}")
+
+        print(f"{len(cities)} cities, 8 requests each")
+        print(f"{'concurrency':>11} {'p50':>9} {'p95':>9} {'p99':>9} {'cities/s':>9} {'requests/s':>11} {'failed':>7}")
+        failures: int = 0
+        for concurrency in arguments.concurrency:
+            if arguments.replay:
+                transport = ReplayTransport(cassette)
+            else:
+                transport = HttpTransport(poolMaxSize=concurrency, retries=arguments.retries, baseUrlOverride=server.url)
+                if arguments.record:
+                    transport = ReplayTransport(Cassette(arguments.record), transport, mode="record")
+
+            with transport:
+                level: dict = runLevel(cities, transport, concurrency)
+            failures += level["failed"]
+            print(f"{concurrency:>11} {level['p50'] * 1000:>6.1f} ms {level['p95'] * 1000:>6.1f} ms {level['p99'] * 1000:>6.1f} ms "
+                  f"{level['throughput']:>9.1f} {level['throughput'] * 8:>11.1f} {level['failed']:>7}")
+
+    if failures and not arguments.error_rate:
+        sys.exit(f"{failures} city pipelines failed without injected errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Record Memory Benchmark
+#
+# Keeps a full report (geolocation, current weather, current and forecast air pollution, hourly, daily and 5-days 3-hours forecasts) in memory for many cities, once as the dictionaries of the `process...` methods ("dictionaries") and once as the records of `weatherRecords.py` ("records"), and prints the memory used per 1,000 cities.
+#
+# - Each variant and measurement runs in its own process. "resident" is the growth of the resident set size (measured without `tracemalloc`, whose own bookkeeping would inflate it), "traced" the memory held by the reports according to `tracemalloc`.
+# - Payloads come from `MockOpenWeatherServer.buildPayload`, with different coordinates for every city.
+# - It fails if a record's `to_dict` differs from the dictionary of the matching `process...` method.
+# - Usage: `python benchmarks/recordMemoryBenchmark.py [--cities N]`
+
+import argparse
+import copy
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import buildPayload
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+)
+
+
+def cityPayloads(index: int) -> dict:
+    query: dict = {"lat": str(-60 + index % 120 + 0.01 * (index // 120)), "lon": str(index % 360 - 180), "cnt": "7", "q": f"City{index},MC"}
+    return {
+        "geolocation": buildPayload("geo/1.0/direct", query),
+        "currentWeather": buildPayload("data/2.5/weather", query),
+        "currentAirPollution": buildPayload("data/2.5/air_pollution", query),
+        "airPollutionForecast": buildPayload("data/2.5/air_pollution/forecast", query),
+        "hourlyForecast": buildPayload("data/2.5/forecast/hourly", query),
+        "dailyForecast": buildPayload("data/2.5/forecast/daily", query),
+        "fiveDaysThreeHoursForecast": buildPayload("data/2.5/forecast", query),
+    }
+
+
+def dictionaryReport(payloads: dict) -> dict:
+    return {
+        "geolocation": GeolocationDataFetcher().processGeolocationData(payloads["geolocation"]),
+        "currentWeather": CurrentWeather(0, 0).processCurrentWeather(payloads["currentWeather"]),
+        "currentAirPollution": AirPollutionData(0, 0).processAirPollution(payloads["currentAirPollution"]["list"]),
+        "airPollutionForecast": AirPollutionForecast(0, 0).processAirPollutionForecast(payloads["airPollutionForecast"]),
+        "hourlyForecast": HourlyWeatherForecast(0, 0).processHourlyForecast(payloads["hourlyForecast"]),
+        "dailyForecast": DailyWeatherForecast(0, 0).processDailyForecast(payloads["dailyForecast"]),
+        "fiveDaysThreeHoursForecast": FiveDaysThreeHoursWeatherForecast(0, 0).processForecastedData(payloads["fiveDaysThreeHoursForecast"]["list"]),
+    }
+
+
+def recordReport(payloads: dict) -> dict:
+    airPollution: AirPollutionData = AirPollutionData(0, 0)
+    return {
+        "geolocation": GeolocationDataFetcher().processGeolocationRecord(payloads["geolocation"]),
+        "currentWeather": CurrentWeather(0, 0).processCurrentWeatherRecord(payloads["currentWeather"]),
+        "currentAirPollution": list(airPollution.iterAirPollution(payloads["currentAirPollution"]["list"])),
+        "airPollutionForecast": list(airPollution.iterAirPollution(payloads["airPollutionForecast"]["list"][::24])),
+        "hourlyForecast": list(HourlyWeatherForecast(0, 0).iterHourlyForecast(payloads["hourlyForecast"])),
+        "dailyForecast": list(DailyWeatherForecast(0, 0).iterDailyForecast(payloads["dailyForecast"])),
+        "fiveDaysThreeHoursForecast": list(FiveDaysThreeHoursWeatherForecast(0, 0).iterForecastedData(payloads["fiveDaysThreeHoursForecast"]["list"])),
+    }
+
+
+def recordToDict(value):
+    if isinstance(value, list):
+        return [recordToDict(item) for item in value]
+    return value.to_dict()
+
+
+def residentBytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measureVariant(variant: str, measurement: str, cities: int) -> int:
+    buildReport = dictionaryReport if variant == "dictionaries" else recordReport
+    buildReport(cityPayloads(-1))
+    gc.collect()
+
+    if measurement == "traced":
+        tracemalloc.start()
+        before: int = tracemalloc.get_traced_memory()[0]
+    else:
+        before = residentBytes()
+
+    reports: list = [buildReport(cityPayloads(index)) for index in range(cities)]
+    gc.collect()
+
+    used: int = tracemalloc.get_traced_memory()[0] - before if measurement == "traced" else residentBytes() - before
+    del reports
+    return used
+
+
+def checkRecords() -> bool:
+    payloads: dict = cityPayloads(7)
+    records: dict = recordReport(copy.deepcopy(payloads))
+    dictionaries: dict = dictionaryReport(copy.deepcopy(payloads))
+    matches: bool = True
+    for name, value in records.items():
+        if recordToDict(value) != dictionaries[name]:
+            print(f"{name}: to_dict differs from the process... output")
+            matches = False
+    return matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the memory used by dictionary and record reports.")
+    parser.add_argument("--cities", type=int, default=2000)
+    parser.add_argument("--variant", choices=("dictionaries", "records"), help=argparse.SUPPRESS)
+    parser.add_argument("--measurement", choices=("resident", "traced"), help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.variant:
+        print(json.dumps(measureVariant(arguments.variant, arguments.measurement, arguments.cities)))
+        return
+
+    if not checkRecords():
+        sys.exit("The records do not convert back to the process... output")
+
+    print(f"{'variant':<13} {'resident / 1,000 cities':>24} {'traced / 1,000 cities':>22}")
+    perThousand: float = 1000 / arguments.cities / 2 ** 20
+    for variant in ("dictionaries", "records"):
+        used: dict = {
+            measurement: json.loads(subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--variant", variant, "--measurement", measurement, "--cities", str(arguments.cities)],
+                check=True, capture_output=True, text=True
+            ).stdout)
+            for measurement in ("resident", "traced")
+        }
+        print(f"{variant:<13} {used['resident'] * perThousand:>20.2f} MiB {used['traced'] * perThousand:>18.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Refresher Check
+#
+# Runs `Refresher` on the first `--cities` cities of the `world` table against `MockOpenWeatherServer`, with every cadence of `defaultCadences` divided by `--speedup` (10 minutes become 1 second by default), for `--seconds` seconds. It then stops it and starts a second refresher on the same progress database, as after a restart.
+#
+# - It prints the upstream calls per endpoint of both runs, the most refreshes running at once and how long `stop()` took.
+# - It fails if more than `--workers` refreshes ran at once, if current weather was not refreshed about once per cadence, if the first refreshes were not spread over the start-up window, if stopping took more than two seconds, or if the restarted refresher fetched anything that was still fresh (the daily forecast and the history, or any geocoding).
+# - Usage: `python benchmarks/refresherCheck.py [--cities N] [--workers N] [--seconds S] [--speedup X]`
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherServer
+from weatherCities import loadCities
+from weatherGeocodeCache import GeocodeCache
+from weatherRefresher import Refresher, RefreshProgress, defaultCadences
+from weatherTransport import HttpTransport
+
+
+class CountingTransport:
+    def __init__(self, transport):
+        self.transport = transport
+        self.lock: threading.Lock = threading.Lock()
+        self.active: int = 0
+        self.mostActive: int = 0
+        self.callTimes: list = []
+
+    def get(self, url: str, params: dict = None) -> dict:
+        with self.lock:
+            self.active += 1
+            self.mostActive = max(self.mostActive, self.active)
+            self.callTimes.append(time.monotonic())
+        try:
+            return self.transport.get(url, params)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def runFor(refresher: Refresher, seconds: float) -> float:
+    thread: threading.Thread = threading.Thread(target=refresher.run)
+    thread.start()
+    time.sleep(seconds)
+    start: float = time.monotonic()
+    refresher.stop()
+    thread.join()
+    return time.monotonic() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cadences, concurrency, spread and restart of the background refresher.")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--speedup", type=float, default=600.0)
+    arguments = parser.parse_args()
+
+    cadences: dict = {endpoint: cadence / arguments.speedup for endpoint, cadence in defaultCadences.items()}
+    startupSpread: float = cadences["currentWeather"]
+    cities: list = loadCities(table="world")[:arguments.cities]
+    failures: list = []
+
+    with tempfile.TemporaryDirectory() as directory, MockOpenWeatherServer(latency=0.01) as server:
+        geocodeCache: GeocodeCache = GeocodeCache(os.path.join(directory, "geocodeCache.db"))
+        progress: RefreshProgress = RefreshProgress(os.path.join(directory, "refresher.db"))
+
+        def newRefresher(transport: CountingTransport) -> Refresher:
+            return Refresher(
+                cities, transport, geocodeCache, progress, cadences,
+                maxConcurrency=arguments.workers, startupSpread=startupSpread, retryDelay=cadences["currentWeather"]
+            )
+
+        transport: CountingTransport = CountingTransport(HttpTransport(baseUrlOverride=server.url, poolMaxSize=arguments.workers))
+        refresher: Refresher = newRefresher(transport)
+        stopSeconds: float = runFor(refresher, arguments.seconds)
+        firstRun: dict = dict(server.callCounts)
+        server.callCounts.clear()
+        print(f"first run, {arguments.seconds:.0f} s: {firstRun}")
+        print(f"most refreshes at once: {transport.mostActive}, stop() took {stopSeconds:.2f} s, refresher: {refresher.metrics()}")
+
+        firstRound: list = transport.callTimes[arguments.cities:arguments.cities * (1 + len(cadences))]
+        if firstRound and firstRound[-1] - firstRound[0] < startupSpread / 2:
+            failures.append("the first refreshes were not spread out")
+        if transport.mostActive > arguments.workers:
+            failures.append(f"{transport.mostActive} refreshes ran at once with {arguments.workers} workers")
+        expected: float = arguments.cities * arguments.seconds / cadences["currentWeather"]
+        if not 0.6 * expected <= firstRun.get("data/2.5/weather", 0) <= 1.4 * expected + arguments.cities:
+            failures.append(f"{firstRun.get('data/2.5/weather', 0)} current weather refreshes, about {expected:.0f} expected")
+        if stopSeconds > 2:
+            failures.append(f"stop() took {stopSeconds:.2f} s")
+        transport.close()
+
+        transport = CountingTransport(HttpTransport(baseUrlOverride=server.url, poolMaxSize=arguments.workers))
+        restarted: Refresher = newRefresher(transport)
+        runFor(restarted, cadences["currentWeather"] / 2)
+        secondRun: dict = dict(server.callCounts)
+        print(f"after a restart, {cadences['currentWeather'] / 2:.1f} s: {secondRun}")
+        stale: list = [path for path in ("geo/1.0/direct", "data/2.5/forecast/daily", "data/2.5/air_pollution/history") if secondRun.get(path)]
+        if stale:
+            failures.append(f"the restarted refresher fetched fresh data again: {stale}")
+        transport.close()
+
+        progress.close()
+        geocodeCache.close()
+
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the HTTP Service Benchmark
+#
+# Starts `WeatherService` against `MockOpenWeatherServer` (with `--latency` per upstream call) and polls it like a frontend: `--clients` concurrent keep-alive clients each send `--requests` GETs spread over every route and `--locations` locations, with gzip accepted and the last ETag of each URL sent back in `If-None-Match`.
+#
+# - It prints the requests per second, the median and p99 latency, the share of `304 Not Modified` answers, the gzip ratio and the number of upstream calls.
+# - It fails if any request does not answer 200 or 304, or if more upstream calls were made than there are distinct route/location pairs (plus one geocoding per city).
+# - Usage: `python benchmarks/serviceBenchmark.py [--clients N] [--requests N] [--locations N] [--latency S]`
+
+import argparse
+import asyncio
+import gzip
+import os
+import statistics
+import sys
+import time
+
+from aiohttp import ClientSession, TCPConnector, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherServer
+from weatherAsync import AsyncHttpTransport
+from weatherResponseCache import AsyncCachingTransport
+from weatherService import WeatherService
+from weatherSingleFlight import AsyncSingleFlightTransport
+
+historyQuery: str = "&start=1700000000&end=1700604800&downsampling=dailyMean"
+
+
+def buildUrls(locations: int) -> list:
+    urls: list = []
+    for index in range(locations):
+        location: str = f"city=City{index},MC" if index % 2 else f"lat={10 + index}&lon={20 + index}"
+        for path in WeatherService.routes:
+            urls.append(f"{path}?{location}{historyQuery if path == '/air-pollution/history' else ''}")
+    return urls
+
+
+async def client(session: ClientSession, baseUrl: str, urls: list, offset: int, requests: int, results: dict) -> None:
+    etags: dict = {}
+    for index in range(requests):
+        url: str = urls[(offset + index) % len(urls)]
+        headers: dict = {"Accept-Encoding": "gzip"}
+        if url in etags:
+            headers["If-None-Match"] = etags[url]
+
+        start: float = time.perf_counter()
+        async with session.get(baseUrl + url, headers=headers) as response:
+            body: bytes = await response.read()
+            results["latencies"].append(time.perf_counter() - start)
+            results["statuses"][response.status] = results["statuses"].get(response.status, 0) + 1
+            if response.status == 200:
+                etags[url] = response.headers["ETag"]
+                results["wireBytes"] += len(body)
+                results["bodyBytes"] += len(gzip.decompress(body) if "Content-Encoding" in response.headers else body)
+
+
+async def run(upstreamUrl: str, arguments) -> tuple:
+    service: WeatherService = WeatherService(
+        AsyncCachingTransport(AsyncSingleFlightTransport(AsyncHttpTransport(baseUrlOverride=upstreamUrl)))
+    )
+    runner: web.AppRunner = web.AppRunner(service.application())
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    baseUrl: str = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    urls: list = buildUrls(arguments.locations)
+    results: dict = {"latencies": [], "statuses": {}, "wireBytes": 0, "bodyBytes": 0}
+    try:
+        async with ClientSession(connector=TCPConnector(limit=arguments.clients), auto_decompress=False) as session:
+            start: float = time.perf_counter()
+            await asyncio.gather(*(
+                client(session, baseUrl, urls, index * 7, arguments.requests, results) for index in range(arguments.clients)
+            ))
+            elapsed: float = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+    return results, elapsed, len(urls), service.metrics()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Poll the HTTP service like a set of frontends.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    arguments = parser.parse_args()
+
+    with MockOpenWeatherServer(latency=arguments.latency) as server:
+        results, elapsed, distinctUrls, metrics = asyncio.run(run(server.url, arguments))
+        upstreamCalls: int = sum(server.callCounts.values())
+
+    latencies: list = results["latencies"]
+    total: int = len(latencies)
+    print(f"{total} requests from {arguments.clients} clients over {distinctUrls} distinct URLs in {elapsed:.2f} s")
+    print(f"throughput: {total / elapsed:.0f} requests/s")
+    print(f"latency: median {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {statistics.quantiles(latencies, n=100, method='inclusive')[98] * 1000:.2f} ms")
+    print(f"statuses: {results['statuses']}, 304 share {results['statuses'].get(304, 0) / total:.0%}")
+    print(f"gzip: {results['wireBytes']} bytes on the wire for {results['bodyBytes']} bytes of JSON")
+    print(f"service cache: {metrics}")
+    print(f"upstream calls: {upstreamCalls}")
+
+    geocodedCities: int = arguments.locations // 2
+    if set(results["statuses"]) - {200, 304}:
+        sys.exit("Some requests failed")
+    if upstreamCalls > distinctUrls + geocodedCities:
+        sys.exit(f"{upstreamCalls} upstream calls for {distinctUrls} distinct URLs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Single-Flight Check
+#
+# Fires 1,000 concurrent current-weather requests for one city at `MockOpenWeatherServer`, first from threads through `SingleFlightTransport` and then from asyncio tasks through `AsyncSingleFlightTransport`, and fails unless the mock server saw exactly one upstream call each time and every caller got a result.
+#
+# - Usage: `python benchmarks/singleFlightCheck.py [--callers N] [--latency S]`
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherServer
+from weatherAsync import AsyncCurrentWeather, AsyncHttpTransport
+from weatherForcastingProject import CurrentWeather
+from weatherSingleFlight import AsyncSingleFlightTransport, SingleFlightTransport
+from weatherTransport import HttpTransport
+
+latitude: float = 35.6892
+longitude: float = 51.389
+
+
+def threadedCallers(url: str, callers: int) -> list:
+    transport: SingleFlightTransport = SingleFlightTransport(HttpTransport(baseUrlOverride=url))
+    barrier: threading.Barrier = threading.Barrier(callers)
+    results: list = [None] * callers
+
+    def call(index: int) -> None:
+        barrier.wait()
+        results[index] = CurrentWeather(latitude, longitude, transport).currentWeather()
+
+    threads: list = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    transport.close()
+    return results
+
+
+async def asyncCallers(url: str, callers: int) -> list:
+    async with AsyncSingleFlightTransport(AsyncHttpTransport(baseUrlOverride=url)) as transport:
+        return await asyncio.gather(*(
+            AsyncCurrentWeather(latitude, longitude, transport).currentWeather() for _ in range(callers)
+        ))
+
+
+def check(name: str, server: MockOpenWeatherServer, results: list, seconds: float) -> bool:
+    upstreamCalls: int = server.callCounts["data/2.5/weather"]
+    answered: int = sum(result is not None for result in results)
+    print(f"{name}: {len(results)} callers, {answered} answered, {upstreamCalls} upstream call(s) in {seconds * 1000:.0f} ms")
+    server.callCounts.clear()
+    return upstreamCalls == 1 and answered == len(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that concurrent identical requests share one upstream call.")
+    parser.add_argument("--callers", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.5)
+    arguments = parser.parse_args()
+
+    with MockOpenWeatherServer(latency=arguments.latency) as server:
+        start: float = time.perf_counter()
+        threadResults: list = threadedCallers(server.url, arguments.callers)
+        threadsPassed: bool = check("threads", server, threadResults, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        asyncResults: list = asyncio.run(asyncCallers(server.url, arguments.callers))
+        asyncPassed: bool = check("asyncio", server, asyncResults, time.perf_counter() - start)
+
+    if not (threadsPassed and asyncPassed):
+        sys.exit("Concurrent identical requests were not coalesced into one upstream call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Snapshot Benchmark
+#
+# Builds `--cities` processed city reports (geolocation, current weather, current air pollution, hourly, daily and 3-hour forecasts, air pollution forecast and `--history-days` of hourly air pollution history) from `MockOpenWeatherServer` payloads and writes them as one JSON file and as `weatherSnapshot.py` snapshots, uncompressed and with zlib.
+#
+# - It prints the file sizes, the time to load everything (JSON parse against decoding every report of the snapshot) and the time to read one city's hourly temperatures from a freshly opened file (parsing the whole JSON file against mapping the snapshot and reading one column).
+# - It fails if a report read back from a snapshot differs from the one written, if the compressed snapshot is not smaller than the JSON file, or if reading one city from the snapshot is not faster than parsing the JSON file.
+# - Usage: `python benchmarks/snapshotBenchmark.py [--cities N] [--history-days N]`
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import buildPayload
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+)
+from weatherSnapshot import SnapshotReader, writeSnapshot
+
+
+def buildReport(index: int, historyDays: int) -> tuple:
+    name: str = f"City{index}"
+    geolocation: dict = GeolocationDataFetcher().processGeolocationData(buildPayload("geo/1.0/direct", {"q": f"{name},MC"}))
+    query: dict = {"lat": geolocation["lat"], "lon": geolocation["lon"], "cnt": 7}
+    stop: int = 1700000000
+    history: dict = buildPayload("data/2.5/air_pollution/history", {**query, "start": stop - historyDays * 86400, "end": stop})
+
+    report: dict = {
+        "geolocation": geolocation,
+        "currentAirPollution": AirPollutionData(0, 0).processAirPollution(buildPayload("data/2.5/air_pollution", query)["list"]),
+        "airPollutionForecast": AirPollutionForecast(0, 0).processAirPollutionForecast(buildPayload("data/2.5/air_pollution/forecast", query)),
+        "airPollutionHistory": AirPollutionHistory(0, 0, stop - historyDays * 86400, stop, downsampling="hourly").processAirPollutionHistory(history),
+        "currentWeather": CurrentWeather(0, 0).processCurrentWeather(buildPayload("data/2.5/weather", query)),
+        "hourlyForecast": HourlyWeatherForecast(0, 0).processHourlyForecast(buildPayload("data/2.5/forecast/hourly", query)),
+        "dailyForecast": DailyWeatherForecast(0, 0).processDailyForecast(buildPayload("data/2.5/forecast/daily", query)),
+        "fiveDaysThreeHoursForecast": FiveDaysThreeHoursWeatherForecast(0, 0).processForecastedData(buildPayload("data/2.5/forecast", query)["list"]),
+    }
+    return name, report
+
+
+def timed(function, repeat: int = 5) -> float:
+    times: list = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def readJsonCity(path: str, name: str) -> list:
+    with open(path, "rb") as file:
+        return [entry["Temperature"] for entry in json.load(file)[name]["hourlyForecast"]]
+
+
+def readSnapshotCity(path: str, name: str) -> list:
+    with SnapshotReader(path) as reader:
+        return reader.series(name, "hourlyForecast").values("Temperature")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Size and load time of report snapshots against JSON.")
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--history-days", type=int, default=7)
+    arguments = parser.parse_args()
+
+    reports: dict = dict(buildReport(index, arguments.history_days) for index in range(arguments.cities))
+    target: str = f"City{arguments.cities // 2}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        jsonPath: str = os.path.join(directory, "reports.json")
+        with open(jsonPath, "w", encoding="utf-8") as file:
+            json.dump(reports, file, ensure_ascii=False, separators=(",", ":"))
+        jsonBytes: int = os.path.getsize(jsonPath)
+
+        def loadJson() -> dict:
+            with open(jsonPath, "rb") as file:
+                return json.load(file)
+
+        jsonLoad: float = timed(loadJson)
+        jsonCity: float = timed(lambda: readJsonCity(jsonPath, target))
+        print(f"{'format':>12} {'bytes':>11} {'size':>6} {'write s':>8} {'load all s':>11} {'one city ms':>12}")
+        print(f"{'JSON':>12} {jsonBytes:>11} {1:>5.2f}x {'':>8} {jsonLoad:>11.3f} {jsonCity * 1000:>12.2f}")
+
+        sizes: dict = {}
+        cityTimes: dict = {}
+        for compression in (None, "zlib"):
+            snapshotPath: str = os.path.join(directory, f"reports-{compression or 'raw'}.snap")
+            start: float = time.perf_counter()
+            writeSnapshot(snapshotPath, reports, compression)
+            writeSeconds: float = time.perf_counter() - start
+            sizes[compression] = os.path.getsize(snapshotPath)
+
+            with SnapshotReader(snapshotPath) as reader:
+                for name, report in reader.reports():
+                    if report != reports[name]:
+                        sys.exit(f"The {compression or 'uncompressed'} snapshot of {name} differs from the report written")
+
+            def loadSnapshot() -> dict:
+                with SnapshotReader(snapshotPath) as reader:
+                    return dict(reader.reports())
+
+            if readSnapshotCity(snapshotPath, target) != readJsonCity(jsonPath, target):
+                sys.exit("The hourly temperatures read from the snapshot differ from JSON")
+            cityTimes[compression] = timed(lambda: readSnapshotCity(snapshotPath, target))
+            loadAll: float = timed(loadSnapshot, repeat=3)
+            label: str = f"snapshot{'+' + compression if compression else ''}"
+            print(f"{label:>12} {sizes[compression]:>11} {sizes[compression] / jsonBytes:>5.2f}x {writeSeconds:>8.2f} "
+                  f"{loadAll:>11.3f} {cityTimes[compression] * 1000:>12.2f}")
+
+    if sizes["zlib"] >= jsonBytes:
+        sys.exit("The compressed snapshot is not smaller than JSON")
+    if max(cityTimes.values()) >= jsonCity:
+        sys.exit("Reading one city from a snapshot is not faster than parsing the JSON file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Streaming Decoding Benchmark
+#
+# Fetches a long `/data/2.5/air_pollution/history` range from the mock server (in a child process, so its own allocations are not counted) twice and compares peak memory (`tracemalloc`), time to the first record and total time:
+#
+# - "decoded": `constructUrl` decodes the whole response, then `iterAirPollution` processes it.
+# - "streamed": `AirPollutionHistory.streamAirPollutionHistory` decodes the "list" array item by item while the body arrives.
+#
+# It fails if the two paths return different records.
+#
+# - Usage: `python benchmarks/streamingBenchmark.py [--days N] [--downsampling dailyMean]`
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockOpenWeather import MockOpenWeatherProcess
+from weatherForcastingProject import AirPollutionHistory, constructUrl
+from weatherTransport import HttpTransport
+
+latitude: float = 35.6892
+longitude: float = 51.389
+
+
+def decodedRecords(history: AirPollutionHistory):
+    airPollutionHistoryData: dict = constructUrl(**history.airPollutionHistoryRequest(), transport=history.transport)
+    entries = history.iterDownsampledAirPollution(airPollutionHistoryData["list"], history.downsampling)
+    yield from history.airPollutionData.iterAirPollution(entries)
+
+
+def measure(records) -> tuple:
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    firstRecord: float = None
+    result: list = []
+    for record in records:
+        if firstRecord is None:
+            firstRecord = time.perf_counter() - start
+        result.append(record)
+    total: float = time.perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, firstRecord, total, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare decoding a whole history response with streaming it.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--downsampling", choices=AirPollutionHistory.downsamplingModes, default="dailyMean")
+    arguments = parser.parse_args()
+
+    stopTimestamp: int = int(time.time())
+    startTimestamp: int = stopTimestamp - arguments.days * 86400
+
+    with MockOpenWeatherProcess() as server, HttpTransport(baseUrlOverride=server.url) as transport:
+        history: AirPollutionHistory = AirPollutionHistory(
+            latitude, longitude, startTimestamp, stopTimestamp, transport, arguments.downsampling
+        )
+        # Warm up the connection so neither path pays for it
+        constructUrl(**history.airPollutionHistoryRequest(), transport=transport)
+
+        results: dict = {}
+        print(f"{arguments.days} days of hourly entries, {arguments.downsampling}")
+        print(f"{'path':<10} {'records':>8} {'first record':>13} {'total':>10} {'peak memory':>12}")
+        for name, records in (("decoded", decodedRecords(history)), ("streamed", history.streamAirPollutionHistory())):
+            results[name], firstRecord, total, peak = measure(records)
+            print(f"{name:<10} {len(results[name]):>8} {firstRecord * 1000:>10.1f} ms {total * 1000:>7.1f} ms {peak / 2 ** 20:>8.2f} MiB")
+
+    if results["decoded"] != results["streamed"]:
+        sys.exit("The streamed records differ from the decoded ones")
+
+
+if __name__ == "__main__":
+    main()
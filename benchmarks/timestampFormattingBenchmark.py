@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Timestamp Formatting Benchmark
+#
+# Formats `--count` hourly and 3-hourly Unix timestamps with `datetime.utcfromtimestamp(timestamp).strftime(...)` (the former `Base.format_datetime`), with `TimestampFormatter.format` one at a time and with `TimestampFormatter.formatMany` in one batch, and prints the best time of `--repeat` runs and the speedup of each.
+#
+# - It fails if any result differs from `datetime`, also for a formatter with a UTC offset (compared with `datetime.fromtimestamp(timestamp, timezone(...))`), or if the batch mode is less than 10 times faster than `datetime`.
+# - Usage: `python benchmarks/timestampFormattingBenchmark.py [--count N] [--repeat N]`
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherTime import TimestampFormatter
+
+startTimestamp: int = 1700000000
+minimumSpeedup: float = 10.0
+
+
+def timed(function, timestamps: list, repeat: int) -> tuple:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        results = function(timestamps)
+        best = min(best, time.perf_counter() - start)
+    return results, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Timestamp formatting: datetime against TimestampFormatter.")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    offsetSeconds: int = 19800
+    localZone: timezone = timezone(timedelta(seconds=offsetSeconds))
+    local: TimestampFormatter = TimestampFormatter(offsetSeconds, showOffset=True)
+    expectedLocal: list = [
+        datetime.fromtimestamp(timestamp, localZone).strftime('%Y-%m-%d %H:%M:%S') + "+05:30"
+        for timestamp in range(startTimestamp, startTimestamp + 400 * 86400, 86400 // 7)
+    ]
+    if [local.format(timestamp) for timestamp in range(startTimestamp, startTimestamp + 400 * 86400, 86400 // 7)] != expectedLocal:
+        sys.exit("Local time results differ from datetime")
+
+    print(f"{'series':>8} {'method':>10} {'seconds':>9} {'speedup':>8}")
+    for name, step in (("hourly", 3600), ("3-hourly", 10800)):
+        timestamps: list = list(range(startTimestamp, startTimestamp + arguments.count * step, step))
+        formatter: TimestampFormatter = TimestampFormatter()
+
+        expected, baseline = timed(
+            lambda values: [datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') for timestamp in values],
+            timestamps, arguments.repeat
+        )
+        scalar, scalarSeconds = timed(lambda values: [formatter.format(timestamp) for timestamp in values], timestamps, arguments.repeat)
+        batch, batchSeconds = timed(formatter.formatMany, timestamps, arguments.repeat)
+
+        if scalar != expected or batch.tolist() != expected:
+            sys.exit(f"Formatted {name} timestamps differ from datetime")
+
+        print(f"{name:>8} {'datetime':>10} {baseline:>9.3f} {1:>7.1f}x")
+        print(f"{name:>8} {'format':>10} {scalarSeconds:>9.3f} {baseline / scalarSeconds:>7.1f}x")
+        print(f"{name:>8} {'formatMany':>10} {batchSeconds:>9.3f} {baseline / batchSeconds:>7.1f}x")
+
+        if baseline / batchSeconds < minimumSpeedup:
+            sys.exit(f"formatMany is only {baseline / batchSeconds:.1f}x faster than datetime on {name} timestamps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Asyncio Fetch Engine
+#
+# This module is the asyncio counterpart of `constructUrl` and of every fetch class in `weatherForcastingProject.py`. The async classes reuse the `...Request` and `process...` methods of the sync classes, so both engines send the same requests and return the same results.
+#
+# ##### `AsyncHttpTransport`
+#
+# - Wraps one `aiohttp.ClientSession`. `limitPerHost` caps the number of concurrent connections to each host (api. and pro.), `limit` caps the total.
+# - Connect and read timeouts, retries with backoff on 429 and 5xx responses and `baseUrlOverride` behave like `HttpTransport` in `weatherTransport.py`.
+# - Use it as an async context manager (`async with AsyncHttpTransport() as transport:`) so its connections are closed.
+#
+# ##### `asyncConstructUrl`
+#
+# - Sends the request through the given transport and returns the decoded JSON, or `None` after printing the error, exactly like `constructUrl`.
+#
+# ##### `fetchLocationReport`
+#
+# - Gathers air pollution (current, forecast, history), current weather and the hourly, daily and 3-hour forecasts for a location concurrently, so the report takes about as long as the slowest call instead of the sum of all of them.
+# - A failed endpoint leaves `None` in its place; the rest of the report is still returned.
+#
+# ##### `fetchCityReport`
+#
+# - Resolves the city with `/geo/1.0/direct` first (or from `geocodeCache`, when given) and then calls `fetchLocationReport`. The geolocation is stored under `"geolocation"`.
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+    apiKey,
+    responseFormatter,
+)
+from weatherTransport import HttpTransport
+
+
+class AsyncHttpTransport:
+    retryStatusCodes: tuple = HttpTransport.retryStatusCodes
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limitPerHost: int = 10,
+        connectTimeout: float = 3.05,
+        readTimeout: float = 10.0,
+        retries: int = 3,
+        backoffFactor: float = 0.5,
+        baseUrlOverride: str = None
+    ):
+        self.limit: int = limit
+        self.limitPerHost: int = limitPerHost
+        self.timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(sock_connect=connectTimeout, sock_read=readTimeout)
+        self.retries: int = retries
+        self.backoffFactor: float = backoffFactor
+        self.baseUrlOverride: str = baseUrlOverride
+        self.session: aiohttp.ClientSession = None
+
+    async def open(self) -> None:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limitPerHost)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncHttpTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def resolveUrl(self, url: str) -> str:
+        return HttpTransport.resolveUrl(self, url)
+
+    def retryDelay(self, attempt: int, response: aiohttp.ClientResponse = None) -> float:
+        retryAfter = response.headers.get("Retry-After") if response is not None else None
+        if retryAfter and retryAfter.isdigit():
+            return float(retryAfter)
+        return self.backoffFactor * (2 ** attempt)
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        await self.open()
+        parameters: dict = {key: str(value) for key, value in (params or {}).items()}
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(self.resolveUrl(url), params=parameters) as response:
+                    if response.status in self.retryStatusCodes and attempt < self.retries:
+                        await asyncio.sleep(self.retryDelay(attempt, response))
+                        continue
+                    response.raise_for_status()
+                    body: bytes = await self.readBody(response)
+                return self.decode(body)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self.retryDelay(attempt))
+
+    @staticmethod
+    async def readBody(response: aiohttp.ClientResponse) -> bytes:
+        return await response.read()
+
+    @staticmethod
+    def decode(body: bytes) -> dict:
+        # Like response.json(content_type=None): an empty body decodes to None
+        return json.loads(body) if body.strip() else None
+
+
+async def asyncConstructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org", extraParameters: dict = None, transport: AsyncHttpTransport = None) -> dict:
+    parameters: dict = {"appId": apiKey, **(extraParameters or {})}
+    url: str = f"{baseUrl}/{endpoint}"
+
+    try:
+        if transport is None:
+            async with AsyncHttpTransport() as temporaryTransport:
+                return await temporaryTransport.get(url, params=parameters)
+        return await transport.get(url, params=parameters)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        print(f"Error making API request: {e}")
+        return None
+
+
+class AsyncGeolocationDataFetcher(GeolocationDataFetcher):
+
+    async def getGeolocationData(self, city: str) -> dict:
+        if self.cache is not None:
+            cachedGeolocation: dict = self.cache.get(city)
+            if cachedGeolocation:
+                return cachedGeolocation
+
+        try:
+            geoData: list = await asyncConstructUrl(**self.geolocationRequest(city), transport=self.transport)
+            geoFinalData: dict = self.processGeolocationData(geoData)
+        except Exception as e:
+            print(f"Error getting geolocation data: {e}")
+            return None
+
+        if self.cache is not None:
+            self.cache.put(city, geoFinalData)
+        return geoFinalData
+
+
+class AsyncAirPollutionData(AirPollutionData):
+
+    async def currentAirPollution(self) -> list:
+        try:
+            currentAirPollutionData: dict = await asyncConstructUrl(**self.currentAirPollutionRequest(), transport=self.transport)
+
+            if not currentAirPollutionData:
+                return None
+
+            return self.processAirPollution(currentAirPollutionData["list"])
+        except Exception as e:
+            print(f"Error getting current air pollution data: {e}")
+            return None
+
+
+class AsyncAirPollutionForecast(AirPollutionForecast):
+
+    async def airPollutionForecast(self) -> list:
+        try:
+            airPollutionForecastData: dict = await asyncConstructUrl(**self.airPollutionForecastRequest(), transport=self.transport)
+            return self.processAirPollutionForecast(airPollutionForecastData)
+        except Exception as e:
+            print(f"Error getting current air pollution data: {e}")
+            return None
+
+
+class AsyncAirPollutionHistory(AirPollutionHistory):
+
+    async def airPollutionHistory(self) -> list:
+        try:
+            airPollutionHistoryData: dict = await asyncConstructUrl(**self.airPollutionHistoryRequest(), transport=self.transport)
+            return self.processAirPollutionHistory(airPollutionHistoryData)
+        except Exception as e:
+            print(f"Error getting historical air pollution data: {e}")
+            return None
+
+
+class AsyncCurrentWeather(CurrentWeather):
+
+    async def currentWeather(self) -> dict:
+        try:
+            current: dict = await asyncConstructUrl(**self.currentWeatherRequest(), transport=self.transport)
+            return self.processCurrentWeather(current)
+        except Exception as e:
+            print(f"Error getting current weather condition: {e}")
+            return None
+
+
+class AsyncHourlyWeatherForecast(HourlyWeatherForecast):
+
+    async def hourlyForecast(self) -> list:
+        try:
+            hourlyForecastData: dict = await asyncConstructUrl(**self.hourlyForecastRequest(), transport=self.transport)
+            return self.processHourlyForecast(hourlyForecastData)
+        except Exception as e:
+            print(f"Error getting hourly weather forecast: {e}")
+            return None
+
+
+class AsyncDailyWeatherForecast(DailyWeatherForecast):
+
+    async def dailyForecast(self) -> list:
+        try:
+            dailyForecastData: dict = await asyncConstructUrl(**self.dailyForecastRequest(), transport=self.transport)
+            return self.processDailyForecast(dailyForecastData)
+        except Exception as e:
+            print(f"Error getting daily weather forecast: {e}")
+            return None
+
+
+class AsyncFiveDaysThreeHoursWeatherForecast(FiveDaysThreeHoursWeatherForecast):
+
+    async def fiveDaysThreeHoursForcast(self) -> list:
+        try:
+            fiveDaysThreeHoursForcast: dict = await asyncConstructUrl(**self.fiveDaysThreeHoursForcastRequest(), transport=self.transport)
+            self.forecastFormatter = responseFormatter(fiveDaysThreeHoursForcast, self.localTime)
+            return fiveDaysThreeHoursForcast["list"] if fiveDaysThreeHoursForcast else []
+        except Exception as e:
+            print(f"Error retrieving 5-days 3-hours weather forecast data: {e}")
+            return []
+
+    async def getForecastedData(self) -> list:
+        forecastData: list = await self.fiveDaysThreeHoursForcast()
+        processedForecast: list = self.processForecastedData(forecastData)
+        return processedForecast
+
+
+async def fetchLocationReport(
+    latitude: float,
+    longitude: float,
+    startTimestamp: int = None,
+    stopTimestamp: int = None,
+    transport: AsyncHttpTransport = None
+) -> dict:
+    if transport is None:
+        async with AsyncHttpTransport() as temporaryTransport:
+            return await fetchLocationReport(latitude, longitude, startTimestamp, stopTimestamp, temporaryTransport)
+
+    if startTimestamp is None:
+        startTimestamp = int((datetime.now() - timedelta(days=7)).timestamp())
+    if stopTimestamp is None:
+        stopTimestamp = int(datetime.now().timestamp())
+
+    reportParts: dict = {
+        "currentAirPollution": AsyncAirPollutionData(latitude, longitude, transport).currentAirPollution(),
+        "airPollutionForecast": AsyncAirPollutionForecast(latitude, longitude, transport).airPollutionForecast(),
+        "airPollutionHistory": AsyncAirPollutionHistory(
+            latitude, longitude, startTimestamp, stopTimestamp, transport
+        ).airPollutionHistory(),
+        "currentWeather": AsyncCurrentWeather(latitude, longitude, transport).currentWeather(),
+        "hourlyForecast": AsyncHourlyWeatherForecast(latitude, longitude, transport).hourlyForecast(),
+        "dailyForecast": AsyncDailyWeatherForecast(latitude, longitude, transport).dailyForecast(),
+        "fiveDaysThreeHoursForecast": AsyncFiveDaysThreeHoursWeatherForecast(latitude, longitude, transport).getForecastedData(),
+    }
+
+    results: list = await asyncio.gather(*reportParts.values(), return_exceptions=True)
+    return {
+        key: None if isinstance(result, BaseException) else result
+        for key, result in zip(reportParts.keys(), results)
+    }
+
+
+async def fetchCityReport(
+    city: str,
+    startTimestamp: int = None,
+    stopTimestamp: int = None,
+    transport: AsyncHttpTransport = None,
+    geocodeCache=None
+) -> dict:
+    if transport is None:
+        async with AsyncHttpTransport() as temporaryTransport:
+            return await fetchCityReport(city, startTimestamp, stopTimestamp, temporaryTransport, geocodeCache)
+
+    geolocationData: dict = await AsyncGeolocationDataFetcher(transport, geocodeCache).getGeolocationData(city)
+    if not geolocationData:
+        return {"geolocation": None}
+
+    report: dict = await fetchLocationReport(
+        geolocationData["lat"], geolocationData["lon"], startTimestamp, stopTimestamp, transport
+    )
+    return {"geolocation": geolocationData, **report}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Chunked Air Pollution History Backfill
+#
+# Fetching a multi-month range from `/data/2.5/air_pollution/history` in one request returns a very large response that is slow and often fails. `HistoryBackfill` splits the range into chunks, fetches them in parallel and downsamples the result.
+#
+# ##### `planHistoryChunks`
+#
+# - Splits `startTimestamp`..`stopTimestamp` into consecutive, non-overlapping (start, end) chunks of at most `chunkSeconds` (7 days by default).
+# - Chunk boundaries fall on multiples of `chunkSeconds` since the epoch, so a nightly run over "the last 365 days" reuses the checkpointed chunks of the previous night and only fetches the edges.
+#
+# ##### `HistoryBackfill(latitude, longitude, startTimestamp, stopTimestamp, ...)`
+#
+# - `maxWorkers` chunks are fetched at the same time through the given `transport`. For large jobs, pass a `RateLimitedTransport` with `bulkPriority` (see `weatherRateLimiter.py`) so interactive lookups go first.
+# - With a `checkpointDirectory`, every completed chunk is saved as one JSON file. After a failure, running the same backfill again only fetches the chunks that are missing.
+# - Checkpoint files are kept after a successful run too, so shifted ranges can reuse them; nothing deletes them on its own. `clearCheckpoint()` removes the files of this backfill's chunks, e.g. when a failed backfill is given up.
+# - `downsampling` is one of the `AirPollutionHistory.downsamplingModes`: `"hourly"`, `"dailyMean"`, `"dailyMax"` or `"every24Hours"`.
+#
+# ##### `backfill`
+#
+# - Returns the processed entries for the whole range, in the same format as `AirPollutionHistory.airPollutionHistory`. If some chunks fail, it prints which ones and how many completed chunks were saved in the checkpoint directory (which a rerun resumes from), and returns `None`.
+#
+# From the command line, `python weatherBackfill.py world --days 365 --downsampling dailyMean --checkpoint-directory backfill` backfills every city of a `cities.db` table and writes one JSON line per city.
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from weatherForcastingProject import AirPollutionData, AirPollutionHistory, constructUrl
+
+weekSeconds: int = 7 * 24 * 3600
+
+
+def planHistoryChunks(startTimestamp: int, stopTimestamp: int, chunkSeconds: int = weekSeconds) -> list:
+    chunks: list = []
+    chunkStart: int = startTimestamp
+    while chunkStart <= stopTimestamp:
+        # Boundaries are multiples of chunkSeconds, so runs over shifted ranges share their full chunks
+        chunkEnd: int = min((chunkStart // chunkSeconds + 1) * chunkSeconds - 1, stopTimestamp)
+        chunks.append((chunkStart, chunkEnd))
+        chunkStart = chunkEnd + 1
+    return chunks
+
+
+class HistoryBackfill:
+    def __init__(
+        self,
+        latitude: float,
+        longitude: float,
+        startTimestamp: int,
+        stopTimestamp: int,
+        transport=None,
+        chunkSeconds: int = weekSeconds,
+        maxWorkers: int = 4,
+        checkpointDirectory: str = None,
+        downsampling: str = "dailyMean"
+    ):
+        if downsampling not in AirPollutionHistory.downsamplingModes:
+            raise ValueError(f"Unknown downsampling mode: {downsampling}")
+
+        self.latitude: float = latitude
+        self.longitude: float = longitude
+        self.startTimestamp: int = startTimestamp
+        self.stopTimestamp: int = stopTimestamp
+        self.transport = transport
+        self.chunks: list = planHistoryChunks(startTimestamp, stopTimestamp, chunkSeconds)
+        self.maxWorkers: int = maxWorkers
+        self.checkpointDirectory: str = checkpointDirectory
+        self.downsampling: str = downsampling
+
+        if checkpointDirectory:
+            os.makedirs(checkpointDirectory, exist_ok=True)
+
+    def checkpointPath(self, chunk: tuple) -> str:
+        fileName: str = f"{self.latitude:.4f}_{self.longitude:.4f}_{chunk[0]}_{chunk[1]}.json"
+        return os.path.join(self.checkpointDirectory, fileName)
+
+    def loadChunk(self, chunk: tuple) -> list:
+        if not self.checkpointDirectory or not os.path.exists(self.checkpointPath(chunk)):
+            return None
+        with open(self.checkpointPath(chunk)) as checkpointFile:
+            return json.load(checkpointFile)
+
+    def saveChunk(self, chunk: tuple, entries: list) -> None:
+        if not self.checkpointDirectory:
+            return
+        temporaryPath: str = self.checkpointPath(chunk) + ".tmp"
+        with open(temporaryPath, "w") as checkpointFile:
+            json.dump(entries, checkpointFile)
+        os.replace(temporaryPath, self.checkpointPath(chunk))
+
+    def fetchChunk(self, chunk: tuple) -> list:
+        savedEntries: list = self.loadChunk(chunk)
+        if savedEntries is not None:
+            return savedEntries
+
+        history: AirPollutionHistory = AirPollutionHistory(self.latitude, self.longitude, chunk[0], chunk[1], self.transport)
+        airPollutionHistoryData: dict = constructUrl(**history.airPollutionHistoryRequest(), transport=self.transport)
+        if not airPollutionHistoryData:
+            return None
+
+        entries: list = airPollutionHistoryData["list"]
+        self.saveChunk(chunk, entries)
+        return entries
+
+    def completedChunks(self) -> list:
+        return [chunk for chunk in self.chunks if self.checkpointDirectory and os.path.exists(self.checkpointPath(chunk))]
+
+    def clearCheckpoint(self) -> int:
+        completedChunks: list = self.completedChunks()
+        for chunk in completedChunks:
+            os.remove(self.checkpointPath(chunk))
+        return len(completedChunks)
+
+    def backfill(self) -> list:
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            chunkEntries: list = list(executor.map(self.fetchChunk, self.chunks))
+
+        failedChunks: list = [chunk for chunk, entries in zip(self.chunks, chunkEntries) if entries is None]
+        if failedChunks:
+            print(f"Error backfilling air pollution history: {len(failedChunks)} of {len(self.chunks)} chunks failed {failedChunks}")
+            if self.checkpointDirectory:
+                print(f"{len(self.completedChunks())} completed chunks are saved in {self.checkpointDirectory}; "
+                      f"run the backfill again to resume, or call clearCheckpoint() to remove them")
+            return None
+
+        entries: list = sorted(
+            {entry["dt"]: entry for entries in chunkEntries for entry in entries}.values(),
+            key=lambda entry: entry["dt"]
+        )
+        downsampledEntries: list = AirPollutionHistory.downsampleAirPollution(entries, self.downsampling)
+        return AirPollutionData(self.latitude, self.longitude).processAirPollution(downsampledEntries)
+
+
+def main() -> None:
+    from weatherCities import geocodeQuery, loadCities
+    from weatherForcastingProject import GeolocationDataFetcher
+    from weatherGeocodeCache import GeocodeCache
+    from weatherRateLimiter import RateLimitedTransport, bulkPriority
+
+    parser = argparse.ArgumentParser(description="Backfill air pollution history for every city of cities.db tables.")
+    parser.add_argument("tables", nargs="+", help="cities.db tables, e.g. world USStates")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-days", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--downsampling", choices=AirPollutionHistory.downsamplingModes, default="dailyMean")
+    parser.add_argument("--checkpoint-directory", default="backfill")
+    arguments = parser.parse_args()
+
+    stopTimestamp: int = int(time.time())
+    startTimestamp: int = stopTimestamp - arguments.days * 86400
+    transport: RateLimitedTransport = RateLimitedTransport(priority=bulkPriority)
+    fetcher: GeolocationDataFetcher = GeolocationDataFetcher(transport, GeocodeCache())
+
+    for table in arguments.tables:
+        for city in loadCities(table=table):
+            geolocationData: dict = fetcher.getGeolocationData(geocodeQuery(city["entry"], table))
+            if not geolocationData:
+                print(json.dumps({**city, "airPollutionHistory": None}, ensure_ascii=False), flush=True)
+                continue
+
+            history: list = HistoryBackfill(
+                geolocationData["lat"], geolocationData["lon"], startTimestamp, stopTimestamp,
+                transport=transport,
+                chunkSeconds=arguments.chunk_days * 86400,
+                maxWorkers=arguments.workers,
+                checkpointDirectory=arguments.checkpoint_directory,
+                downsampling=arguments.downsampling
+            ).backfill()
+            print(json.dumps({**city, "airPollutionHistory": history}, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Bulk Multi-City Runner
+#
+# The `BatchRunner` class fetches current weather and current air pollution for every city of a `cities.db` table (or query) in one run, instead of one interactive script run per city.
+#
+# ##### `BatchRunner(maxWorkers, transport)`
+#
+# - Cities are processed on a pool of `maxWorkers` threads that share one pooled `HttpTransport`. At most `2 * maxWorkers` cities are queued at a time.
+# - With a `geocodeCache` (see `weatherGeocodeCache.py`), cities geocoded before are not looked up again. The command line runner always uses the on-disk cache.
+#
+# ##### `runCity`
+#
+# - Geocodes one "City-CC" entry and fetches its current weather and air pollution. A failed part is `None`, like the fetch classes.
+#
+# ##### `run`
+#
+# - A generator that yields each city's result as soon as it completes, so results are streamed rather than collected.
+#
+# From the command line, `python weatherBatch.py world USStates --workers 16` writes one JSON line per city. `--query` runs a SQL query returning (name, "City-CC") pairs instead of whole tables. `--metrics-port` and `--trace-log` turn on the instrumentation of `weatherMetrics.py`.
+
+import argparse
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from weatherCities import citiesDatabasePath, geocodeQuery, loadCities
+from weatherForcastingProject import AirPollutionData, CurrentWeather, GeolocationDataFetcher
+
+
+class BatchRunner:
+    def __init__(self, maxWorkers: int = 8, transport=None, geocodeCache=None):
+        from weatherTransport import HttpTransport
+
+        self.maxWorkers: int = maxWorkers
+        self.transport = transport or HttpTransport(poolMaxSize=maxWorkers)
+        self.geocodeCache = geocodeCache
+
+    def runCity(self, city: dict) -> dict:
+        query: str = geocodeQuery(city["entry"], city.get("table"))
+        geolocationData: dict = GeolocationDataFetcher(self.transport, self.geocodeCache).getGeolocationData(query)
+        result: dict = {**city, "geolocation": geolocationData, "currentWeather": None, "currentAirPollution": None}
+
+        if not geolocationData:
+            return result
+
+        latitude: float = geolocationData["lat"]
+        longitude: float = geolocationData["lon"]
+        result["currentWeather"] = CurrentWeather(latitude, longitude, self.transport).currentWeather()
+        result["currentAirPollution"] = AirPollutionData(latitude, longitude, self.transport).currentAirPollution()
+        return result
+
+    def run(self, cities: list):
+        pending: set = set()
+        citiesIterator = iter(cities)
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            for city in citiesIterator:
+                pending.add(executor.submit(self.runCity, city))
+                if len(pending) >= 2 * self.maxWorkers:
+                    break
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+                for city in citiesIterator:
+                    pending.add(executor.submit(self.runCity, city))
+                    if len(pending) >= 2 * self.maxWorkers:
+                        break
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch current weather and air pollution for every city of cities.db tables.")
+    parser.add_argument("tables", nargs="*", help="cities.db tables, e.g. world USStates")
+    parser.add_argument("--query", help='SQL query returning (name, "City-CC") rows')
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--database", default=citiesDatabasePath)
+    parser.add_argument("--metrics-port", type=int, help="expose Prometheus metrics on this port")
+    parser.add_argument("--trace-log", help="write one JSON line per API and process... call to this file")
+    arguments = parser.parse_args()
+
+    if not arguments.tables and not arguments.query:
+        parser.error("give at least one table or --query")
+
+    cities: list = []
+    for table in arguments.tables:
+        cities.extend(loadCities(table=table, databasePath=arguments.database))
+    if arguments.query:
+        cities.extend(loadCities(query=arguments.query, databasePath=arguments.database))
+
+    from weatherGeocodeCache import GeocodeCache
+
+    geocodeCache: GeocodeCache = GeocodeCache()
+    instrumentation = None
+    if arguments.metrics_port is not None or arguments.trace_log:
+        from weatherMetrics import Instrumentation, enableInstrumentation
+
+        instrumentation = enableInstrumentation(Instrumentation(traceLog=arguments.trace_log))
+        instrumentation.watchCache("geocode", geocodeCache)
+        if arguments.metrics_port is not None:
+            instrumentation.serve(arguments.metrics_port)
+
+    runner: BatchRunner = BatchRunner(maxWorkers=arguments.workers, geocodeCache=geocodeCache)
+    for result in runner.run(cities):
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    if instrumentation is not None:
+        instrumentation.close()
+
+
+if __name__ == "__main__":
+    main()
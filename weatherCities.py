@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Reading cities.db
+#
+# `cities.db` is built from the `JSON Files` directory by `buildCitiesDatabase` and holds a single `locations` table: one row per city with its `region` ("Asia", "Africa", "Europe", "North America", "South America", or "United States" for the US state capitals), `country` (the US state name in the "United States" region), `city`, `isoCode` (the country or state code), the cached `latitude` and `longitude`, and `cityKey`, the normalized geocoder query of the city ("kabul,af", or "montgomery,al,us" for the US state capitals), which is also its key in the geocoding cache. `city`, `country`, `isoCode`, `region` and `cityKey` are indexed.
+#
+# The old tables `world`, `asianCities`, `africanCities`, `europeanCities`, `northAmericanCities`, `southAmericanCities` and `USStates` are views over `locations` with the same columns, so each row still pairs a country (or US state) name with a "City-CC" entry such as "Kabul-AF" or "Montgomery-AL".
+#
+# ##### `buildCitiesDatabase(jsonDirectory, databasePath, geocodeCache)`
+#
+# - Rebuilds `cities.db` from the JSON files in one transaction and replaces the old file only when the build succeeded. With a `GeocodeCache` (see `weatherGeocodeCache.py`), the coordinates of every city already cached are copied into `latitude` and `longitude`; no API call is made.
+# - From the command line: `python weatherCities.py build [--json-directory DIR] [--database PATH] [--geocode-cache PATH]`.
+#
+# ##### `loadLocations(region)` / `findLocation(query)`
+#
+# - `loadLocations` returns the rows of `locations` (all of them, or one region) as dictionaries. `findLocation` looks one city up by "City-CC", "City,CC", "City,ST,US" or "City" (any case or accents) with a single indexed query and returns its row, or `None`. A "City,CC" that is not a country's city is also looked up as a US state capital ("Montgomery-AL").
+#
+# ##### `loadCities`
+#
+# - Returns the rows of a table, or of any query returning (name, "City-CC") pairs, as a list of dictionaries with `table`, `region` and `entry` keys.
+# - Table names are checked against `cityTables` before they are put into SQL.
+#
+# ##### `splitCityEntry`
+#
+# - Splits "City-CC" on the last dash, so "Nur-Sultan-KZ" becomes ("Nur-Sultan", "KZ").
+#
+# ##### `geocodeQuery`
+#
+# - Builds the `q` parameter for `/geo/1.0/direct`: "City,CC" for countries and "City,ST,US" for the `USStates` table.
+
+import argparse
+import json
+import os
+import sqlite3
+
+citiesDatabasePath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities.db")
+citiesJsonDirectory: str = os.path.join(os.path.dirname(citiesDatabasePath), "JSON Files")
+
+# JSON file (and old table) name -> region, in the order of the old `world` table
+regionSources: dict = {
+    "asianCities": "Asia",
+    "africanCities": "Africa",
+    "europeanCities": "Europe",
+    "northAmericanCities": "North America",
+    "southAmericanCities": "South America",
+    "USStates": "United States",
+}
+
+locationColumns: tuple = ("id", "region", "country", "city", "isoCode", "latitude", "longitude", "cityKey")
+
+cityTables: dict = {
+    "world": ("countryName", "cityName"),
+    "asianCities": ("countryName", "cityName"),
+    "africanCities": ("countryName", "cityName"),
+    "europeanCities": ("countryName", "cityName"),
+    "northAmericanCities": ("countryName", "cityName"),
+    "southAmericanCities": ("countryName", "cityName"),
+    "USStates": ("stateName", "centerName"),
+}
+
+
+def loadCities(table: str = None, query: str = None, databasePath: str = citiesDatabasePath) -> list:
+    if (table is None) == (query is None):
+        raise ValueError("Pass either a table name or a query")
+
+    if table is not None:
+        if table not in cityTables:
+            raise ValueError(f"Unknown cities table: {table}")
+        regionColumn, entryColumn = cityTables[table]
+        query = f"SELECT {regionColumn}, {entryColumn} FROM {table} ORDER BY id"
+
+    return [{"table": table, "region": region, "entry": entry} for region, entry in readRows(query, (), databasePath)]
+
+
+def readRows(query: str, parameters: tuple = (), databasePath: str = citiesDatabasePath) -> list:
+    connection: sqlite3.Connection = sqlite3.connect(f"file:{databasePath}?mode=ro", uri=True)
+    try:
+        return connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
+
+
+def loadLocations(region: str = None, databasePath: str = citiesDatabasePath) -> list:
+    query: str = f"SELECT {', '.join(locationColumns)} FROM locations"
+    parameters: tuple = ()
+    if region is not None:
+        query += " WHERE region = ?"
+        parameters = (region,)
+    return [dict(zip(locationColumns, row)) for row in readRows(query + " ORDER BY id", parameters, databasePath)]
+
+
+def findLocation(query: str, databasePath: str = citiesDatabasePath) -> dict:
+    from weatherGeocodeCache import normalizeCityEntry
+
+    key: str = normalizeCityEntry(query)
+    if "," in key:
+        # "montgomery,al" is also tried as a US state capital; a country's city of the same key comes first
+        condition, order, parameters = "cityKey IN (?, ?)", "cityKey <> ?, id", (key, f"{key},us", key)
+    else:
+        # A bare city name matches any country; the first one built wins
+        condition, order, parameters = "cityKey >= ? AND cityKey < ?", "id", (f"{key},", f"{key}-")
+    rows: list = readRows(
+        f"SELECT {', '.join(locationColumns)} FROM locations WHERE {condition} ORDER BY {order} LIMIT 1", parameters, databasePath
+    )
+    return dict(zip(locationColumns, rows[0])) if rows else None
+
+
+def splitCityEntry(entry: str) -> tuple:
+    city, separator, code = entry.rpartition("-")
+    if not separator or not city:
+        return entry.strip(), ""
+    return city.strip(), code.strip()
+
+
+def geocodeQuery(entry: str, table: str = None) -> str:
+    city, code = splitCityEntry(entry)
+    if not code:
+        return city
+    if table == "USStates":
+        return f"{city},{code},US"
+    return f"{city},{code}"
+
+
+def createLocationsSchema(connection: sqlite3.Connection) -> None:
+    connection.executescript("""
+        CREATE TABLE locations (
+            id INTEGER PRIMARY KEY,
+            region TEXT NOT NULL,
+            country TEXT NOT NULL,
+            city TEXT NOT NULL,
+            isoCode TEXT NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            cityKey TEXT NOT NULL
+        );
+        CREATE INDEX locationsCity ON locations (city COLLATE NOCASE);
+        CREATE INDEX locationsCountry ON locations (country COLLATE NOCASE);
+        CREATE INDEX locationsIsoCode ON locations (isoCode);
+        CREATE INDEX locationsRegion ON locations (region);
+        CREATE INDEX locationsCityKey ON locations (cityKey);
+    """)
+
+    # The old tables, with their columns and per-table ids
+    for table, (regionColumn, entryColumn) in cityTables.items():
+        condition: str = "region <> 'United States'" if table == "world" else f"region = '{regionSources[table]}'"
+        connection.execute(f"""
+            CREATE VIEW {table} AS
+            SELECT ROW_NUMBER() OVER (ORDER BY id) AS id, country AS {regionColumn}, city || '-' || isoCode AS {entryColumn}
+            FROM locations WHERE {condition}
+        """)
+
+
+def buildCitiesDatabase(jsonDirectory: str = citiesJsonDirectory, databasePath: str = citiesDatabasePath, geocodeCache=None) -> int:
+    from weatherGeocodeCache import normalizeCityQuery
+
+    rows: list = []
+    for source, region in regionSources.items():
+        with open(os.path.join(jsonDirectory, f"{source}.json"), encoding="utf-8") as file:
+            cities: dict = json.load(file)
+        for country, entry in cities.items():
+            city, code = splitCityEntry(entry)
+            cached: dict = geocodeCache.get(geocodeQuery(entry, source)) if geocodeCache is not None else None
+            rows.append((
+                region, country, city, code,
+                cached["lat"] if cached else None, cached["lon"] if cached else None,
+                normalizeCityQuery(geocodeQuery(entry, source))
+            ))
+
+    # Build next to the old file and swap it in, so a failed build leaves cities.db as it was
+    temporaryPath: str = f"{databasePath}.building"
+    if os.path.exists(temporaryPath):
+        os.remove(temporaryPath)
+    connection: sqlite3.Connection = sqlite3.connect(temporaryPath)
+    try:
+        with connection:
+            createLocationsSchema(connection)
+            connection.executemany(
+                "INSERT INTO locations (region, country, city, isoCode, latitude, longitude, cityKey) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    os.replace(temporaryPath, databasePath)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build cities.db from the JSON Files directory.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--json-directory", default=citiesJsonDirectory)
+    parser.add_argument("--database", default=citiesDatabasePath)
+    parser.add_argument("--geocode-cache", help="geocodeCache.db to copy cached coordinates from")
+    arguments = parser.parse_args()
+
+    geocodeCache = None
+    if arguments.geocode_cache:
+        from weatherGeocodeCache import GeocodeCache
+        geocodeCache = GeocodeCache(arguments.geocode_cache)
+
+    count: int = buildCitiesDatabase(arguments.json_directory, arguments.database, geocodeCache)
+    if geocodeCache is not None:
+        geocodeCache.close()
+    print(f"{count} locations written to {arguments.database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Local City Search
+#
+# `CitySearchIndex` searches the cities of `cities.db` locally, so a typed city name (even misspelled) is resolved to a known "City,CC" geocoder query before any call to `/geo/1.0/direct`. With a prewarmed geocode cache (see `weatherGeocodeCache.py`), that query is then answered without calling the API at all.
+#
+# - Both the city and the country (or US state) name of every row are searchable, compared without case or accents.
+# - A query may end with a country or state code, e.g. "paris, fr" or "Springfield-IL"; matching codes rank first.
+# - Candidates are found through a prefix lookup on the sorted names and a trigram index (fuzzy matching), then ranked: exact name, prefix, then trigram similarity.
+#
+# ##### `CitySearchIndex.fromDatabase(tables, databasePath)`
+#
+# - Builds the index from the given `cities.db` tables (by default `world` and `USStates`, which together hold every city once).
+#
+# ##### `search(query, limit=5)`
+#
+# - Returns up to `limit` (candidate, score) pairs, best first. A candidate is a dictionary with `table`, `region`, `entry`, `city`, `code` and the geocoder `query`; the score is between 0 and about 1.
+#
+# ##### `matches(query, limit=5)`
+#
+# - Like `search`, but returns (candidate, score, isCity) triples, where `isCity` tells whether the score comes from the city name (`True`) or from the country or state name (`False`). An exact city name scores above 1, an exact country or state name scores 1 (or 1.05 with a matching code).
+#
+# ##### `resolve(query, minimumScore=0.6)`
+#
+# - Returns the best candidate if it scores at least `minimumScore`, otherwise `None`. `CitySelector(searchIndex=...)` uses it to turn what the user typed into a geocoder query.
+
+import bisect
+from collections import Counter
+
+from weatherCities import citiesDatabasePath, geocodeQuery, loadCities, splitCityEntry
+from weatherGeocodeCache import normalizeCityEntry, normalizeCityQuery
+
+
+def trigrams(text: str) -> set:
+    padded: str = f"  {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class CitySearchIndex:
+    def __init__(self, cities: list):
+        self.candidates: list = []
+        self.names: list = []
+        self.nameTrigrams: list = []
+        self.postings: dict = {}
+
+        for city in cities:
+            name, code = splitCityEntry(city["entry"])
+            candidate: dict = {
+                **city,
+                "city": name,
+                "code": code,
+                "query": geocodeQuery(city["entry"], city["table"]),
+            }
+            candidateIndex: int = len(self.candidates)
+            self.candidates.append(candidate)
+
+            # Each searchable name remembers its candidate and whether it is the city (True) or the region (False)
+            for searchableName, isCity in ((name, True), (city["region"], False)):
+                foldedName: str = normalizeCityQuery(searchableName)
+                nameIndex: int = len(self.names)
+                self.names.append((foldedName, candidateIndex, isCity))
+                self.nameTrigrams.append(trigrams(foldedName))
+                for trigram in self.nameTrigrams[-1]:
+                    self.postings.setdefault(trigram, []).append(nameIndex)
+
+        self.sortedNames: list = sorted((foldedName, nameIndex) for nameIndex, (foldedName, _, _) in enumerate(self.names))
+
+    @classmethod
+    def fromDatabase(cls, tables: tuple = ("world", "USStates"), databasePath: str = citiesDatabasePath) -> "CitySearchIndex":
+        seenEntries: set = set()
+        cities: list = []
+        for table in tables:
+            for city in loadCities(table=table, databasePath=databasePath):
+                if (city["entry"], city["region"]) not in seenEntries:
+                    seenEntries.add((city["entry"], city["region"]))
+                    cities.append(city)
+        return cls(cities)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def nameScores(self, foldedQuery: str) -> dict:
+        scores: dict = {}
+
+        # Prefix matches: a contiguous range of the sorted names
+        position: int = bisect.bisect_left(self.sortedNames, (foldedQuery, -1))
+        while position < len(self.sortedNames) and self.sortedNames[position][0].startswith(foldedQuery):
+            foldedName, nameIndex = self.sortedNames[position]
+            scores[nameIndex] = 1.0 if foldedName == foldedQuery else 0.85 + 0.1 * len(foldedQuery) / len(foldedName)
+            position += 1
+
+        # Fuzzy matches: Dice similarity of the trigram sets
+        queryTrigrams: set = trigrams(foldedQuery)
+        sharedTrigrams: Counter = Counter(
+            nameIndex for trigram in queryTrigrams for nameIndex in self.postings.get(trigram, ())
+        )
+        for nameIndex, shared in sharedTrigrams.items():
+            similarity: float = 2 * shared / (len(queryTrigrams) + len(self.nameTrigrams[nameIndex]))
+            if similarity > scores.get(nameIndex, 0.0):
+                scores[nameIndex] = similarity
+        return scores
+
+    def search(self, query: str, limit: int = 5) -> list:
+        return [(candidate, score) for candidate, score, _ in self.matches(query, limit)]
+
+    def matches(self, query: str, limit: int = 5) -> list:
+        normalizedQuery: str = normalizeCityEntry(query)
+        if not normalizedQuery:
+            return []
+
+        # Trailing two or three letter parts are country or state codes; other commas belong to the name ("Washington, D.C.")
+        parts: list = normalizedQuery.split(",")
+        codes: set = set()
+        while len(parts) > 1 and parts[-1].isalpha() and len(parts[-1]) <= 3:
+            codes.add(parts.pop())
+        foldedQuery: str = ",".join(parts)
+
+        candidateScores: dict = {}
+        for nameIndex, score in self.nameScores(foldedQuery).items():
+            _, candidateIndex, isCity = self.names[nameIndex]
+            # A city name match ranks slightly above the same match on a country or state name
+            score += 0.02 if isCity else 0.0
+            if codes:
+                score += 0.05 if self.candidates[candidateIndex]["code"].casefold() in codes else -0.1
+            if score > candidateScores.get(candidateIndex, (0.0, False))[0]:
+                candidateScores[candidateIndex] = (score, isCity)
+
+        ranked: list = sorted(candidateScores.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+        return [(self.candidates[candidateIndex], score, isCity) for candidateIndex, (score, isCity) in ranked]
+
+    def resolve(self, query: str, minimumScore: float = 0.6) -> dict:
+        matches: list = self.search(query, limit=1)
+        if not matches or matches[0][1] < minimumScore:
+            return None
+        return matches[0][0]
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Columnar Air Pollution Processing
+#
+# `processAirPollution` builds one dictionary per entry and looks up the AQI description and formats the timestamp entry by entry. For long history ranges (hundreds of thousands of hourly entries) most of the time goes there. `AirPollutionColumns` keeps the same data as NumPy arrays instead, one array per field.
+#
+# ##### `AirPollutionColumns.fromList(airPollutionList)`
+#
+# - Reads the "list" payload of any air pollution endpoint in one pass. The payload is not modified.
+# - `timestamps` (int64 seconds), `airQualityIndex` and `components` (a 2D float array with one column per name in `componentNames`, `NaN` where an entry has no value). The component names are taken from the first entry, as OpenWeather always sends the same eight.
+# - `airQualityDescription` and `dateTime` are computed for the whole array at once, with the same thresholds as `AirPollutionData.airQualityIndex` and the same `'%Y-%m-%d %H:%M:%S'` format (UTC) as `Base.format_datetime`.
+#
+# ##### `asList` / `toList` / `toDataFrame`
+#
+# - `asList()` is a read-only sequence over the columns. Its items are built on access and are equal to the entries returned by `processAirPollution`; `toList()` builds all of them at once.
+# - `toDataFrame()` returns a pandas DataFrame indexed by time, with one column per component (short names such as `pm2_5`).
+
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from weatherTime import utcFormatter
+
+airQualityDescriptions: tuple = ("Good", "Fair", "Moderate", "Poor", "Very Poor")
+
+
+def describeAirQuality(airQualityIndex: np.ndarray) -> np.ndarray:
+    # Same thresholds as AirPollutionData.airQualityIndex; values between 4 and 5 are "Unknown" there too
+    conditions: list = [
+        airQualityIndex <= 1,
+        airQualityIndex <= 2,
+        airQualityIndex <= 3,
+        airQualityIndex <= 4,
+        airQualityIndex >= 5,
+    ]
+    return np.select(conditions, airQualityDescriptions, default="Unknown")
+
+
+def formatTimestamps(timestamps: np.ndarray) -> np.ndarray:
+    return utcFormatter.formatMany(timestamps)
+
+
+class AirPollutionColumns:
+    def __init__(self, timestamps: np.ndarray, airQualityIndex: np.ndarray, components: np.ndarray, componentNames: tuple):
+        self.timestamps: np.ndarray = timestamps
+        self.airQualityIndex: np.ndarray = airQualityIndex
+        self.components: np.ndarray = components
+        self.componentNames: tuple = componentNames
+        self._airQualityDescription: np.ndarray = None
+        self._dateTime: np.ndarray = None
+
+    @classmethod
+    def fromList(cls, airPollutionList: list) -> "AirPollutionColumns":
+        if not airPollutionList:
+            return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, 0)), ())
+
+        componentNames: tuple = tuple(airPollutionList[0].get("components", {}))
+        size: int = len(airPollutionList)
+        timestamps: np.ndarray = np.fromiter([entry["dt"] for entry in airPollutionList], np.int64, size)
+        airQualityIndex: np.ndarray = np.fromiter([entry["main"]["aqi"] for entry in airPollutionList], np.float64, size)
+        if np.array_equal(airQualityIndex, np.floor(airQualityIndex)):
+            airQualityIndex = airQualityIndex.astype(np.int64)
+
+        try:
+            getComponents = itemgetter(*componentNames) if len(componentNames) > 1 else (
+                lambda components: tuple(components[name] for name in componentNames)
+            )
+            values: list = list(chain.from_iterable(map(getComponents, map(itemgetter("components"), airPollutionList))))
+        except KeyError:
+            values = [
+                entry.get("components", {}).get(name, np.nan)
+                for entry in airPollutionList for name in componentNames
+            ]
+        components: np.ndarray = np.fromiter(values, np.float64, size * len(componentNames)).reshape(size, len(componentNames))
+
+        return cls(timestamps, airQualityIndex, components, componentNames)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def airQualityDescription(self) -> np.ndarray:
+        if self._airQualityDescription is None:
+            self._airQualityDescription = describeAirQuality(self.airQualityIndex)
+        return self._airQualityDescription
+
+    @property
+    def dateTime(self) -> np.ndarray:
+        if self._dateTime is None:
+            self._dateTime = formatTimestamps(self.timestamps)
+        return self._dateTime
+
+    def asList(self) -> "AirPollutionListView":
+        return AirPollutionListView(self)
+
+    def toList(self) -> list:
+        return list(self.asList())
+
+    def toDataFrame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame(self.components, columns=list(self.componentNames))
+        frame.insert(0, "airQualityDescription", self.airQualityDescription)
+        frame.insert(0, "airQualityIndex", self.airQualityIndex)
+        frame.index = pd.to_datetime(self.timestamps, unit="s")
+        frame.index.name = "dateTime"
+        return frame
+
+
+class AirPollutionListView:
+    def __init__(self, columns: AirPollutionColumns):
+        from weatherForcastingProject import AirPollutionData
+
+        self.columns: AirPollutionColumns = columns
+        self.renamedComponents: tuple = tuple(
+            AirPollutionData.componentMapping.get(name, name) for name in columns.componentNames
+        )
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def entry(self, airQualityIndex, components: list, dateTime: str, description: str) -> dict:
+        return {
+            'airQualityIndex': airQualityIndex,
+            'components': {name: value for name, value in zip(self.renamedComponents, components) if value == value},
+            'dateTime': dateTime,
+            'airQualityDescription': description
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        columns: AirPollutionColumns = self.columns
+        return self.entry(
+            columns.airQualityIndex[index].item(),
+            columns.components[index].tolist(),
+            str(columns.dateTime[index]),
+            str(columns.airQualityDescription[index])
+        )
+
+    def __iter__(self):
+        columns: AirPollutionColumns = self.columns
+        # Converting each column to Python objects once is much faster than indexing the arrays per entry
+        for entry in zip(
+            columns.airQualityIndex.tolist(),
+            columns.components.tolist(),
+            columns.dateTime.tolist(),
+            columns.airQualityDescription.tolist()
+        ):
+            yield self.entry(*entry)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
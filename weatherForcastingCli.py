@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Interactive Command Line
+#
+# This module keeps the interactive flow of the original notebook: it asks for a city, resolves its coordinates (falling back to manual latitude/longitude input), asks for the history date range and then fetches every report.
+# The typed city is first searched locally in `cities.db` (`weatherCitySearch.py`), and geolocations are looked up in the on-disk geocoding cache (`weatherGeocodeCache.py`) before calling the API.
+#
+# Run it with `python weatherForcastingCli.py` (or `python weatherForcastingProject.py`). Importing `weatherForcastingProject` on its own performs no network calls and no `input()` prompts.
+#
+# ##### `promptCoordinates`
+#
+# - Returns the latitude and longitude from the geolocation data, or keeps asking the user until valid values are entered.
+# - With a `geocodeCache`, coordinates entered by hand are checked against the cached cities (`LocationIndex`, see `weatherLocationIndex.py`, built on the first manual entry only): a city within `nearbyLocationKm` is shown as a hint, and the coordinates entered are kept as they are.
+#
+# ##### `promptDateRange`
+#
+# - Asks for the start and stop dates in the format 'YYYY-MM-DD HH:MM:SS' and returns them as Unix timestamps.
+# - If you don't provide a start date, it defaults to a week ago from today.
+# - If you don't provide a stop date, it defaults to the current date and time.
+# - It's crucial to ensure that the stop date is *after* the start date. The code does not check for this, so please provide the dates in the correct order.
+#
+# ##### `main`
+#
+# - Runs the full interactive flow and returns every report in a dictionary.
+
+from datetime import datetime, timedelta
+from pprint import pprint
+
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CitySelector,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+)
+
+nearbyLocationKm: float = 10.0
+
+
+def promptCoordinates(city: str, geolocationData: dict, geocodeCache=None) -> tuple:
+    latitude = None
+    longitude = None
+    locationIndex = None
+
+    while not (latitude and longitude):
+        if geolocationData:
+            latitude = geolocationData["lat"]
+            longitude = geolocationData["lon"]
+            print(f"Latitude: {latitude}, Longitude: {longitude}")
+        else:
+            print(f"Unable to retrieve geolocation data for {city}")
+            latitudeInput = input(f"Enter latitude for {city}: ")
+            longitudeInput = input(f"Enter longitude for {city}: ")
+
+            if not latitudeInput or not longitudeInput:
+                print("Latitude and Longitude are required. Please try again.")
+            else:
+                try:
+                    latitude = float(latitudeInput)
+                    longitude = float(longitudeInput)
+                    print("Latitude and Longitude received successfully.")
+                    if geocodeCache is not None:
+                        if locationIndex is None:
+                            from weatherLocationIndex import LocationIndex
+                            locationIndex = LocationIndex.fromGeocodeCache(geocodeCache)
+                        match: tuple = locationIndex.nearest(latitude, longitude, maxDistanceKm=nearbyLocationKm)
+                        if match:
+                            location, distance = match
+                            print(f"Nearest known city: {location.name}, {location.country} ({distance:.1f} km away)")
+                except ValueError:
+                    print("Invalid latitude or longitude. Please enter valid numeric values.")
+
+    return latitude, longitude
+
+
+def promptDateRange() -> tuple:
+    startDate = input("Enter start date (YYYY-MM-DD HH:MM:SS) or press Enter for default (a week ago from today): ")
+    if startDate:
+        try:
+            startDt = datetime.strptime(startDate, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            print("Invalid date format. Using default start date.")
+            startDt = datetime.now() - timedelta(days=7)
+    else:
+        startDt = datetime.now() - timedelta(days=7)
+
+    stopDate = input("Enter stop date (YYYY-MM-DD HH:MM:SS) or press Enter for Today: ")
+    if stopDate:
+        try:
+            stopDt = datetime.strptime(stopDate, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            print("Invalid date format. Using default stop date.")
+            stopDt = datetime.now()
+    else:
+        stopDt = datetime.now()
+
+    print(f"Start Date: {startDt}")
+    print(f"Stop Date: {stopDt}")
+
+    # Time converting to Unix Zone
+    startTimestamp: int = int(startDt.timestamp())
+    stopTimestamp: int = int(stopDt.timestamp())
+    return startTimestamp, stopTimestamp
+
+
+def main() -> dict:
+    from weatherCitySearch import CitySearchIndex
+
+    CitySelectorObj = CitySelector(searchIndex=CitySearchIndex.fromDatabase())
+    city = CitySelectorObj.getUserCity()
+    print(f"Selected city: {city}")
+
+    from weatherGeocodeCache import GeocodeCache
+
+    geocodeCache: GeocodeCache = GeocodeCache()
+    fetcher: GeolocationDataFetcher = GeolocationDataFetcher(cache=geocodeCache)
+    geolocationData: dict = fetcher.getGeolocationData(city)
+    latitude, longitude = promptCoordinates(city, geolocationData, geocodeCache)
+
+    current_air_pollution: list = AirPollutionData(latitude, longitude).currentAirPollution()
+    air_pollution_forecast_data: list = AirPollutionForecast(latitude, longitude).airPollutionForecast()
+
+    startTimestamp, stopTimestamp = promptDateRange()
+    air_pollution_history_data: list = AirPollutionHistory(
+        latitude, longitude, startTimestamp, stopTimestamp
+    ).airPollutionHistory()
+
+    current_weather_data: dict = CurrentWeather(latitude, longitude).currentWeather()
+    hourly_forecast_data: list = HourlyWeatherForecast(latitude, longitude).hourlyForecast()
+    daily_forecast_data: list = DailyWeatherForecast(latitude, longitude).dailyForecast()
+    five_days_three_hours_forecast_data: list = FiveDaysThreeHoursWeatherForecast(latitude, longitude).getForecastedData()
+
+    report: dict = {
+        "currentAirPollution": current_air_pollution,
+        "airPollutionForecast": air_pollution_forecast_data,
+        "airPollutionHistory": air_pollution_history_data,
+        "currentWeather": current_weather_data,
+        "hourlyForecast": hourly_forecast_data,
+        "dailyForecast": daily_forecast_data,
+        "fiveDaysThreeHoursForecast": five_days_three_hours_forecast_data,
+    }
+
+    for title, data in report.items():
+        print(f"\n{title}:")
+        pprint(data)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
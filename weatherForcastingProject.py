@@ -6,10 +6,9 @@
 # In[1]:
 
 
-import requests
-from datetime import datetime, timedelta
-import sqlite3
-import json
+# `requests` is imported lazily inside the functions that use it, so that importing
+# this module stays cheap and performs no I/O. The interactive flow lives in
+# `weatherForcastingCli.py`.
 
 
 # ## Guide for Using the City Selector Class
@@ -26,20 +25,24 @@ import json
 # - To manually select a city, use this method.
 # - When prompted, enter the desired city's name.
 # - If you provide a city name, it will be selected; otherwise, it will default to "Tehran."
+# - With a `searchIndex` (a `CitySearchIndex` from `weatherCitySearch.py`), the name is first searched in `cities.db`. A single exact city name is turned into its "City,CC" geocoder query right away. Country or state names ("New York", "Texas"), misspelled or ambiguous names are listed for the user to choose from, and pressing Enter keeps the text as typed.
 # 
 
 # In[2]:
 
 
 class CitySelector:
-    def __init__(self):
+    def __init__(self, transport=None, searchIndex=None):
         self.ip_api_url = "http://ip-api.com/json/"
+        self.transport = transport
+        self.searchIndex = searchIndex
 
     def getDefaultCity(self) -> str:
+        from weatherTransport import getDefaultTransport
+
         try:
             # Use the ip-api.com API to fetch location information
-            response = requests.get(f"{self.ip_api_url}")
-            data = response.json()
+            data = (self.transport or getDefaultTransport()).get(f"{self.ip_api_url}")
             city = data.get("city")
             if city:
                 return city
@@ -51,19 +54,36 @@ class CitySelector:
 
     def getUserCity(self) -> str:
         city = input("Search city: ").strip()
-        return city if city else self.getDefaultCity()
+        if not city:
+            return self.getDefaultCity()
+        return self.chooseCity(city) if self.searchIndex is not None else city
+
+    def chooseCity(self, city: str) -> str:
+        matches: list = [match for match in self.searchIndex.matches(city) if match[1] >= 0.5]
+        if not matches:
+            return city
+
+        # A single exact city name is taken as is; a country or state name ("New York", "Texas") or anything else is confirmed by the user
+        if matches[0][2] and matches[0][1] >= 1.0 and (len(matches) == 1 or matches[1][1] < 1.0):
+            return matches[0][0]["query"]
+
+        for number, (candidate, score, _) in enumerate(matches, 1):
+            print(f"{number}. {candidate['city']}, {candidate['region']}")
+        choice = input(f"Choose a city (1-{len(matches)}) or press Enter to search for '{city}': ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(matches):
+            return matches[int(choice) - 1][0]["query"]
+        return city
 
-# Preventing unintended execution of code when importing it
-if __name__ == "__main__":
-    CitySelectorObj = CitySelector()
-    city = CitySelectorObj.getUserCity()
-    print(f"Selected city: {city}")
 
 
 # ## Guide for API URL Construction
 # 
 # The provided code offers a function `constructUrl` for constructing URLs for making API requests. This function takes an `endpoint`, a `baseUrl`, and optional `extraParameters` to build the final URL.
 # 
+# The request is sent through a `transport` (see `weatherTransport.py`), which pools keep-alive connections per host, applies connect and read timeouts and retries 429 and 5xx responses with backoff. Every fetch class below accepts a `transport` argument and passes it on; without one, the shared default transport is used.
+# 
+# Each fetch method is split in two: a `...Request` method returns the `endpoint`, `baseUrl` and `extraParameters` it sends, and a `process...` method turns the raw response into the result. Other engines (such as the asyncio engine in `weatherAsync.py`) reuse both halves.
+# 
 
 # In[13]:
 
@@ -71,14 +91,15 @@ if __name__ == "__main__":
 apiKey: str = "Developer Plan API Key"
 baseUrl: str = "http://api.openweathermap.org"
 
-def constructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org", extraParameters: dict = None) -> dict:
+def constructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org", extraParameters: dict = None, transport=None) -> dict:
+    import requests
+    from weatherTransport import getDefaultTransport
+
     parameters: dict = {"appId": apiKey, **(extraParameters or {})}
     url: str = f"{baseUrl}/{endpoint}"
     
     try:
-        response: requests.Response = requests.get(url, params=parameters)
-        response.raise_for_status()
-        return response.json()
+        return (transport or getDefaultTransport()).get(url, params=parameters)
     except requests.exceptions.RequestException as e:
         print(f"Error making API request: {e}")
         return None
@@ -92,6 +113,12 @@ def constructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org",
 # 
 # - This method retrieves geolocation data for the specified `city` using the OpenWeather API.
 # - It constructs the API endpoint and parameters, sends a request, and returns the geolocation data as a dictionary.
+# - When a `cache` is given (see `GeocodeCache` in `weatherGeocodeCache.py`), cached cities are answered without a request and new results are stored in it.
+# 
+# ##### `processGeolocationData`
+# 
+# - This method keeps the name, country, latitude and longitude of the first match of a raw `/geo/1.0/direct` response.
+# - `processGeolocationRecord` returns the same fields as a compact `Geolocation` record (see `weatherRecords.py`).
 # 
 # ##### `fetchGeoLocation`
 # 
@@ -103,59 +130,56 @@ def constructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org",
 
 class GeolocationDataFetcher:
     
-    def __init__(self):
+    def __init__(self, transport=None, cache=None):
         self.apiKey: str = apiKey
         self.baseUrl: str = baseUrl
+        self.transport = transport
+        self.cache = cache
     
+    def geolocationRequest(self, city: str) -> dict:
+        geoEndpoint: str = "/geo/1.0/direct"
+        geoParameters: dict = {
+             "q": city,
+            "limit": "1"
+         }
+        return {"endpoint": geoEndpoint, "extraParameters": geoParameters}
+
     def getGeolocationData(self, city: str) -> dict:
-        try:
-            geoEndpoint: str = "/geo/1.0/direct"
-            geoParameters: dict = {
-                 "q": city,
-                "limit": "1"
-             }
-            geoData: dict = constructUrl(endpoint=geoEndpoint, extraParameters=geoParameters)
-
-            if not geoData:
-                return None
+        if self.cache is not None:
+            cachedGeolocation: dict = self.cache.get(city)
+            if cachedGeolocation:
+                return cachedGeolocation
 
-            geoKeys: list = ["name", "country", "lat", "lon"]
-            geoFinalData: dict = {key: geoData[0][key] for key in geoKeys}
-            return geoFinalData
+        try:
+            geoData: dict = constructUrl(**self.geolocationRequest(city), transport=self.transport)
+            geoFinalData: dict = self.processGeolocationData(geoData)
         except Exception as e:
             print(f"Error getting geolocation data: {e}")
             return None
 
-        geolocation = getGeolocationData(city)
+        if self.cache is not None:
+            self.cache.put(city, geoFinalData)
+        return geoFinalData
+
+    def processGeolocationData(self, geoData: list) -> dict:
+        if not geoData:
+            return None
+
+        geoKeys: list = ["name", "country", "lat", "lon"]
+        geoFinalData: dict = {key: geoData[0][key] for key in geoKeys}
+        return geoFinalData
+
+    def processGeolocationRecord(self, geoData: list):
+        from weatherRecords import Geolocation
+
+        if not geoData:
+            return None
+
+        return Geolocation(geoData[0]["name"], geoData[0]["country"], geoData[0]["lat"], geoData[0]["lon"])
     
     def fetchGeoLocation(self, city: str) -> None:
         geolocation: dict = self.getGeolocationData(city)
-            
-fetcher: GeolocationDataFetcher = GeolocationDataFetcher()
-geolocationData: dict = fetcher.getGeolocationData(city)
-
-latitude = None
-longitude = None
-
-while not (latitude and longitude):
-    if geolocationData:
-        latitude = geolocationData["lat"]
-        longitude = geolocationData["lon"]
-        print(f"Latitude: {latitude}, Longitude: {longitude}")
-    else:
-        print(f"Unable to retrieve geolocation data for {city}")
-        latitudeInput = input(f"Enter latitude for {city}: ")
-        longitudeInput = input(f"Enter longitude for {city}: ")
-    
-        if not latitudeInput or not longitudeInput:
-            print("Latitude and Longitude are required. Please try again.")
-        else:
-            try:
-                latitude = float(latitudeInput)
-                longitude = float(longitudeInput)
-                print("Latitude and Longitude received successfully.")
-            except ValueError:
-                print("Invalid latitude or longitude. Please enter valid numeric values.")
+
 
 
 # ## Guide for Air Pollution Data Retrieval and Processing
@@ -164,7 +188,7 @@ while not (latitude and longitude):
 # 
 # ##### `format_datetime`
 # 
-# - A static method that formats a Unix timestamp into a human-readable date and time string.
+# - A static method that formats a Unix timestamp into a human-readable date and time string (UTC), through the cached `utcFormatter` of `weatherTime.py`.
 # 
 # ##### `currentAirPollution`
 # 
@@ -173,7 +197,16 @@ while not (latitude and longitude):
 # ##### `processAirPollution`
 # 
 # - This method processes the raw air pollution data.
-# - It also provides a description for the air quality index (AQI) based on predefined thresholds.
+# - It also provides a description for the air quality index (AQI) based on predefined thresholds (`airQualityIndex`), and renames the components with `componentMapping`.
+# 
+# ##### `iterAirPollution`
+# 
+# - Yields one compact `AirQualityPoint` record per entry (see `weatherRecords.py`) instead of a dictionary, without modifying the input. `to_dict` gives the dictionary of `processAirPollution`.
+# 
+# ##### `processAirPollutionColumns`
+# 
+# - A columnar alternative to `processAirPollution` for large history responses. It converts the "list" payload into NumPy arrays in one pass and maps the AQI descriptions and timestamps with vectorized operations. See `AirPollutionColumns` in `weatherColumnar.py`.
+# - The result can still be read as the usual list of dictionaries through `asList()`.
 
 # In[5]:
 
@@ -184,31 +217,58 @@ class Base:
 
     @staticmethod
     def format_datetime(timestamp: int) -> str:
-        return datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        from weatherTime import utcFormatter
+
+        return utcFormatter.format(timestamp)
 
 
 # In[6]:
 
 
 class AirPollutionData(Base):
+    componentMapping: dict = {
+        'co': 'Carbon Monoxide (CO)',
+        'no': 'Nitric oxide (NO)',
+        'no2': 'Nitrogen dioxide (NO2)',
+        'o3': 'Ozone (O3)',
+        'so2': 'Sulfur dioxide (SO2)',
+        'pm2_5': 'Particulate Matter (PM2.5)',
+        'pm10': 'Particulate Matter (PM10)',
+        'nh3': 'Ammonia (NH3)'
+    }
+
+    @staticmethod
+    def airQualityIndex(aqi: int) -> str:
+        if aqi <= 1:
+            return "Good"
+        elif 1 < aqi <= 2:
+            return "Fair"
+        elif 2 < aqi <= 3:
+            return "Moderate"
+        elif 3 < aqi <= 4:
+            return "Poor"
+        elif aqi >= 5:
+            return "Very Poor"
+        else:
+            return "Unknown"
     
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None):
         super().__init__()
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
+
+    def currentAirPollutionRequest(self) -> dict:
+        currentAirPollutionEndpoint: str = "/data/2.5/air_pollution"
+        currentAirPollutionExtraParameters: dict = {
+            "lat": self.latitude,
+            "lon": self.longitude
+        }
+        return {"endpoint": currentAirPollutionEndpoint, "extraParameters": currentAirPollutionExtraParameters}
 
     def currentAirPollution(self) -> list:
         try:
-            currentAirPollutionEndpoint: str = "/data/2.5/air_pollution"
-            currentAirPollutionExtraParameters: dict = {
-                "lat": self.latitude,
-                "lon": self.longitude
-            }
-
-            currentAirPollutionData: dict = constructUrl(
-                endpoint=currentAirPollutionEndpoint,
-                extraParameters=currentAirPollutionExtraParameters
-            )
+            currentAirPollutionData: dict = constructUrl(**self.currentAirPollutionRequest(), transport=self.transport)
 
             if not currentAirPollutionData:
                 return None
@@ -244,35 +304,11 @@ class AirPollutionData(Base):
 
             processedCurrentAirpollution.append(airQualityInfo)
 
-
-        component_mapping: dict = {
-            'co': 'Carbon Monoxide (CO)',
-            'no': 'Nitric oxide (NO)',
-            'no2': 'Nitrogen dioxide (NO2)',
-            'o3': 'Ozone (O3)',
-            'so2': 'Sulfur dioxide (SO2)',
-            'pm2_5': 'Particulate Matter (PM2.5)',
-            'pm10': 'Particulate Matter (PM10)',
-            'nh3': 'Ammonia (NH3)'
-        }
-
-        def airQualityIndex(aqi: int) -> str:
-            if aqi <= 1:
-                return "Good"
-            elif 1 < aqi <= 2:
-                return "Fair"
-            elif 2 < aqi <= 3:
-                return "Moderate"
-            elif 3 < aqi <= 4:
-                return "Poor"
-            elif aqi >= 5:
-                return "Very Poor"
-            else:
-                return "Unknown"
+        component_mapping: dict = AirPollutionData.componentMapping
 
         for entry in processedCurrentAirpollution:
             aqi: int = entry['airQualityIndex']
-            description: str = airQualityIndex(aqi)
+            description: str = AirPollutionData.airQualityIndex(aqi)
             entry['airQualityDescription'] = description
 
         for entry in processedCurrentAirpollution:
@@ -282,8 +318,16 @@ class AirPollutionData(Base):
 
         return processedCurrentAirpollution
 
-currentAirPollution = AirPollutionData(latitude, longitude)
-current_air_pollution: list = currentAirPollution.currentAirPollution()
+    def iterAirPollution(self, airPollutionList: list):
+        from weatherRecords import AirQualityPoint
+
+        for entry in airPollutionList:
+            yield AirQualityPoint.fromEntry(entry)
+
+    def processAirPollutionColumns(self, airPollutionList: list):
+        from weatherColumnar import AirPollutionColumns
+
+        return AirPollutionColumns.fromList(airPollutionList)
 
 
 # ## Guide for Air Pollution Forecast Data Retrieval
@@ -293,133 +337,188 @@ current_air_pollution: list = currentAirPollution.currentAirPollution()
 # ##### `airPollutionForecast`
 # 
 # - This method retrieves air pollution forecast data for the specified location.
-# - The forecast data is processed using the `processAirPollution` method from the `AirPollutionData` class.
+# - The forecast data is processed by `processAirPollutionForecast`, which uses the `processAirPollution` method from the `AirPollutionData` class.
+# 
+# ##### `airPollutionForecastDelta`
+# 
+# - The incremental mode: fetches the forecast and returns only what changed since the previous call on the same instance, as a `ForecastDelta` of added, changed and removed entries (see `weatherIncremental.py`). Unchanged entries are not processed again. `processAirPollutionForecastDelta` does the same for a response that was already fetched.
+# - Unlike `airPollutionForecast`, which keeps every 24th hourly entry, the daily entries are the ones at 00:00 UTC (`dailyForecastSamples`). They are chosen by timestamp rather than by position, so the same entries are kept while the forecast moves forward hour by hour and an hourly refresh returns a small delta. A list without such an entry falls back to every 24th entry.
 
 # In[7]:
 
 
 class AirPollutionForecast(Base):
     
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None):
         super().__init__()         
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
+        self.forecastTracker = None
+
+    def airPollutionForecastRequest(self) -> dict:
+        airPollutionForecastEndpoint: str = "/data/2.5/air_pollution/forecast"
+        airPollutionForecastExtraParameters: dict = {
+            "lat": self.latitude,
+            "lon": self.longitude
+        }
+        return {"endpoint": airPollutionForecastEndpoint, "extraParameters": airPollutionForecastExtraParameters}
 
     def airPollutionForecast(self) -> list:
         try:
-            airPollutionForecastEndpoint: str = "/data/2.5/air_pollution/forecast"
-            airPollutionForecastExtraParameters: dict = {
-                "lat": self.latitude,
-                "lon": self.longitude
-            }
-            airPollutionForecastData: dict = constructUrl(
-                endpoint=airPollutionForecastEndpoint,
-                extraParameters=airPollutionForecastExtraParameters
-            )
+            airPollutionForecastData: dict = constructUrl(**self.airPollutionForecastRequest(), transport=self.transport)
+            return self.processAirPollutionForecast(airPollutionForecastData)
+        except Exception as e:
+            print(f"Error getting current air pollution data: {e}")
+            return None
 
-            if not airPollutionForecastData:
-                return None
+    @staticmethod
+    def dailyForecastSamples(airPollutionForecastList: list) -> list:
+        samples: list = [entry for entry in airPollutionForecastList if entry["dt"] % 86400 == 0]
+        return samples or airPollutionForecastList[::24]
+
+    def processAirPollutionForecast(self, airPollutionForecastData: dict) -> list:
+        if not airPollutionForecastData:
+            return None
+
+        airPollutionForcastList: list = airPollutionForecastData["list"][::24]
+        airPollutionForecastProcessed: list = AirPollutionData.processAirPollution(self, airPollutionForcastList)
 
-            airPollutionForcastList: list = airPollutionForecastData["list"][::24]
-            airPollutionForecastProcessed: list = AirPollutionData.processAirPollution(self, airPollutionForcastList)
+        return airPollutionForecastProcessed
 
-            return airPollutionForecastProcessed
+    def airPollutionForecastDelta(self):
+        try:
+            airPollutionForecastData: dict = constructUrl(**self.airPollutionForecastRequest(), transport=self.transport)
+            return self.processAirPollutionForecastDelta(airPollutionForecastData)
         except Exception as e:
-            print(f"Error getting current air pollution data: {e}")
+            print(f"Error refreshing air pollution forecast: {e}")
+            return None
+
+    def processAirPollutionForecastDelta(self, airPollutionForecastData: dict):
+        from weatherIncremental import ForecastTracker, airQualitySignature
+
+        if not airPollutionForecastData:
             return None
-        
 
-air_pollution_forecast_instance: AirPollutionForecast = AirPollutionForecast(latitude, longitude)
-air_pollution_forecast_data: list = air_pollution_forecast_instance.airPollutionForecast()
+        if self.forecastTracker is None:
+            self.forecastTracker = ForecastTracker(lambda entries: AirPollutionData.processAirPollution(self, entries), airQualitySignature)
+        return self.forecastTracker.update(self.dailyForecastSamples(airPollutionForecastData["list"]))
 
 
 # ## Guide for Historical Air Pollution Data Retrieval
 # 
-# The provided code allows you to retrieve historical air pollution data for a specified time range. It prompts the user for start and stop dates and then fetches the relevant data.
-# 
-# ### User Input (Please Use Correctly)
-# 
-# - The code first prompts for user input to specify the start and stop dates in the format 'YYYY-MM-DD HH:MM:SS.' Please ensure that you provide valid date and time formats.
-# - It's crucial to ensure that the stop date is *after* the start date. The code does not check for this, so please provide the dates in the correct order.
+# The provided code allows you to retrieve historical air pollution data for a specified time range.
 # 
-# - If you don't provide a start date, it defaults to a week ago from today.
-# - If you don't provide a stop date, it defaults to the current date and time.
+# - The start and stop dates are passed in as Unix timestamps. The interactive prompts for them live in `weatherForcastingCli.py`.
 # 
 # ##### `airPollutionHistory`
 # 
 # - This method retrieves historical air pollution data for the specified location and time range.
-# - The retrieved data is processed using the `processAirPollution` method from the `AirPollutionData` class and returned as a list.
+# - The retrieved data is processed by `processAirPollutionHistory`, which uses the `processAirPollution` method from the `AirPollutionData` class, and returned as a list.
 # - Historical data is typically available for every 24 hours within the specified range.
 # 
+# ##### `downsampleAirPollution`
+# 
+# - The API returns one entry per hour. The `downsampling` argument chooses what is kept (the list version collects `iterDownsampledAirPollution`, so both give the same entries):
+#   - `"every24Hours"` (the default) keeps every 24th hourly entry, as before.
+#   - `"hourly"` keeps every entry.
+#   - `"dailyMean"` and `"dailyMax"` aggregate each UTC day into one entry with the mean or maximum AQI (rounded) and components.
+# - Long ranges can be fetched in parallel chunks with `HistoryBackfill` in `weatherBackfill.py`.
+# 
+# ##### `streamAirPollutionHistory`
+# 
+# - Streams the response (see `weatherStreaming.py`) and yields one `AirQualityPoint` record per downsampled entry while the body is still arriving, so memory stays flat for any range. `iterDownsampledAirPollution` downsamples the entries on the fly; for the daily modes they must be in time order, as the API sends them.
+# 
 
 # In[8]:
 
 
-startDate = input("Enter start date (YYYY-MM-DD HH:MM:SS) or press Enter for default (a week ago from today): ")
-if startDate:
-    try:
-        startDt = datetime.strptime(startDate, '%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        print("Invalid date format. Using default start date.")
-        startDt = datetime.now() - timedelta(days=7)
-else:
-    startDt = datetime.now() - timedelta(days=7)
-
-stopDate = input("Enter stop date (YYYY-MM-DD HH:MM:SS) or press Enter for Today: ")
-if stopDate:
-    try:
-        stopDt = datetime.strptime(stopDate, '%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        print("Invalid date format. Using default stop date.")
-        stopDt = datetime.now()
-else:
-    stopDt = datetime.now()
-
-print(f"Start Date: {startDt}")
-print(f"Stop Date: {stopDt}")
+class AirPollutionHistory:
+    downsamplingModes: tuple = ("every24Hours", "hourly", "dailyMean", "dailyMax")
 
-# Time converting to Unix Zone
-startTimestamp: int = int(startDt.timestamp())
-stopTimestamp: int = int(stopDt.timestamp())
+    def __init__(self, latitude: float, longitude: float, startTimestamp: int, stopTimestamp: int, transport=None, downsampling: str = "every24Hours"):
+        if downsampling not in self.downsamplingModes:
+            raise ValueError(f"Unknown downsampling mode: {downsampling}")
 
-class AirPollutionHistory:
-    def __init__(self, latitude: float, longitude: float, startTimestamp: int, stopTimestamp: int):
         self.latitude: float = latitude
         self.longitude: float = longitude
         self.startTimestamp: int = startTimestamp
         self.stopTimestamp: int = stopTimestamp
-        self.airPollutionData: AirPollutionData = AirPollutionData(self.latitude, self.longitude) 
+        self.transport = transport
+        self.downsampling: str = downsampling
+        self.airPollutionData: AirPollutionData = AirPollutionData(self.latitude, self.longitude, transport) 
         
+    def airPollutionHistoryRequest(self) -> dict:
+        airPollutionHistoryEndpoint: str = "/data/2.5/air_pollution/history"
+        airPollutionHistoryExtraParameters: dict = {
+                "lat": self.latitude,
+                "lon": self.longitude,
+                "start": self.startTimestamp,
+                "end": self.stopTimestamp
+        }
+        return {"endpoint": airPollutionHistoryEndpoint, "extraParameters": airPollutionHistoryExtraParameters}
+
     def airPollutionHistory(self) -> list:
         
         try:
-            airPollutionHistoryEndpoint: str = "/data/2.5/air_pollution/history"
-            airPollutionHistoryExtraParameters: dict = {
-                    "lat": self.latitude,
-                    "lon": self.longitude,
-                    "start": self.startTimestamp,
-                    "end": self.stopTimestamp
-            }
+            airPollutionHistoryData: dict = constructUrl(**self.airPollutionHistoryRequest(), transport=self.transport)
+            return self.processAirPollutionHistory(airPollutionHistoryData)
 
-            airPollutionHistoryData: dict = constructUrl(
-                airPollutionHistoryEndpoint,
-                extraParameters=airPollutionHistoryExtraParameters
-            )
+        except Exception as e:
+            print(f"Error getting historical air pollution data: {e}")
+            return None
 
-            if not airPollutionHistoryData:
-                return None
+    def processAirPollutionHistory(self, airPollutionHistoryData: dict) -> list:
+        if not airPollutionHistoryData:
+            return None
 
-            airPollutionHistoryList: list = airPollutionHistoryData["list"][::24]
-            airPollutionHistoryProcessed: list = self.airPollutionData.processAirPollution(airPollutionHistoryList)
+        airPollutionHistoryList: list = self.downsampleAirPollution(airPollutionHistoryData["list"], self.downsampling)
+        airPollutionHistoryProcessed: list = self.airPollutionData.processAirPollution(airPollutionHistoryList)
 
-            return airPollutionHistoryProcessed
+        return airPollutionHistoryProcessed
 
-        except Exception as e:
-            print(f"Error getting historical air pollution data: {e}")
-            return None
+    def streamAirPollutionHistory(self):
+        from weatherStreaming import streamConstructUrl
+
+        airPollutionHistoryStream = streamConstructUrl(**self.airPollutionHistoryRequest(), transport=self.transport)
+        if airPollutionHistoryStream is None:
+            return
+
+        with airPollutionHistoryStream:
+            downsampledEntries = self.iterDownsampledAirPollution(airPollutionHistoryStream, self.downsampling)
+            yield from self.airPollutionData.iterAirPollution(downsampledEntries)
+
+    @staticmethod
+    def aggregateDailyAirPollution(day: int, entries: list, downsampling: str) -> dict:
+        aggregate = max if downsampling == "dailyMax" else (lambda values: sum(values) / len(values))
+        componentNames: list = list(entries[0].get("components", {}))
+        return {
+            "main": {"aqi": round(aggregate([entry["main"]["aqi"] for entry in entries]))},
+            "components": {
+                name: round(aggregate([entry["components"][name] for entry in entries]), 2)
+                for name in componentNames
+            },
+            "dt": day * 86400
+        }
+
+    @staticmethod
+    def iterDownsampledAirPollution(airPollutionEntries, downsampling: str):
+        from itertools import groupby, islice
 
-air_pollution_history_instance: AirPollutionHistory = AirPollutionHistory(latitude, longitude, startTimestamp, stopTimestamp) 
-air_pollution_history_data: list = air_pollution_history_instance.airPollutionHistory() 
+        if downsampling == "every24Hours":
+            yield from islice(airPollutionEntries, 0, None, 24)
+        elif downsampling == "hourly":
+            yield from airPollutionEntries
+        else:
+            for day, entries in groupby(airPollutionEntries, key=lambda entry: entry["dt"] // 86400):
+                yield AirPollutionHistory.aggregateDailyAirPollution(day, list(entries), downsampling)
+
+    @staticmethod
+    def downsampleAirPollution(airPollutionList: list, downsampling: str) -> list:
+        if downsampling in ("dailyMean", "dailyMax"):
+            # The daily modes group consecutive entries by day, so a list in any order is sorted first
+            airPollutionList = sorted(airPollutionList, key=lambda entry: entry["dt"])
+        return list(AirPollutionHistory.iterDownsampledAirPollution(airPollutionList, downsampling))
 
 
 # ## Guide for Current Weather Data Retrieval
@@ -428,63 +527,90 @@ air_pollution_history_data: list = air_pollution_history_instance.airPollutionHi
 # 
 # #### Common Parameters
 # 
-# The code changes common parameters used for weather data retrieval, including latitude, longitude, units, mode, and the API key.
+# `buildCommonParameters` builds the common parameters used for weather data retrieval, including latitude, longitude, units, mode, and the API key.
+# 
+# `responseFormatter` picks the formatter of the timestamps: `utcFormatter`, or with `localTime` the one for the `timezone` / `city.timezone` offset of the response (`TimestampFormatter.forResponse` in `weatherTime.py`). The hourly, daily and 3-hour forecast classes take `localTime=True` to give local times; by default they stay in UTC.
 # 
 # ##### `currentWeather`
 # 
 # - This method retrieves the current weather data for the specified location.
-# - The retrieved data is processed and returned as a dictionary containing weather details.
+# - The retrieved data is processed by `processCurrentWeather` and returned as a dictionary containing weather details.
 # - The processed data includes information on location, country, weather condition, main features, visibility, wind, and clouds.
+# - `processCurrentWeatherRecord` builds a compact `CurrentWeatherRecord` (see `weatherRecords.py`) from the same response instead, without modifying it.
 
 # In[9]:
 
 
-commonParameters: dict = {
-    "lat": latitude,
-    "lon": longitude,
-    "units": "metric",
-    "mode": "json",
-    "appId": apiKey
-}
+def buildCommonParameters(latitude: float, longitude: float) -> dict:
+    commonParameters: dict = {
+        "lat": latitude,
+        "lon": longitude,
+        "units": "metric",
+        "mode": "json",
+        "appId": apiKey
+    }
+    return commonParameters
+
+
+def responseFormatter(payload: dict, localTime: bool):
+    from weatherTime import TimestampFormatter, utcFormatter
+
+    return TimestampFormatter.forResponse(payload) if localTime else utcFormatter
+
 
 class CurrentWeather:
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None):
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
         
+    def currentWeatherRequest(self) -> dict:
+        currentEndpoint: str = "/data/2.5/weather"
+        currentExtraParameters: dict = buildCommonParameters(self.latitude, self.longitude)
+        return {
+            "endpoint": currentEndpoint,
+            "baseUrl": "http://pro.openweathermap.org",
+            "extraParameters": currentExtraParameters
+        }
+
     def currentWeather(self) -> dict:
         try:
-            currentEndpoint: str = "/data/2.5/weather"
-            currentExtraParameters: dict = commonParameters
-
-            current: dict = constructUrl(
-                currentEndpoint,
-                baseUrl="http://pro.openweathermap.org",
-                extraParameters=currentExtraParameters
-            )
-
-            current["country"] = current["sys"]
-            current["condition"] = current["weather"]
-            current["mainFeatures"] = current["main"]
-
-            currentKeys: list = ["name", "country", "condition",
-                           "mainFeatures", "visibility", "wind", "clouds"]
-
-            currentWeatherData: dict = {
-                key: current[key] if key != "country" and key != "condition" else
-                (current["condition"][0]["main"] + " - " + current["condition"][0]["description"] if key == "condition"
-                 else current["country"]["country"])
-                for key in currentKeys
-            }
-            
-            return currentWeatherData
+            current: dict = constructUrl(**self.currentWeatherRequest(), transport=self.transport)
+            return self.processCurrentWeather(current)
         except Exception as e:
             print(f"Error getting current weather condition: {e}")
             return None
 
+    def processCurrentWeather(self, current: dict) -> dict:
+        current["country"] = current["sys"]
+        current["condition"] = current["weather"]
+        current["mainFeatures"] = current["main"]
 
-current_weather_instance: CurrentWeather = CurrentWeather(latitude, longitude)
-current_weather_data: dict = current_weather_instance.currentWeather()
+        currentKeys: list = ["name", "country", "condition",
+                       "mainFeatures", "visibility", "wind", "clouds"]
+
+        currentWeatherData: dict = {
+            key: current[key] if key != "country" and key != "condition" else
+            (current["condition"][0]["main"] + " - " + current["condition"][0]["description"] if key == "condition"
+             else current["country"]["country"])
+            for key in currentKeys
+        }
+        
+        return currentWeatherData
+
+    def processCurrentWeatherRecord(self, current: dict):
+        from weatherRecords import CurrentWeatherRecord
+
+        return CurrentWeatherRecord(
+            current.get("dt"),
+            current["name"],
+            current["sys"]["country"],
+            current["weather"][0]["main"] + " - " + current["weather"][0]["description"],
+            current["main"],
+            current["visibility"],
+            current["wind"],
+            current["clouds"]["all"]
+        )
 
 
 # ## Guide for Hourly Weather Forecast Data Retrieval
@@ -496,54 +622,91 @@ current_weather_data: dict = current_weather_instance.currentWeather()
 # - This method retrieves hourly weather forecast data for the specified location.
 # - Each dictionary includes information on date and time, temperature, and weather condition.
 # - The code limits the forecast to the next 25 hours.
+# - The raw response is processed by `processHourlyForecast`.
+# 
+# ##### `iterHourlyForecast`
+# 
+# - Reads the raw response in a single pass and yields one `HourlyPoint` (see `weatherRecords.py`) per hour, without modifying the response. `processHourlyForecast` converts them with `to_dict`.
+# - `streamHourlyForecast` yields the same records while the response is still arriving, and stops reading after the 25th hour.
+# 
+# ##### `hourlyForecastDelta`
+# 
+# - The incremental mode for repeated polls: returns a `ForecastDelta` (see `weatherIncremental.py`) with only the hours that are new or changed since the previous call on the same instance, and the times of the ones that dropped out of the 25 hours. `processHourlyForecastDelta` does the same for a response that was already fetched.
 
 # In[10]:
 
 
 class HourlyWeatherForecast:
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None, localTime: bool = False):
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
+        self.localTime: bool = localTime
+        self.forecastTracker = None
         
+    def hourlyForecastRequest(self) -> dict:
+        hourlyForecastEndpoint: str = "/data/2.5/forecast/hourly"
+        hourlyForecastExtraParameters: dict = buildCommonParameters(self.latitude, self.longitude)
+        return {
+            "endpoint": hourlyForecastEndpoint,
+            "baseUrl": "http://pro.openweathermap.org",
+            "extraParameters": hourlyForecastExtraParameters
+        }
+
     def hourlyForecast(self) -> list:
         try:
-            hourlyForecastEndpoint: str = "/data/2.5/forecast/hourly"
-            hourlyForecastExtraParameters: dict = commonParameters
-            hourlyForecastData: dict = constructUrl(
-                hourlyForecastEndpoint,
-                baseUrl="http://pro.openweathermap.org",
-                extraParameters=hourlyForecastExtraParameters
+            hourlyForecastData: dict = constructUrl(**self.hourlyForecastRequest(), transport=self.transport)
+            return self.processHourlyForecast(hourlyForecastData)
+        except Exception as e:
+            print(f"Error getting hourly weather forecast: {e}")
+            return None
+
+    def iterHourlyForecast(self, hourlyForecastData: dict):
+        from itertools import islice
+        from weatherRecords import HourlyPoint
+
+        for forecastData in islice(hourlyForecastData["list"], 25):
+            weatherCondition: dict = forecastData.get("weather", [{}])[0]
+            yield HourlyPoint(
+                forecastData["dt"],
+                forecastData.get("main", {}).get("temp"),
+                weatherCondition.get("main", "") + " - " + weatherCondition.get("description", "")
             )
 
-            hourlyForecastList: list = hourlyForecastData["list"][:25]
-            hourlyForecastList[0]["Temperature"]: dict = hourlyForecastList[0]["main"]
-            hourlyForecastList[0]["weatherCondition"]: dict = hourlyForecastList[0]["weather"]
-
-            hourlyForecastKeys: list = ["dt_txt", "Temperature", "weatherCondition"]
-            hourlyForecastedWeatherData: list = []
-
-            for forecastData in hourlyForecastList:
-                weatherInfo: dict = {
-                    key: (
-                        forecastData.get("Temperature", {}).get("temp") if key == "Temperature" else
-                        (
-                            forecastData.get("weatherCondition", [{}])[0].get("main", "") +
-                            " - " +
-                            forecastData.get("weatherCondition", [{}])[0].get("description", "")
-                        ) if key == "weatherCondition" else
-                        forecastData.get(key)
-                    )
-                    for key in hourlyForecastKeys
-                }
-                hourlyForecastedWeatherData.append(weatherInfo)
-                
-            return hourlyForecastedWeatherData
+    def processHourlyForecast(self, hourlyForecastData: dict) -> list:
+        formatter = responseFormatter(hourlyForecastData, self.localTime)
+        return [point.to_dict(formatter) for point in self.iterHourlyForecast(hourlyForecastData)]
+
+    def hourlyForecastDelta(self):
+        try:
+            hourlyForecastData: dict = constructUrl(**self.hourlyForecastRequest(), transport=self.transport)
+            return self.processHourlyForecastDelta(hourlyForecastData)
         except Exception as e:
-            print(f"Error getting hourly weather forecast: {e}")
+            print(f"Error refreshing hourly weather forecast: {e}")
             return None
 
-hourly_forecast_instance: HourlyWeatherForecast = HourlyWeatherForecast(latitude, longitude)
-hourly_forecast_data: list = hourly_forecast_instance.hourlyForecast()
+    def processHourlyForecastDelta(self, hourlyForecastData: dict):
+        from itertools import islice
+        from weatherIncremental import ForecastTracker
+
+        if self.forecastTracker is None:
+            self.forecastTracker = ForecastTracker(lambda entries: self.processHourlyForecast({"list": entries}))
+        formatter = responseFormatter(hourlyForecastData, self.localTime)
+        return self.forecastTracker.update(
+            islice(hourlyForecastData["list"], 25),
+            lambda entries: [point.to_dict(formatter) for point in self.iterHourlyForecast({"list": entries})],
+            formatter
+        )
+
+    def streamHourlyForecast(self):
+        from weatherStreaming import streamConstructUrl
+
+        hourlyForecastStream = streamConstructUrl(**self.hourlyForecastRequest(), transport=self.transport)
+        if hourlyForecastStream is None:
+            return
+
+        with hourlyForecastStream:
+            yield from self.iterHourlyForecast({"list": hourlyForecastStream})
 
 
 # ## Guide for Daily Weather Forecast Data Retrieval
@@ -555,58 +718,63 @@ hourly_forecast_data: list = hourly_forecast_instance.hourlyForecast()
 # - This method retrieves daily weather forecast data for the specified location.
 # - Each dictionary includes information on the date, daytime and nighttime temperatures, and weather condition.
 # - The code fetches forecasts for the next 7 days.
+# - The raw response is processed by `processDailyForecast`.
+# 
+# ##### `iterDailyForecast`
+# 
+# - Reads the raw response in a single pass and yields one `DailyPoint` per day, without modifying the response. `processDailyForecast` converts them with `to_dict`.
 
 # In[11]:
 
 
 class DailyWeatherForecast:
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None, localTime: bool = False):
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
+        self.localTime: bool = localTime
+
+    def dailyForecastRequest(self) -> dict:
+        dailyForecastEndpoint: str = "/data/2.5/forecast/daily"
+        dailyForecastExtraParameters: dict = {
+            "lat": self.latitude,
+            "lon": self.longitude,
+            "cnt": 7
+        }
+        return {
+            "endpoint": dailyForecastEndpoint,
+            "baseUrl": "http://pro.openweathermap.org",
+            "extraParameters": dailyForecastExtraParameters
+        }
 
     def dailyForecast(self) -> list:
         try:
-            dailyForecastEndpoint: str = "/data/2.5/forecast/daily"
-            dailyForecastExtraParameters: dict = {
-                "lat": self.latitude,
-                "lon": self.longitude,
-                "cnt": 7
-            }
-
-            dailyForecastData: dict = constructUrl(
-                endpoint=dailyForecastEndpoint,
-                baseUrl="http://pro.openweathermap.org",
-                extraParameters=dailyForecastExtraParameters
-            )
-
-            if not dailyForecastData:
-                return None
-
-            dailyForecasts: list = dailyForecastData["list"]
-            dailyForecastedWeather: list = []
-
-            for forecast in dailyForecasts:
-                weatherInfo: dict = {
-                    "date": datetime.utcfromtimestamp(forecast["dt"]).strftime('%Y-%m-%d'),
-                    "temperature": {
-                        "day": forecast["temp"]["day"],
-                        "night": forecast["temp"]["night"],
-                    },
-                    "weather": {
-                        "main": forecast["weather"][0]["main"],
-                        "description": forecast["weather"][0]["description"],
-                    }
-                }
-                dailyForecastedWeather.append(weatherInfo)
-
-            return dailyForecastedWeather
+            dailyForecastData: dict = constructUrl(**self.dailyForecastRequest(), transport=self.transport)
+            return self.processDailyForecast(dailyForecastData)
 
         except Exception as e:
             print(f"Error getting daily weather forecast: {e}")
             return None
 
-daily_forecast_instance: DailyWeatherForecast = DailyWeatherForecast(latitude, longitude)
-daily_forecast_data: list = daily_forecast_instance.dailyForecast()
+    def iterDailyForecast(self, dailyForecastData: dict):
+        from weatherRecords import DailyPoint
+
+        for forecast in dailyForecastData["list"]:
+            weather: dict = forecast["weather"][0]
+            yield DailyPoint(
+                forecast["dt"],
+                forecast["temp"]["day"],
+                forecast["temp"]["night"],
+                weather["main"],
+                weather["description"]
+            )
+
+    def processDailyForecast(self, dailyForecastData: dict) -> list:
+        if not dailyForecastData:
+            return None
+
+        formatter = responseFormatter(dailyForecastData, self.localTime)
+        return [point.to_dict(formatter) for point in self.iterDailyForecast(dailyForecastData)]
 
 
 # ## Guide for 5-Days 3-Hours Weather Forecast Data Retrieval
@@ -621,29 +789,48 @@ daily_forecast_data: list = daily_forecast_instance.dailyForecast()
 # ##### `processForecastedData`
 # 
 # - This method processes the raw forecast data obtained from the API.
-# - It also renames dictionary keys for clarity.
+# - It returns one dictionary per step with the keys `dateTime`, `temperature` and `condition`.
+# - `dateTime` is formatted with the given `formatter`, else with the one of the last response fetched by `fiveDaysThreeHoursForcast` (local time with `localTime=True`), else in UTC.
+# 
+# ##### `iterForecastedData`
+# 
+# - Reads the forecast list in a single pass and yields one `ThreeHourPoint` per step, without modifying the list. The timestamp stays an integer until `to_dict` formats it.
+# - `streamForecastedData` yields the same records while the response is still arriving.
 # 
 # ##### `getForecastedData`
 # 
 # - This method retrieves and processes the 5-days 3-hours weather forecast data.
+# 
+# ##### `forecastedDataDelta`
+# 
+# - The incremental mode for repeated polls: returns a `ForecastDelta` (see `weatherIncremental.py`) with only the steps that are new or changed since the previous call on the same instance, and the times of the expired ones. `processForecastedDataDelta` does the same for a forecast list that was already fetched.
 
 # In[12]:
 
 
 class FiveDaysThreeHoursWeatherForecast:
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, transport=None, localTime: bool = False):
         self.latitude: float = latitude
         self.longitude: float = longitude
+        self.transport = transport
+        self.localTime: bool = localTime
+        # The formatter of the last fetched response; processForecastedData only gets its list
+        self.forecastFormatter = None
+        self.forecastTracker = None
         
+    def fiveDaysThreeHoursForcastRequest(self) -> dict:
+        fiveDaysThreeHoursForcastEndpoint: str = "/data/2.5/forecast"
+        fiveDaysThreeHoursForcastExtraParameters: dict = buildCommonParameters(self.latitude, self.longitude)
+        return {
+            "endpoint": fiveDaysThreeHoursForcastEndpoint,
+            "baseUrl": "http://pro.openweathermap.org",
+            "extraParameters": fiveDaysThreeHoursForcastExtraParameters
+        }
+
     def fiveDaysThreeHoursForcast(self) -> list:
         try:
-            fiveDaysThreeHoursForcastEndpoint: str = "/data/2.5/forecast"
-            fiveDaysThreeHoursForcastExtraParameters: dict = commonParameters
-            fiveDaysThreeHoursForcast: dict = constructUrl(
-                endpoint=fiveDaysThreeHoursForcastEndpoint,
-                baseUrl="http://pro.openweathermap.org",
-                extraParameters=fiveDaysThreeHoursForcastExtraParameters
-            )
+            fiveDaysThreeHoursForcast: dict = constructUrl(**self.fiveDaysThreeHoursForcastRequest(), transport=self.transport)
+            self.forecastFormatter = responseFormatter(fiveDaysThreeHoursForcast, self.localTime)
 
             return fiveDaysThreeHoursForcast["list"] if fiveDaysThreeHoursForcast else []
 
@@ -651,58 +838,61 @@ class FiveDaysThreeHoursWeatherForecast:
             print(f"Error retrieving 5-days 3-hours weather forecast data: {e}")
             return []
         
-    def processForecastedData(self, forecastList: list) -> list:
-        processedForecast: list = []
+    def iterForecastedData(self, forecastList: list):
+        from weatherRecords import ThreeHourPoint
 
         for forecastData in forecastList:
-            forecastData['dt'] = datetime.utcfromtimestamp(forecastData['dt']).strftime('%Y-%m-%d %H:%M:%S')
-
-            forecastKeys: list = ["dt", "main", "weather"]
-            weatherInfo: dict = {}
-
-            for key in forecastKeys:
-                if key == "main" and 'temp' in forecastData['main']:
-                    weatherInfo[key] = forecastData['main']['temp']
-                elif key == "weather":
-                    weatherInfo[key] = (
-                        forecastData.get("weather", [{}])[0].get("main", "") +
-                        " - " +
-                        forecastData.get("weather", [{}])[0].get("description", "")
-                    )
-                else:
-                    weatherInfo[key] = forecastData.get(key)
-
-            processedForecast.append(weatherInfo)
-
-        for entry in processedForecast:
-            dtString: str = entry['dt']
-            dtObject: datetime = datetime.strptime(dtString, '%Y-%m-%d %H:%M:%S')
-            entry['dt'] = dtObject.strftime('%Y-%m-%d %H:%M:%S')
-
-            keyMapping: dict = {
-                'dt': 'dateTime',
-                'main': 'temperature',
-                'weather': 'condition'
-            }
-        
-        processedForecast: list = [
-            {keyMapping.get(key, key): value for key, value in entry.items()}
-            for entry in processedForecast
-        ]
+            main: dict = forecastData['main']
+            weather: dict = forecastData.get("weather", [{}])[0]
+            yield ThreeHourPoint(
+                forecastData['dt'],
+                main['temp'] if 'temp' in main else main,
+                weather.get("main", "") + " - " + weather.get("description", "")
+            )
 
-        return processedForecast
+    def processForecastedData(self, forecastList: list, formatter=None) -> list:
+        formatter = formatter or self.forecastFormatter or responseFormatter(None, False)
+        return [point.to_dict(formatter) for point in self.iterForecastedData(forecastList)]
+
+    def streamForecastedData(self):
+        from weatherStreaming import streamConstructUrl
+
+        forecastStream = streamConstructUrl(**self.fiveDaysThreeHoursForcastRequest(), transport=self.transport)
+        if forecastStream is None:
+            return
+
+        with forecastStream:
+            yield from self.iterForecastedData(forecastStream)
 
     def getForecastedData(self) -> list:
         forecastData: list = self.fiveDaysThreeHoursForcast()
         processedForecast: list = self.processForecastedData(forecastData)
         return processedForecast
 
-forecast_instance: FiveDaysThreeHoursWeatherForecast = FiveDaysThreeHoursWeatherForecast(latitude, longitude)
-five_days_three_hours_forecast_data: list = forecast_instance.getForecastedData()
+    def forecastedDataDelta(self):
+        try:
+            # Not through fiveDaysThreeHoursForcast: its empty list on errors would remove every entry
+            fiveDaysThreeHoursForcast: dict = constructUrl(**self.fiveDaysThreeHoursForcastRequest(), transport=self.transport)
+            if not fiveDaysThreeHoursForcast:
+                return None
+            return self.processForecastedDataDelta(fiveDaysThreeHoursForcast["list"], responseFormatter(fiveDaysThreeHoursForcast, self.localTime))
+        except Exception as e:
+            print(f"Error refreshing 5-days 3-hours weather forecast data: {e}")
+            return None
 
+    def processForecastedDataDelta(self, forecastList: list, formatter=None):
+        from weatherIncremental import ForecastTracker
 
-# In[ ]:
+        formatter = formatter or self.forecastFormatter or responseFormatter(None, False)
+        if self.forecastTracker is None:
+            self.forecastTracker = ForecastTracker(self.processForecastedData)
+        return self.forecastTracker.update(forecastList, lambda entries: self.processForecastedData(entries, formatter), formatter)
 
 
+# In[ ]:
 
 
+if __name__ == "__main__":
+    from weatherForcastingCli import main
+
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Geocoding Cache
+#
+# A city's coordinates never change, so `GeocodeCache` stores every `/geo/1.0/direct` result on disk in SQLite (`geocodeCache.db`, next to `cities.db`) with an in-process LRU layer on top. Pass it to `GeolocationDataFetcher(cache=...)` and repeated lookups never reach the API.
+#
+# ##### `normalizeCityQuery` / `normalizeCityEntry`
+#
+# - `normalizeCityQuery` case-folds the query and strips accents and extra whitespace: "Yaoundé, CM" and "yaounde,cm" both give "yaounde,cm". It is the cache key, so a "-CC" suffix is kept as it is: "Phoenix-AZ" of `USStates` (Arizona) must not share a row with the country query "Phoenix,AZ" (Azerbaijan).
+# - `normalizeCityEntry` also writes a trailing "-CC" code as ",cc" ("Yaoundé-CM" gives "yaounde,cm"), for matching typed entries against `cities.db` (`findLocation`, `CitySearchIndex.search`).
+#
+# ##### `GeocodeCache(databasePath, lruSize)`
+#
+# - `get` returns the cached geolocation dictionary or `None`; `put` stores one. Failed lookups are never cached.
+# - `locations` returns the distinct (name, country, lat, lon) rows, for `LocationIndex` (see `weatherLocationIndex.py`).
+# - `metrics` returns the lookup count, memory and disk hits, misses, the hit rate and the average lookup latency in milliseconds.
+#
+# ##### `prewarmGeocodeCache`
+#
+# - Geocodes every row of the given `cities.db` tables (by default `world` and `USStates`) that is not cached yet, on a small thread pool. Each result is stored under the geocoder query of its row (`geocodeQuery`, e.g. "Montgomery,AL,US"), which is also what the batch runner, the backfill and the refresher look up.
+#
+# From the command line: `python weatherGeocodeCache.py prewarm [--tables world USStates]` or `python weatherGeocodeCache.py stats`; `stats` looks every row of the tables up once and prints `metrics()` (the hit rate is the share of rows already cached) and the entry count.
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from weatherCities import citiesDatabasePath, geocodeQuery, loadCities
+
+geocodeCachePath: str = os.path.join(os.path.dirname(citiesDatabasePath), "geocodeCache.db")
+
+countrySuffix = re.compile(r"\s*-\s*([a-z]{2})$")
+
+
+def normalizeCityQuery(query: str) -> str:
+    decomposed: str = unicodedata.normalize("NFKD", query)
+    stripped: str = "".join(character for character in decomposed if not unicodedata.combining(character))
+    normalized: str = " ".join(stripped.casefold().split())
+    return ",".join(part.strip() for part in normalized.split(","))
+
+
+def normalizeCityEntry(query: str) -> str:
+    return normalizeCityQuery(countrySuffix.sub(r",\1", normalizeCityQuery(query)))
+
+
+class GeocodeCache:
+    def __init__(self, databasePath: str = geocodeCachePath, lruSize: int = 4096):
+        self.databasePath: str = databasePath
+        self.lruSize: int = lruSize
+        self.memory: OrderedDict = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+
+        self.lookups: int = 0
+        self.memoryHits: int = 0
+        self.diskHits: int = 0
+        self.lookupSeconds: float = 0.0
+
+        self.connection: sqlite3.Connection = sqlite3.connect(databasePath, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                query TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                country TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                fetchedAt INTEGER NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def remember(self, key: str, geolocationData: dict) -> None:
+        self.memory[key] = geolocationData
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.lruSize:
+            self.memory.popitem(last=False)
+
+    def get(self, query: str) -> dict:
+        start: float = time.perf_counter()
+        key: str = normalizeCityQuery(query)
+
+        with self.lock:
+            self.lookups += 1
+            try:
+                if key in self.memory:
+                    self.memoryHits += 1
+                    self.memory.move_to_end(key)
+                    return dict(self.memory[key])
+
+                row = self.connection.execute(
+                    "SELECT name, country, lat, lon FROM geocodes WHERE query = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                self.diskHits += 1
+                geolocationData: dict = dict(zip(("name", "country", "lat", "lon"), row))
+                self.remember(key, geolocationData)
+                return dict(geolocationData)
+            finally:
+                self.lookupSeconds += time.perf_counter() - start
+
+    def put(self, query: str, geolocationData: dict) -> None:
+        if not geolocationData:
+            return
+
+        key: str = normalizeCityQuery(query)
+        record: dict = {field: geolocationData[field] for field in ("name", "country", "lat", "lon")}
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO geocodes (query, name, country, lat, lon, fetchedAt) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, record["name"], record["country"], record["lat"], record["lon"], int(time.time()))
+            )
+            self.connection.commit()
+            self.remember(key, record)
+
+    def __contains__(self, query: str) -> bool:
+        key: str = normalizeCityQuery(query)
+        with self.lock:
+            if key in self.memory:
+                return True
+            return self.connection.execute("SELECT 1 FROM geocodes WHERE query = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def locations(self) -> list:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT DISTINCT name, country, lat, lon FROM geocodes ORDER BY name, country"
+            ).fetchall()
+
+    def metrics(self) -> dict:
+        with self.lock:
+            hits: int = self.memoryHits + self.diskHits
+            return {
+                "lookups": self.lookups,
+                "memoryHits": self.memoryHits,
+                "diskHits": self.diskHits,
+                "misses": self.lookups - hits,
+                "hitRate": hits / self.lookups if self.lookups else 0.0,
+                "averageLookupMs": self.lookupSeconds * 1000 / self.lookups if self.lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def prewarmGeocodeCache(cache: GeocodeCache, tables: tuple = ("world", "USStates"), transport=None, maxWorkers: int = 4) -> dict:
+    from weatherForcastingProject import GeolocationDataFetcher
+
+    cities: list = [city for table in tables for city in loadCities(table=table)]
+    queries: list = [geocodeQuery(city["entry"], city["table"]) for city in cities]
+    missing: list = [query for query in dict.fromkeys(queries) if query not in cache]
+    fetcher: GeolocationDataFetcher = GeolocationDataFetcher(transport)
+
+    def geocode(query: str) -> bool:
+        geolocationData: dict = fetcher.getGeolocationData(query)
+        if not geolocationData:
+            return False
+        cache.put(query, geolocationData)
+        return True
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        results: list = list(executor.map(geocode, missing))
+
+    return {"cities": len(cities), "queries": len(set(queries)), "alreadyCached": len(set(queries)) - len(missing),
+            "geocoded": sum(results), "failed": len(results) - sum(results)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the on-disk geocoding cache.")
+    parser.add_argument("command", choices=["prewarm", "stats"])
+    parser.add_argument("--tables", nargs="+", default=["world", "USStates"])
+    parser.add_argument("--database", default=geocodeCachePath)
+    parser.add_argument("--workers", type=int, default=4)
+    arguments = parser.parse_args()
+
+    cache: GeocodeCache = GeocodeCache(arguments.database)
+    if arguments.command == "prewarm":
+        print(prewarmGeocodeCache(cache, tuple(arguments.tables), maxWorkers=arguments.workers))
+    else:
+        # Look every row up once, so the metrics give the coverage of the tables and the lookup latency
+        for table in arguments.tables:
+            for city in loadCities(table=table):
+                cache.get(geocodeQuery(city["entry"], table))
+        print(cache.metrics())
+    print(f"{len(cache)} cached geocodes in {arguments.database}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Incremental Forecast Refresh
+#
+# Two polls of the same forecast a few minutes (or one step) apart mostly return the same entries: the list moves forward by one step, the entry that has passed drops out at the front and a new one is appended at the end. `ForecastTracker` keeps the entries of the previous poll keyed by their `dt`, so a refresh only processes the entries that are new or whose raw data changed, and reports the difference as a `ForecastDelta`.
+#
+# - Entries are compared by a signature of the fields their processing reads (`forecastSignature`: temperature and condition, `airQualitySignature`: index and components), which is much cheaper than comparing whole entries or processing them. An entry with the same signature as in the previous poll is not processed again; a changed one is processed, and reported only if its processed result differs.
+# - Entries whose `dt` is no longer in the list (expired, or out of the processed window) are dropped from the tracker and reported as removed.
+# - A `dt` listed twice in one response is tracked once, with its last entry.
+# - `current()` always gives the same list as processing the whole latest response, in its order.
+#
+# ##### `ForecastDelta`
+#
+# - `added` and `changed` hold processed entries, in the order of the response; `removed` holds the formatted times ("YYYY-MM-DD HH:MM:SS", UTC or, for classes created with `localTime=True`, the local time of the response) of the dropped entries, which is the `dateTime` / `dt_txt` of the entries a subscriber already has.
+# - `to_dict()` gives `{"added": [...], "changed": [...], "removed": [...]}` to push downstream; a delta is false when nothing changed.
+#
+# ##### Usage
+#
+# - The incremental methods of the fetch classes, `processHourlyForecastDelta`, `processForecastedDataDelta` and `processAirPollutionForecastDelta` (and `hourlyForecastDelta`, `forecastedDataDelta`, `airPollutionForecastDelta`, which fetch first), keep one tracker per instance: keep the instance between polls of a location. The first call reports every entry as added.
+
+from weatherTime import utcFormatter
+
+
+def forecastSignature(entry: dict) -> tuple:
+    main: dict = entry.get("main", {})
+    weather: dict = entry.get("weather", [{}])[0]
+    return main.get("temp", main), weather.get("main"), weather.get("description")
+
+
+def airQualitySignature(entry: dict) -> tuple:
+    return entry.get("main"), entry.get("components")
+
+
+class ForecastDelta:
+    __slots__ = ("added", "changed", "removed")
+
+    def __init__(self, added: list, changed: list, removed: list):
+        self.added: list = added
+        self.changed: list = changed
+        self.removed: list = removed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self) -> str:
+        return f"ForecastDelta(added={len(self.added)}, changed={len(self.changed)}, removed={len(self.removed)})"
+
+    def to_dict(self) -> dict:
+        return {"added": self.added, "changed": self.changed, "removed": self.removed}
+
+
+class ForecastTracker:
+    def __init__(self, process, signature=forecastSignature):
+        # process(entries) processes a list of raw entries and returns their results in the same order
+        self.process = process
+        self.signature = signature
+        # dt -> (signature, processed entry)
+        self.entries: dict = {}
+
+    def update(self, entries, process=None, formatter=utcFormatter) -> ForecastDelta:
+        # process overrides the tracker's one for this update; formatter formats the times of the removed entries
+        previous: dict = self.entries
+        current: dict = {}
+        pending: list = []
+        signature = self.signature
+
+        # A timestamp listed twice keeps its last entry, so every timestamp is processed and stored once
+        for entry in {entry["dt"]: entry for entry in entries}.values():
+            timestamp: int = entry["dt"]
+            known: tuple = previous.get(timestamp)
+            entrySignature: tuple = signature(entry)
+            if known is not None and known[0] == entrySignature:
+                current[timestamp] = known
+            else:
+                current[timestamp] = entrySignature
+                pending.append(entry)
+
+        added: list = []
+        changed: list = []
+        for entry, processed in zip(pending, (process or self.process)(pending) if pending else ()):
+            timestamp = entry["dt"]
+            known = previous.get(timestamp)
+            current[timestamp] = (current[timestamp], processed)
+            if known is None:
+                added.append(processed)
+            elif known[1] != processed:
+                changed.append(processed)
+
+        removed: list = [formatter.format(timestamp) for timestamp in previous if timestamp not in current]
+        self.entries = current
+        return ForecastDelta(added, changed, removed)
+
+    def current(self) -> list:
+        return [processed for _, processed in self.entries.values()]
+
+    def clear(self) -> None:
+        self.entries = {}
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Location Index
+#
+# `LocationIndex` answers "which known location is nearest to (lat, lon)" and "which known locations are within R km" in memory, without a geocoding call. It is built over every geocoded city in the geocode cache; `prewarmGeocodeCache` (see `weatherGeocodeCache.py`) fills it with every row of `cities.db`, whose own `latitude` and `longitude` columns are only copies of the cache (see `buildCitiesDatabase` in `weatherCities.py`).
+#
+# - The locations are bucketed into a grid of `cellDegrees` × `cellDegrees` cells (by default sized for about four locations per cell) and sorted by cell, so the candidates of a query are a few contiguous slices of NumPy arrays. Distances are great-circle (haversine) distances in kilometres.
+# - Queries across the ±180° meridian and near the poles are handled.
+#
+# ##### `LocationIndex.fromGeocodeCache(cache)`
+#
+# - Builds the index from the distinct locations of a `GeocodeCache` (each city is cached under two queries but indexed once).
+#
+# ##### `nearest(latitude, longitude, maxDistanceKm=None)` / `withinRadius(latitude, longitude, radiusKm)`
+#
+# - `nearest` returns a (`Geolocation`, distance) pair, or `None` when the index is empty or nothing is closer than `maxDistanceKm`.
+# - `withinRadius` returns every (`Geolocation`, distance) pair within `radiusKm`, nearest first.
+#
+# ##### `snapCoordinates(latitude, longitude, maxDistanceKm)`
+#
+# - Returns the coordinates of the nearest known location if it is within `maxDistanceKm`, otherwise the given ones. Snapping only pays off when the calls are made through a shared response cache (`CachingTransport`, see `weatherResponseCache.py`), where the snapped coordinates hit the entries of the geocoded city instead of calling the API again.
+
+import math
+
+import numpy as np
+
+from weatherRecords import Geolocation
+
+earthRadiusKm: float = 6371.0088
+kmPerDegree: float = math.pi * earthRadiusKm / 180
+
+
+def haversineKm(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    latitudeRadians: float = math.radians(latitude)
+    latitudesRadians: np.ndarray = np.radians(latitudes)
+    a: np.ndarray = (
+        np.sin((latitudesRadians - latitudeRadians) / 2) ** 2
+        + math.cos(latitudeRadians) * np.cos(latitudesRadians) * np.sin(np.radians(longitudes - longitude) / 2) ** 2
+    )
+    return 2 * earthRadiusKm * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def automaticCellDegrees(count: int) -> float:
+    # About four locations per cell on average (the sphere is ~41,253 square degrees), between 0.25 and 15 degrees
+    return float(min(15.0, max(0.25, math.sqrt(41253 * 4 / max(count, 1)))))
+
+
+class LocationIndex:
+    def __init__(self, locations: list, cellDegrees: float = None):
+        self.cellDegrees: float = cellDegrees or automaticCellDegrees(len(locations))
+        self.latitudeCells: int = math.ceil(180 / self.cellDegrees) + 1
+        self.longitudeCells: int = math.ceil(360 / self.cellDegrees)
+
+        latitudes: np.ndarray = np.array([location.latitude for location in locations], dtype=np.float64)
+        longitudes: np.ndarray = np.array([location.longitude for location in locations], dtype=np.float64)
+        cellIds: np.ndarray = self.cellIdOf(latitudes, longitudes)
+        order: np.ndarray = np.argsort(cellIds, kind="stable")
+
+        self.locations: list = [locations[index] for index in order]
+        self.latitudes: np.ndarray = latitudes[order]
+        self.longitudes: np.ndarray = longitudes[order]
+        self.cellIds: np.ndarray = cellIds[order]
+
+    @classmethod
+    def fromGeocodeCache(cls, cache, cellDegrees: float = None) -> "LocationIndex":
+        return cls([Geolocation(*row) for row in cache.locations()], cellDegrees)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def latitudeCell(self, latitude):
+        return np.floor((np.asarray(latitude) + 90) / self.cellDegrees).astype(np.int64)
+
+    def longitudeCell(self, longitude):
+        return np.floor(((np.asarray(longitude) + 180) % 360) / self.cellDegrees).astype(np.int64) % self.longitudeCells
+
+    def cellIdOf(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        return self.latitudeCell(latitudes) * self.longitudeCells + self.longitudeCell(longitudes)
+
+    def candidates(self, latitude: float, longitude: float, radiusKm: float) -> np.ndarray:
+        radiusDegrees: float = radiusKm / kmPerDegree
+        latitudeMin: float = max(latitude - radiusDegrees, -90.0)
+        latitudeMax: float = min(latitude + radiusDegrees, 90.0)
+
+        # Longitude half-width of the smallest box around the circle; the whole band if it reaches a pole
+        if latitudeMin <= -90 or latitudeMax >= 90 or radiusDegrees >= 90:
+            longitudeRanges: list = [(0, self.longitudeCells - 1)]
+        else:
+            halfWidth: float = math.degrees(math.asin(min(1.0, math.sin(math.radians(radiusDegrees)) / math.cos(math.radians(latitude)))))
+            if halfWidth >= 180 - self.cellDegrees:
+                longitudeRanges = [(0, self.longitudeCells - 1)]
+            else:
+                first: int = int(self.longitudeCell(longitude - halfWidth))
+                last: int = int(self.longitudeCell(longitude + halfWidth))
+                longitudeRanges = [(first, last)] if first <= last else [(first, self.longitudeCells - 1), (0, last)]
+
+        rowStarts: np.ndarray = np.arange(int(self.latitudeCell(latitudeMin)), int(self.latitudeCell(latitudeMax)) + 1) * self.longitudeCells
+        slices: list = []
+        for first, last in longitudeRanges:
+            starts: np.ndarray = np.searchsorted(self.cellIds, rowStarts + first, side="left")
+            stops: np.ndarray = np.searchsorted(self.cellIds, rowStarts + last, side="right")
+            slices.extend(np.arange(start, stop) for start, stop in zip(starts.tolist(), stops.tolist()) if start < stop)
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def withinRadius(self, latitude: float, longitude: float, radiusKm: float) -> list:
+        candidates: np.ndarray = self.candidates(latitude, longitude, radiusKm)
+        distances: np.ndarray = haversineKm(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        inside: np.ndarray = distances <= radiusKm
+        candidates, distances = candidates[inside], distances[inside]
+        order: np.ndarray = np.argsort(distances, kind="stable")
+        return [(self.locations[candidates[index]], float(distances[index])) for index in order]
+
+    def nearest(self, latitude: float, longitude: float, maxDistanceKm: float = None) -> tuple:
+        if not self.locations:
+            return None
+
+        # Widen the search until something is found; every location within the radius is a candidate, so the closest one is exact
+        radiusKm: float = self.cellDegrees * kmPerDegree
+        while True:
+            if maxDistanceKm is not None:
+                radiusKm = min(radiusKm, maxDistanceKm)
+            found: list = self.withinRadius(latitude, longitude, radiusKm)
+            if found:
+                return found[0]
+            if (maxDistanceKm is not None and radiusKm >= maxDistanceKm) or radiusKm >= math.pi * earthRadiusKm:
+                return None
+            radiusKm *= 4
+
+    def snapCoordinates(self, latitude: float, longitude: float, maxDistanceKm: float = 10.0) -> tuple:
+        match: tuple = self.nearest(latitude, longitude, maxDistanceKm)
+        if match is None:
+            return latitude, longitude
+        return match[0].latitude, match[0].longitude
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Instrumentation and Metrics
+#
+# `enableInstrumentation` wraps `constructUrl`, `streamConstructUrl`, `asyncConstructUrl`, the request, body and decode steps of `HttpTransport` and `AsyncHttpTransport` and every `process...` method of the fetch classes with timing hooks, so a slow report shows where its time went. `disableInstrumentation` puts the original functions back, so nothing is measured (and nothing costs anything) while it is off.
+#
+# - Every API call is timed as a whole and split into phases: `connect` (DNS lookup and TCP/TLS connect, only when a new connection is opened), `upstream` (waiting for the response headers), `download` (reading the body) and `decode` (parsing the JSON). A call answered without a network request (response cache, replay, single-flight) is counted with `source="local"`. For `AsyncHttpTransport`, `connect` is not split out of `upstream`.
+# - The call functions are replaced in every loaded module that imported them by name (e.g. `constructUrl` in `weatherBackfill.py`, `asyncConstructUrl` in `weatherService.py`). A module imported while instrumentation is on keeps the wrapper, which measures nothing once it is off.
+# - Calls returning `None` count as errors; `process...` methods that raise count as errors and re-raise.
+# - Caches passed to `watchCache` (a `ResponseCache` or `GeocodeCache`) have their hits, misses and size read at every scrape.
+# - The async fetch classes reuse the `process...` methods of the sync ones, so both are instrumented.
+#
+# ##### `Instrumentation(registry, traceLog)`
+#
+# - Holds the Prometheus metrics in its own `registry` (`weather_api_requests_total`, `weather_api_errors_total`, `weather_api_request_seconds`, `weather_api_phase_seconds`, `weather_api_received_bytes_total`, `weather_api_connections_total`, `weather_process_calls_total`, `weather_process_errors_total`, `weather_process_seconds` and the `weather_cache_...` families).
+# - `exposition()` returns the metrics in Prometheus text format and `serve(port)` exposes them on `http://host:port/metrics`.
+# - With `traceLog` (a path or a writable text file), one JSON line is written per API call and per `process...` call, with its timings, phases, bytes and error.
+#
+# From the command line, `python weatherBatch.py world --metrics-port 9100 --trace-log trace.jsonl` runs a batch with metrics and a trace.
+
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+requestBuckets: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+processBuckets: tuple = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, float("inf"))
+
+cacheHitLayers: dict = {"hits": "fresh", "staleHits": "stale", "memoryHits": "memory", "diskHits": "disk"}
+
+_context: threading.local = threading.local()
+# The API call being measured; a context variable, so concurrent asyncio tasks each see their own
+_request: contextvars.ContextVar = contextvars.ContextVar("weatherMetricsRequest", default=None)
+_instrumentation = None
+_originals: list = []
+
+
+class CacheCollector:
+    def __init__(self):
+        self.caches: dict = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("weather_cache_hits", "Cache hits by layer", labels=["cache", "layer"])
+        misses = CounterMetricFamily("weather_cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("weather_cache_entries", "Entries held in memory", labels=["cache"])
+        size = GaugeMetricFamily("weather_cache_bytes", "Bytes held in memory", labels=["cache"])
+
+        for name, cache in list(self.caches.items()):
+            metrics: dict = cache.metrics()
+            for key, layer in cacheHitLayers.items():
+                if key in metrics:
+                    hits.add_metric([name, layer], metrics[key])
+            misses.add_metric([name], metrics.get("misses", 0))
+            if "entries" in metrics:
+                entries.add_metric([name], metrics["entries"])
+            if "bytes" in metrics:
+                size.add_metric([name], metrics["bytes"])
+        yield from (hits, misses, entries, size)
+
+
+class Instrumentation:
+    def __init__(self, registry: CollectorRegistry = None, traceLog=None):
+        self.registry: CollectorRegistry = registry or CollectorRegistry()
+        self.requests: Counter = Counter("weather_api_requests", "API calls", ["endpoint", "source"], registry=self.registry)
+        self.errors: Counter = Counter("weather_api_errors", "Failed API calls", ["endpoint"], registry=self.registry)
+        self.requestSeconds: Histogram = Histogram(
+            "weather_api_request_seconds", "API call duration", ["endpoint"], buckets=requestBuckets, registry=self.registry
+        )
+        self.phaseSeconds: Histogram = Histogram(
+            "weather_api_phase_seconds", "API call duration by phase", ["endpoint", "phase"], buckets=requestBuckets, registry=self.registry
+        )
+        self.receivedBytes: Counter = Counter("weather_api_received_bytes", "Response body bytes", ["endpoint"], registry=self.registry)
+        self.connections: Counter = Counter("weather_api_connections", "New connections opened", registry=self.registry)
+        self.processCalls: Counter = Counter("weather_process_calls", "process... calls", ["method"], registry=self.registry)
+        self.processErrors: Counter = Counter("weather_process_errors", "process... calls that raised", ["method"], registry=self.registry)
+        self.processSeconds: Histogram = Histogram(
+            "weather_process_seconds", "process... duration", ["method"], buckets=processBuckets, registry=self.registry
+        )
+        self.cacheCollector: CacheCollector = CacheCollector()
+        self.registry.register(self.cacheCollector)
+
+        self.traceLock: threading.Lock = threading.Lock()
+        self.ownsTraceLog: bool = isinstance(traceLog, str)
+        self.traceLog = open(traceLog, "a", encoding="utf-8") if self.ownsTraceLog else traceLog
+
+    def watchCache(self, name: str, cache) -> None:
+        self.cacheCollector.caches[name] = cache
+
+    def trace(self, event: dict) -> None:
+        if self.traceLog is None:
+            return
+        line: str = json.dumps(event, separators=(",", ":"))
+        with self.traceLock:
+            self.traceLog.write(line + "\n")
+            self.traceLog.flush()
+
+    def observeRequest(self, endpoint: str, seconds: float, failed: bool, request: dict) -> None:
+        phases: dict = request["phases"]
+        self.requests.labels(endpoint, "network" if phases else "local").inc()
+        if failed:
+            self.errors.labels(endpoint).inc()
+        self.requestSeconds.labels(endpoint).observe(seconds)
+        for phase, phaseSeconds in phases.items():
+            self.phaseSeconds.labels(endpoint, phase).observe(phaseSeconds)
+        if request["bytes"]:
+            self.receivedBytes.labels(endpoint).inc(request["bytes"])
+
+        self.trace({
+            "event": "request", "time": round(time.time(), 3), "endpoint": endpoint, "seconds": round(seconds, 6),
+            "phases": {phase: round(phaseSeconds, 6) for phase, phaseSeconds in phases.items()},
+            "bytes": request["bytes"], "error": failed,
+        })
+
+    def observeProcess(self, method: str, seconds: float, failed: bool) -> None:
+        self.processCalls.labels(method).inc()
+        if failed:
+            self.processErrors.labels(method).inc()
+        self.processSeconds.labels(method).observe(seconds)
+        self.trace({"event": "process", "time": round(time.time(), 3), "method": method, "seconds": round(seconds, 6), "error": failed})
+
+    def exposition(self) -> bytes:
+        return generate_latest(self.registry)
+
+    def serve(self, port: int, address: str = "127.0.0.1") -> None:
+        from prometheus_client import start_http_server
+
+        start_http_server(port, address, registry=self.registry)
+
+    def close(self) -> None:
+        if self.ownsTraceLog:
+            self.traceLog.close()
+
+
+def currentRequest() -> dict:
+    return _request.get()
+
+
+def addPhase(phase: str, seconds: float) -> None:
+    request: dict = currentRequest()
+    if request is not None:
+        request["phases"][phase] = request["phases"].get(phase, 0.0) + seconds
+
+
+def instrumentCall(original, instrumentation: Instrumentation):
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        if _instrumentation is not instrumentation:
+            return original(*args, **kwargs)
+        endpoint: str = (kwargs["endpoint"] if "endpoint" in kwargs else args[0]).strip("/")
+        request: dict = {"endpoint": endpoint, "phases": {}, "bytes": 0}
+        token: contextvars.Token = _request.set(request)
+        start: float = time.perf_counter()
+        try:
+            result = original(*args, **kwargs)
+        finally:
+            _request.reset(token)
+        instrumentation.observeRequest(endpoint, time.perf_counter() - start, result is None, request)
+        return result
+    return wrapper
+
+
+def instrumentAsyncCall(original, instrumentation: Instrumentation):
+    @functools.wraps(original)
+    async def wrapper(*args, **kwargs):
+        if _instrumentation is not instrumentation:
+            return await original(*args, **kwargs)
+        endpoint: str = (kwargs["endpoint"] if "endpoint" in kwargs else args[0]).strip("/")
+        request: dict = {"endpoint": endpoint, "phases": {}, "bytes": 0}
+        token: contextvars.Token = _request.set(request)
+        start: float = time.perf_counter()
+        try:
+            result = await original(*args, **kwargs)
+        finally:
+            _request.reset(token)
+        instrumentation.observeRequest(endpoint, time.perf_counter() - start, result is None, request)
+        return result
+    return wrapper
+
+
+def instrumentAsyncTransportGet(original):
+    # The body and decode steps add their own phases; the rest of the call is upstream
+    @functools.wraps(original)
+    async def wrapper(self, url: str, params: dict = None) -> dict:
+        request: dict = currentRequest()
+        before: float = sum(request["phases"].values()) if request is not None else 0.0
+        start: float = time.perf_counter()
+        try:
+            return await original(self, url, params)
+        finally:
+            if request is not None:
+                measured: float = sum(request["phases"].values()) - before
+                addPhase("upstream", max(time.perf_counter() - start - measured, 0.0))
+    return wrapper
+
+
+def instrumentAsyncBody(original):
+    @functools.wraps(original)
+    async def wrapper(response) -> bytes:
+        start: float = time.perf_counter()
+        body: bytes = await original(response)
+        addPhase("download", time.perf_counter() - start)
+        request: dict = currentRequest()
+        if request is not None:
+            request["bytes"] += len(body)
+        return body
+    return wrapper
+
+
+def instrumentTransportRequest(original):
+    @functools.wraps(original)
+    def wrapper(self, url: str, params: dict = None, stream: bool = False):
+        _context.connectSeconds = 0.0
+        start: float = time.perf_counter()
+        response = original(self, url, params, stream)
+        total: float = time.perf_counter() - start
+
+        connect: float = _context.connectSeconds
+        headers: float = max(min(response.elapsed.total_seconds(), total), connect)
+        if connect:
+            addPhase("connect", connect)
+        addPhase("upstream", headers - connect)
+        if not stream:
+            addPhase("download", total - headers)
+            request: dict = currentRequest()
+            if request is not None:
+                request["bytes"] += len(response.content)
+        return response
+    return wrapper
+
+
+def instrumentTransportDecode(original):
+    @functools.wraps(original)
+    def wrapper(response):
+        start: float = time.perf_counter()
+        try:
+            return original(response)
+        finally:
+            addPhase("decode", time.perf_counter() - start)
+    return wrapper
+
+
+def instrumentBody(original, instrumentation: Instrumentation):
+    def countChunks(chunks, receivedBytes: Counter):
+        for chunk in chunks:
+            receivedBytes.inc(len(chunk))
+            yield chunk
+
+    # The body is read after streamConstructUrl has returned, so the endpoint is looked up now
+    @functools.wraps(original)
+    def wrapper(response, chunkSize: int):
+        request: dict = currentRequest()
+        endpoint: str = request["endpoint"] if request is not None else "unknown"
+        return countChunks(original(response, chunkSize), instrumentation.receivedBytes.labels(endpoint))
+    return wrapper
+
+
+def instrumentConnect(original, instrumentation: Instrumentation):
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        start: float = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            _context.connectSeconds = getattr(_context, "connectSeconds", 0.0) + time.perf_counter() - start
+            instrumentation.connections.inc()
+    return wrapper
+
+
+def instrumentProcess(original, method: str, instrumentation: Instrumentation):
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        start: float = time.perf_counter()
+        failed: bool = True
+        try:
+            result = original(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            instrumentation.observeProcess(method, time.perf_counter() - start, failed)
+    return wrapper
+
+
+def patch(owner, name: str, replacement) -> None:
+    _originals.append((owner, name, owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)))
+    setattr(owner, name, replacement)
+
+
+def patchEverywhere(owner, name: str, replacement) -> None:
+    # Modules that imported the function by name hold their own reference to it
+    original = getattr(owner, name)
+    for module in list(sys.modules.values()):
+        if getattr(module, "__dict__", {}).get(name) is original:
+            patch(module, name, replacement)
+
+
+def enableInstrumentation(instrumentation: Instrumentation = None) -> Instrumentation:
+    global _instrumentation
+    import urllib3.util.connection
+
+    import weatherAsync
+    import weatherForcastingProject
+    import weatherStreaming
+    from weatherAsync import AsyncHttpTransport
+    from weatherTransport import HttpTransport
+
+    if _instrumentation is not None:
+        disableInstrumentation()
+    _instrumentation = instrumentation or Instrumentation()
+
+    patchEverywhere(weatherForcastingProject, "constructUrl", instrumentCall(weatherForcastingProject.constructUrl, _instrumentation))
+    patchEverywhere(weatherStreaming, "streamConstructUrl", instrumentCall(weatherStreaming.streamConstructUrl, _instrumentation))
+    patchEverywhere(weatherAsync, "asyncConstructUrl", instrumentAsyncCall(weatherAsync.asyncConstructUrl, _instrumentation))
+    patch(HttpTransport, "request", instrumentTransportRequest(HttpTransport.request))
+    patch(HttpTransport, "decode", staticmethod(instrumentTransportDecode(HttpTransport.decode)))
+    patch(HttpTransport, "iterBody", staticmethod(instrumentBody(HttpTransport.iterBody, _instrumentation)))
+    patch(AsyncHttpTransport, "get", instrumentAsyncTransportGet(AsyncHttpTransport.get))
+    patch(AsyncHttpTransport, "readBody", staticmethod(instrumentAsyncBody(AsyncHttpTransport.readBody)))
+    patch(AsyncHttpTransport, "decode", staticmethod(instrumentTransportDecode(AsyncHttpTransport.decode)))
+    patch(urllib3.util.connection, "create_connection", instrumentConnect(urllib3.util.connection.create_connection, _instrumentation))
+
+    for cls in list(vars(weatherForcastingProject).values()):
+        if not isinstance(cls, type) or cls.__module__ != weatherForcastingProject.__name__:
+            continue
+        for name, attribute in list(vars(cls).items()):
+            if not name.startswith("process"):
+                continue
+            method: str = f"{cls.__name__}.{name}"
+            if isinstance(attribute, staticmethod):
+                patch(cls, name, staticmethod(instrumentProcess(attribute.__func__, method, _instrumentation)))
+            elif callable(attribute):
+                patch(cls, name, instrumentProcess(attribute, method, _instrumentation))
+
+    return _instrumentation
+
+
+def disableInstrumentation() -> None:
+    global _instrumentation
+
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+    _instrumentation = None
+
+
+def getInstrumentation() -> Instrumentation:
+    return _instrumentation
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Observation Store
+#
+# `ObservationStore` keeps every fetched weather and air pollution value in a local SQLite database (`observations.db`, next to `cities.db`), so later questions such as "PM2.5 for Tehran over the last 30 days" are answered locally instead of calling `/air_pollution/history` again.
+#
+# - One row per (location, metric, timestamp), which is also the primary key. Writing the same value twice, e.g. from overlapping history ranges, updates the row instead of adding a duplicate.
+# - `location` is `locationKey(latitude, longitude)`: the coordinates rounded to 2 decimals, as in the response cache.
+# - Observed values use plain metric names (`pm2_5`, `aqi`, `temp`, `humidity`, `condition`, ...). Forecast values are prefixed with their source (`forecast.pm2_5`, `hourly.temp`, `threeHour.temp`, `daily.tempDay`), so forecasts never overwrite observations. Text values such as `condition` are kept in the `text` column.
+#
+# ##### `RecordingTransport(transport, store)` / `AsyncRecordingTransport(transport, store)`
+#
+# - Wrap a transport and record every response of the weather and air pollution endpoints before returning it, so all fetch classes, the batch runner and the backfill fill the store without any change.
+#
+# ##### `query` / `latest`
+#
+# - `store.query(locationKey(35.69, 51.39), "pm2_5", since=time.time() - 30 * 86400)` returns (timestamp, value) pairs in time order; `latest` returns the newest one.
+
+import os
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+from weatherCities import citiesDatabasePath
+
+observationsDatabasePath: str = os.path.join(os.path.dirname(citiesDatabasePath), "observations.db")
+
+airPollutionComponents: tuple = ("co", "no", "no2", "o3", "so2", "pm2_5", "pm10", "nh3")
+
+
+def locationKey(latitude: float, longitude: float) -> str:
+    return f"{float(latitude):.2f},{float(longitude):.2f}"
+
+
+def conditionText(weather: list) -> str:
+    if not weather:
+        return None
+    return weather[0].get("main", "") + " - " + weather[0].get("description", "")
+
+
+def airPollutionObservations(entries: list, prefix: str = "") -> list:
+    observations: list = []
+    for entry in entries:
+        timestamp: int = entry["dt"]
+        observations.append((timestamp, prefix + "aqi", entry["main"]["aqi"], None))
+        for name, value in entry.get("components", {}).items():
+            observations.append((timestamp, prefix + name, value, None))
+    return observations
+
+
+def forecastObservations(entries: list, prefix: str) -> list:
+    observations: list = []
+    for entry in entries:
+        timestamp: int = entry["dt"]
+        main: dict = entry.get("main", {})
+        for name in ("temp", "feels_like", "pressure", "humidity"):
+            if name in main:
+                observations.append((timestamp, prefix + name, main[name], None))
+        observations.append((timestamp, prefix + "condition", None, conditionText(entry.get("weather"))))
+    return observations
+
+
+def dailyObservations(entries: list) -> list:
+    observations: list = []
+    for entry in entries:
+        timestamp: int = entry["dt"]
+        temperature: dict = entry.get("temp", {})
+        observations.append((timestamp, "daily.tempDay", temperature.get("day"), None))
+        observations.append((timestamp, "daily.tempNight", temperature.get("night"), None))
+        observations.append((timestamp, "daily.condition", None, conditionText(entry.get("weather"))))
+    return observations
+
+
+def currentWeatherObservations(current: dict) -> list:
+    timestamp: int = current["dt"]
+    main: dict = current.get("main", {})
+    observations: list = [(timestamp, name, main[name], None)
+                          for name in ("temp", "feels_like", "pressure", "humidity") if name in main]
+    observations.append((timestamp, "visibility", current.get("visibility"), None))
+    observations.append((timestamp, "windSpeed", current.get("wind", {}).get("speed"), None))
+    observations.append((timestamp, "clouds", current.get("clouds", {}).get("all"), None))
+    observations.append((timestamp, "condition", None, conditionText(current.get("weather"))))
+    return observations
+
+
+def extractObservations(endpoint: str, payload) -> list:
+    if not payload:
+        return []
+    if endpoint in ("data/2.5/air_pollution", "data/2.5/air_pollution/history"):
+        return airPollutionObservations(payload["list"])
+    if endpoint == "data/2.5/air_pollution/forecast":
+        return airPollutionObservations(payload["list"], "forecast.")
+    if endpoint == "data/2.5/weather":
+        return currentWeatherObservations(payload)
+    if endpoint == "data/2.5/forecast/hourly":
+        return forecastObservations(payload["list"], "hourly.")
+    if endpoint == "data/2.5/forecast":
+        return forecastObservations(payload["list"], "threeHour.")
+    if endpoint == "data/2.5/forecast/daily":
+        return dailyObservations(payload["list"])
+    return []
+
+
+class ObservationStore:
+    def __init__(self, databasePath: str = observationsDatabasePath):
+        self.databasePath: str = databasePath
+        self.lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(databasePath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS observations (
+                location TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                value REAL,
+                text TEXT,
+                PRIMARY KEY (location, metric, timestamp)
+            ) WITHOUT ROWID
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS observationsByTime ON observations (location, timestamp)")
+        self.connection.commit()
+
+    def upsert(self, location: str, observations: list) -> int:
+        rows: list = [
+            (location, metric, timestamp, value, text)
+            for timestamp, metric, value, text in observations
+            if value is not None or text is not None
+        ]
+        with self.lock:
+            self.connection.executemany("""
+                INSERT INTO observations (location, metric, timestamp, value, text) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (location, metric, timestamp) DO UPDATE SET value = excluded.value, text = excluded.text
+            """, rows)
+            self.connection.commit()
+        return len(rows)
+
+    def record(self, endpoint: str, latitude: float, longitude: float, payload) -> int:
+        return self.upsert(locationKey(latitude, longitude), extractObservations(endpoint, payload))
+
+    def query(self, location: str, metric: str, since: float = None, until: float = None) -> list:
+        with self.lock:
+            rows: list = self.connection.execute("""
+                SELECT timestamp, COALESCE(value, text) FROM observations
+                WHERE location = ? AND metric = ? AND timestamp >= ? AND timestamp <= ?
+                ORDER BY timestamp
+            """, (location, metric, int(since or 0), int(until if until is not None else 2 ** 62))).fetchall()
+        return rows
+
+    def latest(self, location: str, metric: str) -> tuple:
+        with self.lock:
+            return self.connection.execute("""
+                SELECT timestamp, COALESCE(value, text) FROM observations
+                WHERE location = ? AND metric = ? ORDER BY timestamp DESC LIMIT 1
+            """, (location, metric)).fetchone()
+
+    def metrics(self, location: str) -> list:
+        with self.lock:
+            return [row[0] for row in self.connection.execute(
+                "SELECT DISTINCT metric FROM observations WHERE location = ? ORDER BY metric", (location,)
+            )]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def recordResponse(store: ObservationStore, url: str, params: dict, payload) -> None:
+    if not params or "lat" not in params or "lon" not in params:
+        return
+    try:
+        store.record(urlsplit(url).path.strip("/"), params["lat"], params["lon"], payload)
+    except (KeyError, TypeError, sqlite3.Error) as e:
+        print(f"Error recording observations: {e}")
+
+
+class RecordingTransport:
+    def __init__(self, transport=None, store: ObservationStore = None):
+        from weatherTransport import getDefaultTransport
+
+        self.transport = transport or getDefaultTransport()
+        self.store: ObservationStore = store or ObservationStore()
+
+    def get(self, url: str, params: dict = None) -> dict:
+        payload = self.transport.get(url, params=params)
+        recordResponse(self.store, url, params, payload)
+        return payload
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self) -> "RecordingTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncRecordingTransport:
+    def __init__(self, transport, store: ObservationStore = None):
+        self.transport = transport
+        self.store: ObservationStore = store or ObservationStore()
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        payload = await self.transport.get(url, params=params)
+        recordResponse(self.store, url, params, payload)
+        return payload
+
+    async def open(self) -> None:
+        await self.transport.open()
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncRecordingTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Parallel Batch Processing
+#
+# The `process...` methods are pure Python and run on one core under the GIL, so after a multi-city batch has fetched its responses, processing them can take longer than fetching them. `BatchProcessor` runs the processing on a pool of worker processes instead.
+#
+# - Payloads cross the process boundary as compact JSON bytes, never as pickled dictionaries: a chunk of payloads is one `bytes` object (a JSON array) on the way in, and its processed results are one `bytes` object on the way back. Raw response bodies, e.g. `HttpTransport.request(url, params).content`, are passed through without being decoded in the parent at all.
+# - Payloads are grouped into about `chunksPerWorker` chunks per worker (at least `minimumChunkBytes` each), so the per-chunk IPC cost is paid a few times per worker rather than once per payload.
+# - A payload that fails to process gives `None` in its place, like the fetch classes.
+#
+# ##### `BatchProcessor(workers, chunksPerWorker, minimumChunkBytes)`
+#
+# - `process(kind, payloads)` returns the processed results in the order of `payloads`; `iterProcess` yields them in that order as their chunks complete.
+# - `kind` is one of `processingKinds`: "currentWeather", "hourlyForecast", "dailyForecast" and "airPollutionForecast" take a whole response; "forecastedData" (5-day / 3-hour) and "airPollution" (current or history) take a whole response and process its "list".
+# - `workers` defaults to the number of CPUs. Use it as a context manager, or call `close()`, to stop the pool.
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+processingKinds: tuple = ("currentWeather", "hourlyForecast", "dailyForecast", "forecastedData", "airPollution", "airPollutionForecast")
+
+_processors: dict = None
+
+
+def workerProcessors() -> dict:
+    global _processors
+
+    if _processors is None:
+        from weatherForcastingProject import (
+            AirPollutionData,
+            AirPollutionForecast,
+            CurrentWeather,
+            DailyWeatherForecast,
+            FiveDaysThreeHoursWeatherForecast,
+            HourlyWeatherForecast,
+        )
+
+        _processors = {
+            "currentWeather": CurrentWeather(0, 0).processCurrentWeather,
+            "hourlyForecast": HourlyWeatherForecast(0, 0).processHourlyForecast,
+            "dailyForecast": DailyWeatherForecast(0, 0).processDailyForecast,
+            "forecastedData": lambda payload, process=FiveDaysThreeHoursWeatherForecast(0, 0).processForecastedData: process(payload["list"]),
+            "airPollution": lambda payload, process=AirPollutionData(0, 0).processAirPollution: process(payload["list"]),
+            "airPollutionForecast": AirPollutionForecast(0, 0).processAirPollutionForecast,
+        }
+    return _processors
+
+
+def processChunk(kind: str, chunk: bytes) -> bytes:
+    process = workerProcessors()[kind]
+    results: list = []
+    for payload in json.loads(chunk):
+        try:
+            results.append(process(payload))
+        except Exception as e:
+            print(f"Error processing {kind} payload: {e}")
+            results.append(None)
+    return json.dumps(results, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encodePayload(payload) -> bytes:
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return bytes(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class BatchProcessor:
+    def __init__(self, workers: int = None, chunksPerWorker: int = 4, minimumChunkBytes: int = 64 * 1024):
+        self.workers: int = workers or os.cpu_count() or 1
+        self.chunksPerWorker: int = chunksPerWorker
+        self.minimumChunkBytes: int = minimumChunkBytes
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def chunks(self, payloads: list):
+        bodies: list = [encodePayload(payload) for payload in payloads]
+        totalBytes: int = sum(len(body) for body in bodies)
+        chunkBytes: int = max(self.minimumChunkBytes, totalBytes // (self.workers * self.chunksPerWorker) + 1)
+
+        chunk: list = []
+        size: int = 0
+        for body in bodies:
+            chunk.append(body)
+            size += len(body)
+            if size >= chunkBytes:
+                yield b"[" + b",".join(chunk) + b"]"
+                chunk, size = [], 0
+        if chunk:
+            yield b"[" + b",".join(chunk) + b"]"
+
+    def iterProcess(self, kind: str, payloads: list):
+        if kind not in processingKinds:
+            raise ValueError(f"Unknown processing kind: {kind}")
+
+        futures: list = [self.executor.submit(processChunk, kind, chunk) for chunk in self.chunks(payloads)]
+        for future in futures:
+            yield from json.loads(future.result())
+
+    def process(self, kind: str, payloads: list) -> list:
+        return list(self.iterProcess(kind, payloads))
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "BatchProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
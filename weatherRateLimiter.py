@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Rate Limiter and Quota Scheduler
+#
+# The Developer Plan key has a fixed number of calls per minute (and optionally per day). `RateLimiter` keeps one token bucket per host, so api.openweathermap.org and pro.openweathermap.org have separate budgets (`defaultHostBudgets`), and releases calls at a steady rate right at the ceiling instead of in bursts that get throttled. A budget may also set `burst`, the number of calls that can go out back to back (one second's worth by default). Hosts without a budget (e.g. ip-api.com) are not limited.
+#
+# - Waiting calls are served by priority: `interactivePriority` (current weather lookups) goes before `defaultPriority`, which goes before `bulkPriority` (history backfills). Calls with the same priority are served in arrival order.
+# - When the daily budget is used up, or a call waits longer than its `timeout`, `QuotaExceededError` is raised. It is a `requests` exception, so `constructUrl` reports it and returns `None` like any failed request.
+# - `queueWaitStats` returns the number of calls, the total and the longest queue wait per priority.
+#
+# ##### `RateLimitedTransport(transport, limiter, priority)` / `AsyncRateLimitedTransport(transport, limiter, priority)`
+#
+# - Wrap a transport so every request first waits for its host's budget. Share one `RateLimiter` between all of them; `withPriority` returns a copy of the transport that uses another priority.
+# - `lastQueueWait` is the queue wait of the last request of the calling thread (or, for `AsyncRateLimitedTransport`, of the calling task), in seconds.
+# - Threads and asyncio tasks wait in the same per-host queue: a task awaits a future instead of holding a worker thread, so an `interactivePriority` task goes ahead of queued bulk calls, and a cancelled task leaves the queue without using a token.
+# - Retries made inside `HttpTransport` are not counted against the budget.
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+interactivePriority: int = 0
+defaultPriority: int = 5
+bulkPriority: int = 10
+
+defaultHostBudgets: dict = {
+    "api.openweathermap.org": {"callsPerMinute": 3000, "callsPerDay": None},
+    "pro.openweathermap.org": {"callsPerMinute": 3000, "callsPerDay": None},
+}
+
+
+class QuotaExceededError(requests.exceptions.RequestException):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, ratePerSecond: float, capacity: float = None):
+        self.ratePerSecond: float = ratePerSecond
+        self.capacity: float = capacity or max(1.0, ratePerSecond)
+        self.tokens: float = self.capacity
+        self.updatedAt: float = time.monotonic()
+
+    def timeUntilToken(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updatedAt) * self.ratePerSecond)
+        self.updatedAt = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.ratePerSecond
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+def setWoken(wake: asyncio.Future) -> None:
+    if not wake.done():
+        wake.set_result(None)
+
+
+class HostScheduler:
+    def __init__(self, callsPerMinute: float, callsPerDay: int = None, burst: float = None):
+        self.bucket: TokenBucket = TokenBucket(callsPerMinute / 60, burst)
+        self.callsPerDay: int = callsPerDay
+        self.day: int = int(time.time() // 86400)
+        self.callsToday: int = 0
+        self.waiters: list = []
+        self.sequence = itertools.count()
+        self.condition: threading.Condition = threading.Condition()
+        # ticket -> (event loop, future) of the asyncio waiters, woken whenever the head of the queue may have changed
+        self.asyncWakers: dict = {}
+
+    def checkDailyQuota(self) -> None:
+        today: int = int(time.time() // 86400)
+        if today != self.day:
+            self.day = today
+            self.callsToday = 0
+        if self.callsPerDay is not None and self.callsToday >= self.callsPerDay:
+            raise QuotaExceededError(f"Daily quota of {self.callsPerDay} calls used up")
+
+    def tryTake(self, ticket: tuple, start: float, timeout: float) -> tuple:
+        # Called with the condition held: (queue wait, None) once the ticket got a token, else (None, how long to wait)
+        now: float = time.monotonic()
+        delay: float = None
+        if self.waiters[0] == ticket:
+            self.checkDailyQuota()
+            delay = self.bucket.timeUntilToken(now)
+            if delay <= 0:
+                self.bucket.take()
+                self.callsToday += 1
+                return now - start, None
+
+        if timeout is not None:
+            remaining: float = start + timeout - now
+            if remaining <= 0:
+                raise QuotaExceededError(f"Waited more than {timeout} s for the rate limit")
+            delay = remaining if delay is None else min(delay, remaining)
+        return None, delay
+
+    def release(self, ticket: tuple) -> None:
+        # Called with the condition held, when a ticket leaves the queue (served, timed out or cancelled)
+        self.waiters.remove(ticket)
+        heapq.heapify(self.waiters)
+        self.condition.notify_all()
+        for loop, wake in self.asyncWakers.values():
+            loop.call_soon_threadsafe(setWoken, wake)
+
+    def acquire(self, priority: int, timeout: float = None) -> float:
+        start: float = time.monotonic()
+        ticket: tuple = (priority, next(self.sequence))
+
+        with self.condition:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    waited, delay = self.tryTake(ticket, start, timeout)
+                    if waited is not None:
+                        return waited
+                    self.condition.wait(delay)
+            finally:
+                self.release(ticket)
+
+    async def acquireAsync(self, priority: int, timeout: float = None) -> float:
+        # The same queue as acquire, but the task awaits a future instead of blocking a thread; a cancelled task leaves the queue
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        start: float = time.monotonic()
+        ticket: tuple = (priority, next(self.sequence))
+
+        with self.condition:
+            heapq.heappush(self.waiters, ticket)
+        try:
+            while True:
+                with self.condition:
+                    waited, delay = self.tryTake(ticket, start, timeout)
+                    if waited is not None:
+                        return waited
+                    wake: asyncio.Future = loop.create_future()
+                    self.asyncWakers[ticket] = (loop, wake)
+                try:
+                    await asyncio.wait_for(wake, delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self.condition:
+                        self.asyncWakers.pop(ticket, None)
+        finally:
+            with self.condition:
+                self.release(ticket)
+
+
+class RateLimiter:
+    def __init__(self, hostBudgets: dict = None):
+        self.hostBudgets: dict = {**defaultHostBudgets, **(hostBudgets or {})}
+        self.schedulers: dict = {
+            host: HostScheduler(**budget) for host, budget in self.hostBudgets.items()
+        }
+        self.statsLock: threading.Lock = threading.Lock()
+        self.stats: dict = {}
+
+    def recordWait(self, priority: int, waited: float) -> float:
+        with self.statsLock:
+            calls, totalWait, maxWait = self.stats.get(priority, (0, 0.0, 0.0))
+            self.stats[priority] = (calls + 1, totalWait + waited, max(maxWait, waited))
+        return waited
+
+    def acquire(self, url: str, priority: int = defaultPriority, timeout: float = None) -> float:
+        scheduler: HostScheduler = self.schedulers.get(urlsplit(url).hostname)
+        if scheduler is None:
+            return 0.0
+        return self.recordWait(priority, scheduler.acquire(priority, timeout))
+
+    async def acquireAsync(self, url: str, priority: int = defaultPriority, timeout: float = None) -> float:
+        scheduler: HostScheduler = self.schedulers.get(urlsplit(url).hostname)
+        if scheduler is None:
+            return 0.0
+        return self.recordWait(priority, await scheduler.acquireAsync(priority, timeout))
+
+    def queueWaitStats(self) -> dict:
+        with self.statsLock:
+            return {
+                priority: {"calls": calls, "totalWait": totalWait, "maxWait": maxWait}
+                for priority, (calls, totalWait, maxWait) in sorted(self.stats.items())
+            }
+
+
+class RateLimitedTransport:
+    def __init__(self, transport=None, limiter: RateLimiter = None, priority: int = defaultPriority, timeout: float = None):
+        from weatherTransport import getDefaultTransport
+
+        self.transport = transport or getDefaultTransport()
+        self.limiter: RateLimiter = limiter or RateLimiter()
+        self.priority: int = priority
+        self.timeout: float = timeout
+        self.local: threading.local = threading.local()
+
+    @property
+    def lastQueueWait(self) -> float:
+        return getattr(self.local, "lastQueueWait", 0.0)
+
+    def withPriority(self, priority: int) -> "RateLimitedTransport":
+        return type(self)(self.transport, self.limiter, priority, self.timeout)
+
+    def get(self, url: str, params: dict = None) -> dict:
+        self.local.lastQueueWait = self.limiter.acquire(url, self.priority, self.timeout)
+        return self.transport.get(url, params=params)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self) -> "RateLimitedTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncRateLimitedTransport:
+    def __init__(self, transport, limiter: RateLimiter = None, priority: int = defaultPriority, timeout: float = None):
+        self.transport = transport
+        self.limiter: RateLimiter = limiter or RateLimiter()
+        self.priority: int = priority
+        self.timeout: float = timeout
+        self.queueWait: contextvars.ContextVar = contextvars.ContextVar(f"queueWait{id(self)}", default=0.0)
+
+    @property
+    def lastQueueWait(self) -> float:
+        return self.queueWait.get()
+
+    def withPriority(self, priority: int) -> "AsyncRateLimitedTransport":
+        return type(self)(self.transport, self.limiter, priority, self.timeout)
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        self.queueWait.set(await self.limiter.acquireAsync(url, self.priority, self.timeout))
+        return await self.transport.get(url, params=params)
+
+    async def open(self) -> None:
+        await self.transport.open()
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncRateLimitedTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Weather Records
+#
+# Compact record classes for every result of `weatherForcastingProject.py`. Keeping forecasts for hundreds of cities in memory as nested dictionaries is expensive; the records use `__slots__` (no per-instance dictionary), keep timestamps as the integers sent by the API and air pollution components as a fixed-width `array('d')`.
+#
+# ##### `to_dict`
+#
+# - Condition texts such as "Clouds - few clouds" repeat across cities and hours, so they are interned and shared between records.
+# - Every record converts back to the dictionary the matching `process...` method returns, e.g. `{"dateTime": "2024-05-01 12:00:00", "temperature": 21.4, "condition": "Clouds - few clouds"}` for a `ThreeHourPoint`. Timestamps are only formatted here, in UTC by default; pass a `TimestampFormatter` (see `weatherTime.py`), e.g. `point.to_dict(TimestampFormatter.forResponse(hourlyForecastData))`, for the local time of the response.
+#
+# ##### Records
+#
+# - `Geolocation(name, country, latitude, longitude)`: from `GeolocationDataFetcher.processGeolocationRecord`.
+# - `CurrentWeatherRecord(timestamp, name, country, condition, ...)`: from `CurrentWeather.processCurrentWeatherRecord`. It keeps the usual fields of `main`, `wind` and `clouds`; optional ones missing from the response (`sea_level`, `grnd_level`, `gust`) are left out of `to_dict`.
+# - `ThreeHourPoint(timestamp, temperature, condition)`: one step of the 5-days 3-hours forecast, from `iterForecastedData`.
+# - `HourlyPoint(timestamp, temperature, condition)`: one hour of the hourly forecast, from `iterHourlyForecast`.
+# - `DailyPoint(timestamp, temperatureDay, temperatureNight, weatherMain, weatherDescription)`: one day of the daily forecast, from `iterDailyForecast`.
+# - `AirQualityPoint(timestamp, airQualityIndex, components)`: one air pollution entry, from `AirPollutionData.iterAirPollution`. `components` holds the values of `airPollutionComponents` in that order, `NaN` where the response has none.
+#
+# For long air pollution histories, the struct-of-arrays `AirPollutionColumns` in `weatherColumnar.py` is more compact still.
+
+import math
+import sys
+import time
+from array import array
+
+from weatherTime import TimestampFormatter, utcFormatter
+
+
+def formatTimestamp(timestamp: int, format: str = '%Y-%m-%d %H:%M:%S') -> str:
+    # Same result as datetime.utcfromtimestamp(timestamp).strftime(format)
+    if format == '%Y-%m-%d %H:%M:%S':
+        return utcFormatter.format(timestamp)
+    if format == '%Y-%m-%d':
+        return utcFormatter.date(timestamp)
+    return time.strftime(format, time.gmtime(timestamp))
+
+
+airPollutionComponents: tuple = ("co", "no", "no2", "o3", "so2", "pm2_5", "pm10", "nh3")
+
+
+class Record:
+    __slots__ = ()
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __repr__(self) -> str:
+        fields: str = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Geolocation(Record):
+    __slots__ = ("name", "country", "latitude", "longitude")
+
+    def __init__(self, name: str, country: str, latitude: float, longitude: float):
+        self.name: str = name
+        self.country: str = country
+        self.latitude: float = latitude
+        self.longitude: float = longitude
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "country": self.country, "lat": self.latitude, "lon": self.longitude}
+
+
+class CurrentWeatherRecord(Record):
+    __slots__ = (
+        "timestamp", "name", "country", "condition",
+        "temperature", "feelsLike", "temperatureMin", "temperatureMax", "pressure", "humidity", "seaLevel", "groundLevel",
+        "visibility", "windSpeed", "windDirection", "windGust", "clouds"
+    )
+
+    # (slot, key in the response) for the "main" and "wind" objects, in the order the API sends them
+    mainFields: tuple = (
+        ("temperature", "temp"), ("feelsLike", "feels_like"), ("temperatureMin", "temp_min"), ("temperatureMax", "temp_max"),
+        ("pressure", "pressure"), ("humidity", "humidity"), ("seaLevel", "sea_level"), ("groundLevel", "grnd_level")
+    )
+    windFields: tuple = (("windSpeed", "speed"), ("windDirection", "deg"), ("windGust", "gust"))
+
+    def __init__(self, timestamp: int, name: str, country: str, condition: str, mainFeatures: dict, visibility: int, wind: dict, clouds: int):
+        self.timestamp: int = timestamp
+        self.name: str = name
+        self.country: str = country
+        self.condition: str = sys.intern(condition)
+        for slot, key in self.mainFields:
+            setattr(self, slot, mainFeatures.get(key))
+        self.visibility: int = visibility
+        for slot, key in self.windFields:
+            setattr(self, slot, wind.get(key))
+        self.clouds: int = clouds
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "country": self.country,
+            "condition": self.condition,
+            "mainFeatures": {key: getattr(self, slot) for slot, key in self.mainFields if getattr(self, slot) is not None},
+            "visibility": self.visibility,
+            "wind": {key: getattr(self, slot) for slot, key in self.windFields if getattr(self, slot) is not None},
+            "clouds": {"all": self.clouds}
+        }
+
+
+class ThreeHourPoint(Record):
+    __slots__ = ("timestamp", "temperature", "condition")
+
+    def __init__(self, timestamp: int, temperature: float, condition: str):
+        self.timestamp: int = timestamp
+        self.temperature: float = temperature
+        self.condition: str = sys.intern(condition)
+
+    def to_dict(self, formatter: TimestampFormatter = utcFormatter) -> dict:
+        return {
+            "dateTime": formatter.format(self.timestamp),
+            "temperature": self.temperature,
+            "condition": self.condition
+        }
+
+
+class HourlyPoint(Record):
+    __slots__ = ("timestamp", "temperature", "condition")
+
+    def __init__(self, timestamp: int, temperature: float, condition: str):
+        self.timestamp: int = timestamp
+        self.temperature: float = temperature
+        self.condition: str = sys.intern(condition)
+
+    def to_dict(self, formatter: TimestampFormatter = utcFormatter) -> dict:
+        return {
+            "dt_txt": formatter.format(self.timestamp),
+            "Temperature": self.temperature,
+            "weatherCondition": self.condition
+        }
+
+
+class DailyPoint(Record):
+    __slots__ = ("timestamp", "temperatureDay", "temperatureNight", "weatherMain", "weatherDescription")
+
+    def __init__(self, timestamp: int, temperatureDay: float, temperatureNight: float, weatherMain: str, weatherDescription: str):
+        self.timestamp: int = timestamp
+        self.temperatureDay: float = temperatureDay
+        self.temperatureNight: float = temperatureNight
+        self.weatherMain: str = sys.intern(weatherMain)
+        self.weatherDescription: str = sys.intern(weatherDescription)
+
+    def to_dict(self, formatter: TimestampFormatter = utcFormatter) -> dict:
+        return {
+            "date": formatter.date(self.timestamp),
+            "temperature": {
+                "day": self.temperatureDay,
+                "night": self.temperatureNight,
+            },
+            "weather": {
+                "main": self.weatherMain,
+                "description": self.weatherDescription,
+            }
+        }
+
+
+class AirQualityPoint(Record):
+    __slots__ = ("timestamp", "airQualityIndex", "components")
+
+    def __init__(self, timestamp: int, airQualityIndex: int, components: array):
+        self.timestamp: int = timestamp
+        self.airQualityIndex: int = airQualityIndex
+        self.components: array = components
+
+    @classmethod
+    def fromEntry(cls, entry: dict) -> "AirQualityPoint":
+        components: dict = entry.get("components", {})
+        return cls(
+            entry["dt"],
+            entry.get("main", {}).get("aqi"),
+            array("d", [components.get(name, math.nan) for name in airPollutionComponents])
+        )
+
+    def component(self, name: str) -> float:
+        return self.components[airPollutionComponents.index(name)]
+
+    def to_dict(self, formatter: TimestampFormatter = utcFormatter) -> dict:
+        from weatherForcastingProject import AirPollutionData
+
+        componentMapping: dict = AirPollutionData.componentMapping
+        return {
+            'airQualityIndex': self.airQualityIndex,
+            'components': {
+                componentMapping[name]: value
+                for name, value in zip(airPollutionComponents, self.components) if not math.isnan(value)
+            },
+            'dateTime': formatter.format(self.timestamp),
+            'airQualityDescription': AirPollutionData.airQualityIndex(self.airQualityIndex)
+        }
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Background Refresher
+#
+# `Refresher` is a long-running process that keeps a working set of cities (e.g. the `world` table of `cities.db`) warm, instead of fetching only when someone runs the script. Every (city, endpoint) pair is refreshed on the cadence of its endpoint (`defaultCadences`): current weather and air pollution every 10 minutes, the forecasts every 30 minutes to a few hours, the daily forecast every 6 hours and the air pollution history of the last day once a day.
+#
+# - Each next refresh is due one cadence after the last one, give or take `jitter` (a fraction of the cadence), so the refreshes of many cities drift apart instead of firing together. Refreshes that are due at start-up (never done, or overdue after a restart) are spread over the first `startupSpread` seconds.
+# - At most `maxConcurrency` refreshes run at the same time, whatever their endpoint; this is the global concurrency budget. For a calls-per-minute budget as well, pass a `RateLimitedTransport` (see `weatherRateLimiter.py`).
+# - A failed refresh (an error, `None` or an empty result) is retried after `retryDelay` seconds, doubling with each further failure up to the endpoint's cadence.
+# - Cities are geocoded once, through `geocodeCache` when given. Each city has its own lock, so the refreshes of one city wait for its geocoding while other cities are geocoded in parallel.
+# - `onResult(city, endpoint, result)` is called with every processed result. The command line runner records every response in the observation store (see `weatherObservationStore.py`) instead.
+#
+# ##### `RefreshProgress(databasePath)`
+#
+# - Stores the time of the last success and attempt and the number of consecutive failures of every (city, endpoint) pair in SQLite (`refresher.db`, next to `cities.db`). After a restart, every pair is due one cadence after its last success, so nothing that is still fresh is fetched again.
+#
+# ##### `run` / `stop`
+#
+# - `run()` blocks until `stop()` is called (from another thread or a signal handler). It then starts no new refresh, waits for the running ones and returns; their progress is saved as they complete.
+# - `metrics()` returns the refreshes and failures per endpoint, the number of queued and running refreshes and the seconds until the next one is due.
+#
+# From the command line, `python weatherRefresher.py world --workers 4 --cadence currentWeather=300` runs until SIGINT or SIGTERM.
+
+import argparse
+import heapq
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from weatherCities import citiesDatabasePath, geocodeQuery, loadCities
+from weatherForcastingProject import (
+    AirPollutionData,
+    AirPollutionForecast,
+    AirPollutionHistory,
+    CurrentWeather,
+    DailyWeatherForecast,
+    FiveDaysThreeHoursWeatherForecast,
+    GeolocationDataFetcher,
+    HourlyWeatherForecast,
+)
+
+refresherDatabasePath: str = os.path.join(os.path.dirname(citiesDatabasePath), "refresher.db")
+
+defaultCadences: dict = {
+    "currentWeather": 10 * 60,
+    "currentAirPollution": 10 * 60,
+    "hourlyForecast": 30 * 60,
+    "fiveDaysThreeHoursForecast": 60 * 60,
+    "airPollutionForecast": 60 * 60,
+    "dailyForecast": 6 * 3600,
+    "airPollutionHistory": 24 * 3600,
+}
+
+# endpoint -> fetch(latitude, longitude, transport, cadence); the history covers the last cadence
+endpointFetchers: dict = {
+    "currentWeather": lambda latitude, longitude, transport, cadence: CurrentWeather(latitude, longitude, transport).currentWeather(),
+    "currentAirPollution": lambda latitude, longitude, transport, cadence: AirPollutionData(latitude, longitude, transport).currentAirPollution(),
+    "hourlyForecast": lambda latitude, longitude, transport, cadence: HourlyWeatherForecast(latitude, longitude, transport).hourlyForecast(),
+    "fiveDaysThreeHoursForecast": lambda latitude, longitude, transport, cadence: FiveDaysThreeHoursWeatherForecast(latitude, longitude, transport).getForecastedData(),
+    "airPollutionForecast": lambda latitude, longitude, transport, cadence: AirPollutionForecast(latitude, longitude, transport).airPollutionForecast(),
+    "dailyForecast": lambda latitude, longitude, transport, cadence: DailyWeatherForecast(latitude, longitude, transport).dailyForecast(),
+    "airPollutionHistory": lambda latitude, longitude, transport, cadence: AirPollutionHistory(
+        latitude, longitude, int(time.time() - cadence), int(time.time()), transport, downsampling="hourly"
+    ).airPollutionHistory(),
+}
+
+
+class RefreshProgress:
+    def __init__(self, databasePath: str = refresherDatabasePath):
+        self.databasePath: str = databasePath
+        self.lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(databasePath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS refreshes (
+                city TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                lastSuccess REAL,
+                lastAttempt REAL NOT NULL,
+                failures INTEGER NOT NULL,
+                PRIMARY KEY (city, endpoint)
+            ) WITHOUT ROWID
+        """)
+        self.connection.commit()
+
+    def load(self) -> dict:
+        with self.lock:
+            rows: list = self.connection.execute("SELECT city, endpoint, lastSuccess, lastAttempt, failures FROM refreshes").fetchall()
+        return {(city, endpoint): (lastSuccess, lastAttempt, failures) for city, endpoint, lastSuccess, lastAttempt, failures in rows}
+
+    def record(self, city: str, endpoint: str, attemptedAt: float, succeeded: bool) -> int:
+        with self.lock:
+            self.connection.execute("""
+                INSERT INTO refreshes (city, endpoint, lastSuccess, lastAttempt, failures) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (city, endpoint) DO UPDATE SET
+                    lastSuccess = COALESCE(excluded.lastSuccess, lastSuccess),
+                    lastAttempt = excluded.lastAttempt,
+                    failures = CASE WHEN excluded.failures = 0 THEN 0 ELSE failures + 1 END
+            """, (city, endpoint, attemptedAt if succeeded else None, attemptedAt, 0 if succeeded else 1))
+            self.connection.commit()
+            failures: int = self.connection.execute(
+                "SELECT failures FROM refreshes WHERE city = ? AND endpoint = ?", (city, endpoint)
+            ).fetchone()[0]
+        return failures
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class Refresher:
+    def __init__(
+        self,
+        cities: list,
+        transport=None,
+        geocodeCache=None,
+        progress: RefreshProgress = None,
+        cadences: dict = None,
+        maxConcurrency: int = 4,
+        jitter: float = 0.1,
+        startupSpread: float = 60.0,
+        retryDelay: float = 60.0,
+        onResult=None
+    ):
+        self.cadences: dict = dict(defaultCadences if cadences is None else cadences)
+        unknownEndpoints: set = set(self.cadences) - set(endpointFetchers)
+        if unknownEndpoints:
+            raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknownEndpoints))}")
+
+        # "City-CC" entries of loadCities, keyed by their geocoder query
+        self.cities: list = list(dict.fromkeys(geocodeQuery(city["entry"], city.get("table")) for city in cities))
+        self.transport = transport
+        self.geocodeCache = geocodeCache
+        self.progress: RefreshProgress = progress if progress is not None else RefreshProgress()
+        self.maxConcurrency: int = maxConcurrency
+        self.jitter: float = jitter
+        self.startupSpread: float = startupSpread
+        self.retryDelay: float = retryDelay
+        self.onResult = onResult
+
+        self.random: random.Random = random.Random()
+        self.queue: list = []
+        self.sequence: int = 0
+        self.locations: dict = {}
+        # Guards cityLocks only; the geocoding itself runs under the lock of its city
+        self.locationLock: threading.Lock = threading.Lock()
+        self.cityLocks: dict = {}
+        self.stopping: threading.Event = threading.Event()
+        self.running: int = 0
+        self.refreshCounts: Counter = Counter()
+        self.failureCounts: Counter = Counter()
+
+    def push(self, due: float, city: str, endpoint: str) -> None:
+        self.sequence += 1
+        heapq.heappush(self.queue, (due, self.sequence, city, endpoint))
+
+    def startupDue(self, now: float, cadence: float) -> float:
+        return now + self.random.uniform(0, min(cadence, self.startupSpread))
+
+    def nextDue(self, endpoint: str, lastSuccess: float, lastAttempt: float, failures: int) -> float:
+        cadence: float = self.cadences[endpoint]
+        if failures:
+            return lastAttempt + min(cadence, self.retryDelay * 2 ** (failures - 1))
+        return lastSuccess + cadence * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+    def schedule(self) -> None:
+        now: float = time.time()
+        saved: dict = self.progress.load()
+        self.queue = []
+        for city in self.cities:
+            for endpoint, cadence in self.cadences.items():
+                state: tuple = saved.get((city, endpoint))
+                due: float = self.nextDue(endpoint, *state) if state else now
+                if due <= now:
+                    due = self.startupDue(now, cadence)
+                self.push(due, city, endpoint)
+
+    def locate(self, city: str) -> dict:
+        location: dict = self.locations.get(city)
+        if location is not None:
+            return location
+        with self.locationLock:
+            cityLock: threading.Lock = self.cityLocks.setdefault(city, threading.Lock())
+        with cityLock:
+            location = self.locations.get(city)
+            if location is None:
+                location = GeolocationDataFetcher(self.transport, self.geocodeCache).getGeolocationData(city)
+                if not location:
+                    return None
+                self.locations[city] = location
+        return location
+
+    def refresh(self, city: str, endpoint: str) -> tuple:
+        attemptedAt: float = time.time()
+        result = None
+        try:
+            location: dict = self.locate(city)
+            if location:
+                result = endpointFetchers[endpoint](location["lat"], location["lon"], self.transport, self.cadences[endpoint])
+        except Exception as e:
+            print(f"Error refreshing {endpoint} for {city}: {e}")
+
+        succeeded: bool = bool(result)
+        failures: int = self.progress.record(city, endpoint, attemptedAt, succeeded)
+        if succeeded and self.onResult is not None:
+            try:
+                self.onResult(city, endpoint, result)
+            except Exception as e:
+                print(f"Error handling {endpoint} for {city}: {e}")
+        return city, endpoint, attemptedAt, succeeded, failures
+
+    def completed(self, future) -> None:
+        city, endpoint, attemptedAt, succeeded, failures = future.result()
+        self.refreshCounts[endpoint] += 1
+        if not succeeded:
+            self.failureCounts[endpoint] += 1
+        self.push(self.nextDue(endpoint, attemptedAt, attemptedAt, failures), city, endpoint)
+
+    def run(self) -> None:
+        self.stopping.clear()
+        self.schedule()
+        running: set = set()
+
+        with ThreadPoolExecutor(max_workers=self.maxConcurrency) as executor:
+            while not self.stopping.is_set():
+                now: float = time.time()
+                while self.queue and self.queue[0][0] <= now and len(running) < self.maxConcurrency:
+                    _, _, city, endpoint = heapq.heappop(self.queue)
+                    running.add(executor.submit(self.refresh, city, endpoint))
+                self.running = len(running)
+
+                # Wake up for the next due refresh, a completed one or stop(), at least once a second
+                timeout: float = 1.0
+                if self.queue and len(running) < self.maxConcurrency:
+                    timeout = min(timeout, max(0.0, self.queue[0][0] - now))
+                if running:
+                    done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.completed(future)
+                else:
+                    self.stopping.wait(timeout)
+
+            for future in running:
+                self.completed(future)
+            self.running = 0
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    def metrics(self) -> dict:
+        return {
+            "refreshes": dict(self.refreshCounts),
+            "failures": dict(self.failureCounts),
+            "queued": len(self.queue),
+            "running": self.running,
+            "nextDueSeconds": round(self.queue[0][0] - time.time(), 3) if self.queue else None,
+        }
+
+
+def main() -> None:
+    from weatherGeocodeCache import GeocodeCache
+    from weatherObservationStore import ObservationStore, RecordingTransport
+    from weatherRateLimiter import RateLimitedTransport
+    from weatherTransport import HttpTransport
+
+    parser = argparse.ArgumentParser(description="Keep the weather of cities.db tables fresh, each endpoint on its own cadence.")
+    parser.add_argument("tables", nargs="*", help="cities.db tables, e.g. world USStates")
+    parser.add_argument("--query", help='SQL query returning (name, "City-CC") rows')
+    parser.add_argument("--workers", type=int, default=4, help="refreshes running at the same time")
+    parser.add_argument("--cadence", action="append", default=[], metavar="ENDPOINT=SECONDS",
+                        help=f"override a cadence; endpoints: {', '.join(defaultCadences)}")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--startup-spread", type=float, default=60.0)
+    parser.add_argument("--progress-database", default=refresherDatabasePath)
+    parser.add_argument("--database", default=citiesDatabasePath)
+    arguments = parser.parse_args()
+
+    if not arguments.tables and not arguments.query:
+        parser.error("give at least one table or --query")
+
+    cadences: dict = dict(defaultCadences)
+    for override in arguments.cadence:
+        endpoint, _, seconds = override.partition("=")
+        if endpoint not in defaultCadences or not seconds:
+            parser.error(f"invalid --cadence {override}")
+        cadences[endpoint] = float(seconds)
+
+    cities: list = []
+    for table in arguments.tables:
+        cities.extend(loadCities(table=table, databasePath=arguments.database))
+    if arguments.query:
+        cities.extend(loadCities(query=arguments.query, databasePath=arguments.database))
+
+    store: ObservationStore = ObservationStore()
+    transport: RecordingTransport = RecordingTransport(RateLimitedTransport(HttpTransport(poolMaxSize=arguments.workers)), store)
+    progress: RefreshProgress = RefreshProgress(arguments.progress_database)
+    refresher: Refresher = Refresher(
+        cities, transport, GeocodeCache(), progress, cadences,
+        maxConcurrency=arguments.workers, jitter=arguments.jitter, startupSpread=arguments.startup_spread
+    )
+
+    for signalNumber in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signalNumber, lambda *_: refresher.stop())
+
+    print(f"Refreshing {len(refresher.cities)} cities, {len(cadences)} endpoints each, with {arguments.workers} workers", flush=True)
+    try:
+        refresher.run()
+    finally:
+        print(f"Stopped: {refresher.metrics()}", flush=True)
+        transport.close()
+        progress.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Record/Replay Transport
+#
+# `ReplayTransport` captures API responses to disk once and answers the same requests from disk afterwards, so benchmarks, load tests and demos run offline and deterministically without spending API quota.
+#
+# ##### `Cassette(directory, ignoreParameters)`
+#
+# - A directory with one JSON file per distinct request, holding the endpoint, its parameters and the decoded response. Files can be read, edited or checked in like any fixture.
+# - Requests are matched by endpoint and parameters, never by host, so responses recorded from api.openweathermap.org replay for pro.openweathermap.org or a mock server. The API key is never stored; `ignoreParameters` leaves more parameters out of the match, e.g. `("start", "end")` for history ranges that move with the clock.
+# - Recorded bodies are kept in memory after their first read and decoded on every hit, so every caller gets its own copy (the `process...` methods modify the response they are given).
+#
+# ##### `ReplayTransport(cassette, transport, mode)` / `AsyncReplayTransport(cassette, transport, mode)`
+#
+# - `mode="replay"` answers only from the cassette; a request that was never recorded raises `ReplayMissError`, a `requests.exceptions.RequestException`, so `constructUrl` reports it and returns `None` like any failed request. `AsyncReplayTransport` raises an `aiohttp.ClientError` instead, which `asyncConstructUrl` handles the same way.
+# - `mode="record"` sends every request to `transport` and overwrites its recording; `mode="auto"` replays what is recorded and records the rest.
+# - Failed requests are never recorded.
+
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+replayModes: tuple = ("replay", "record", "auto")
+
+
+class ReplayMissError(requests.exceptions.RequestException):
+    pass
+
+
+class Cassette:
+    def __init__(self, directory: str, ignoreParameters: tuple = ()):
+        self.directory: str = directory
+        self.ignoreParameters: set = {"appid", *(name.lower() for name in ignoreParameters)}
+        self.bodies: dict = {}
+        self.lock: threading.Lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def keyFor(self, url: str, params: dict = None) -> tuple:
+        keyParameters: tuple = tuple(
+            (name, str(value)) for name, value in sorted((params or {}).items()) if name.lower() not in self.ignoreParameters
+        )
+        return (urlsplit(url).path.strip("/"), keyParameters)
+
+    def pathFor(self, key: tuple) -> str:
+        digest: str = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, f"{key[0].replace('/', '_')}-{digest}.json")
+
+    def __contains__(self, key: tuple) -> bool:
+        with self.lock:
+            return key in self.bodies or os.path.exists(self.pathFor(key))
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def load(self, key: tuple):
+        with self.lock:
+            body: bytes = self.bodies.get(key)
+            if body is None:
+                try:
+                    with open(self.pathFor(key), "rb") as file:
+                        body = json.dumps(json.load(file)["response"], separators=(",", ":")).encode()
+                except FileNotFoundError:
+                    return None
+                self.bodies[key] = body
+        return json.loads(body)
+
+    def save(self, key: tuple, payload) -> None:
+        recording: dict = {"endpoint": key[0], "params": dict(key[1]), "response": payload}
+        path: str = self.pathFor(key)
+        temporaryPath: str = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporaryPath, "w", encoding="utf-8") as file:
+            json.dump(recording, file, ensure_ascii=False)
+        os.replace(temporaryPath, path)
+
+        with self.lock:
+            self.bodies[key] = json.dumps(payload, separators=(",", ":")).encode()
+
+
+def checkMode(mode: str, transport) -> None:
+    if mode not in replayModes:
+        raise ValueError(f"Unknown replay mode: {mode}")
+    if mode != "replay" and transport is None:
+        raise ValueError(f"Mode {mode!r} needs a transport to record from")
+
+
+class ReplayTransport:
+    def __init__(self, cassette: Cassette, transport=None, mode: str = "replay"):
+        checkMode(mode, transport)
+        self.cassette: Cassette = cassette
+        self.transport = transport
+        self.mode: str = mode
+
+    def get(self, url: str, params: dict = None) -> dict:
+        key: tuple = self.cassette.keyFor(url, params)
+        if self.mode != "record":
+            payload = self.cassette.load(key)
+            if payload is not None:
+                return payload
+            if self.mode == "replay":
+                raise ReplayMissError(f"No recorded response for {key[0]} with {dict(key[1])}")
+
+        payload = self.transport.get(url, params=params)
+        self.cassette.save(key, payload)
+        return payload
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    def __enter__(self) -> "ReplayTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncReplayTransport:
+    def __init__(self, cassette: Cassette, transport=None, mode: str = "replay"):
+        checkMode(mode, transport)
+        self.cassette: Cassette = cassette
+        self.transport = transport
+        self.mode: str = mode
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        key: tuple = self.cassette.keyFor(url, params)
+        if self.mode != "record":
+            payload = self.cassette.load(key)
+            if payload is not None:
+                return payload
+            if self.mode == "replay":
+                import aiohttp
+                raise aiohttp.ClientError(f"No recorded response for {key[0]} with {dict(key[1])}")
+
+        payload = await self.transport.get(url, params=params)
+        self.cassette.save(key, payload)
+        return payload
+
+    async def open(self) -> None:
+        if self.transport is not None:
+            await self.transport.open()
+
+    async def close(self) -> None:
+        if self.transport is not None:
+            await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncReplayTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the Response Cache
+#
+# Current weather, forecasts and air pollution change on very different schedules, so `ResponseCache` keeps each API response for a time-to-live chosen per endpoint (`endpointTtls`). Unknown endpoints are never cached.
+#
+# - Keys are built from the endpoint and its parameters, with `lat`/`lon` rounded to `coordinatePrecision` decimals (2 decimals is about 1 km), so requests for nearby points share an entry. The API key is left out of the key.
+# - Responses are stored as compact JSON bytes and decoded on every hit. The `process...` methods modify the response they are given, so every caller gets its own copy.
+# - `maxBytes` bounds the memory used by the stored responses; the least recently used entries are evicted first.
+# - With `staleWhileRevalidate`, an entry that expired less than `maxStale` seconds ago (by default its TTL) is returned right away while one background refresh per key fetches a new copy.
+# - `metrics` returns hits, stale hits, misses, evictions, the number of entries and the bytes in use.
+#
+# ##### `CachingTransport(transport, cache)` / `AsyncCachingTransport(transport, cache)`
+#
+# - Wrap an `HttpTransport` or `AsyncHttpTransport` and can be passed anywhere a transport is accepted, e.g. `CurrentWeather(latitude, longitude, CachingTransport(HttpTransport()))`. Background refreshes run on a small thread pool or as asyncio tasks respectively; `close()` waits for the running ones.
+# - `CachingTransport.stream` (used by `streamConstructUrl`) answers a cached response with its stored JSON bytes. A miss streams from the wrapped transport and is not stored, since storing it would hold the whole body in memory.
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+endpointTtls: dict = {
+    "geo/1.0/direct": 24 * 3600,
+    "data/2.5/weather": 10 * 60,
+    "data/2.5/forecast/hourly": 30 * 60,
+    "data/2.5/forecast": 60 * 60,
+    "data/2.5/forecast/daily": 60 * 60,
+    "data/2.5/air_pollution": 10 * 60,
+    "data/2.5/air_pollution/forecast": 60 * 60,
+    "data/2.5/air_pollution/history": 24 * 3600,
+}
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttls: dict = None,
+        maxBytes: int = 64 * 1024 * 1024,
+        coordinatePrecision: int = 2,
+        staleWhileRevalidate: bool = False,
+        maxStale: float = None
+    ):
+        self.ttls: dict = {**endpointTtls, **(ttls or {})}
+        self.maxBytes: int = maxBytes
+        self.coordinatePrecision: int = coordinatePrecision
+        self.staleWhileRevalidate: bool = staleWhileRevalidate
+        self.maxStale: float = maxStale
+        self.entries: OrderedDict = OrderedDict()
+        self.bytesUsed: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+        self.hits: int = 0
+        self.staleHits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @staticmethod
+    def endpointOf(url: str) -> str:
+        return urlsplit(url).path.strip("/")
+
+    def ttlFor(self, url: str) -> float:
+        return self.ttls.get(self.endpointOf(url), 0)
+
+    def keyFor(self, url: str, params: dict = None) -> tuple:
+        keyParameters: list = []
+        for name, value in sorted((params or {}).items()):
+            if name.lower() == "appid":
+                continue
+            if name in ("lat", "lon"):
+                value = round(float(value), self.coordinatePrecision)
+            keyParameters.append((name, str(value)))
+        return (self.endpointOf(url), tuple(keyParameters))
+
+    def lookup(self, key: tuple, ttl: float) -> tuple:
+        # Returns (payload, isStale); payload is None on a miss.
+        body, isStale = self.lookupBody(key, ttl)
+        return (None if body is None else json.loads(body)), isStale
+
+    def lookupBody(self, key: tuple, ttl: float) -> tuple:
+        # Returns (stored JSON bytes, isStale); the bytes are None on a miss.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            body, storedAt = entry
+            age: float = time.monotonic() - storedAt
+            if age <= ttl:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return body, False
+
+            maxStale: float = self.maxStale if self.maxStale is not None else ttl
+            if self.staleWhileRevalidate and age <= ttl + maxStale:
+                self.staleHits += 1
+                self.entries.move_to_end(key)
+                return body, True
+
+            self.misses += 1
+            return None, False
+
+    def store(self, key: tuple, payload) -> None:
+        body: bytes = json.dumps(payload, separators=(",", ":")).encode()
+        if len(body) > self.maxBytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytesUsed -= len(previous[0])
+
+            self.entries[key] = (body, time.monotonic())
+            self.bytesUsed += len(body)
+
+            while self.bytesUsed > self.maxBytes:
+                _, (evictedBody, _) = self.entries.popitem(last=False)
+                self.bytesUsed -= len(evictedBody)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytesUsed = 0
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "staleHits": self.staleHits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.bytesUsed,
+            }
+
+
+class CachingTransport:
+    def __init__(self, transport=None, cache: ResponseCache = None, refreshWorkers: int = 2):
+        from weatherTransport import getDefaultTransport
+
+        self.transport = transport or getDefaultTransport()
+        self.cache: ResponseCache = cache or ResponseCache()
+        self.refreshing: set = set()
+        self.refreshingLock: threading.Lock = threading.Lock()
+        self.refreshExecutor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=refreshWorkers)
+
+    def refresh(self, key: tuple, url: str, params: dict) -> None:
+        try:
+            self.cache.store(key, self.transport.get(url, params=params))
+        except Exception as e:
+            print(f"Error refreshing cached response: {e}")
+        finally:
+            with self.refreshingLock:
+                self.refreshing.discard(key)
+
+    def get(self, url: str, params: dict = None) -> dict:
+        ttl: float = self.cache.ttlFor(url)
+        if not ttl:
+            return self.transport.get(url, params=params)
+
+        key: tuple = self.cache.keyFor(url, params)
+        payload, isStale = self.cache.lookup(key, ttl)
+
+        if payload is None:
+            payload = self.transport.get(url, params=params)
+            self.cache.store(key, payload)
+            return payload
+
+        if isStale:
+            self.startRefresh(key, url, params)
+        return payload
+
+    def startRefresh(self, key: tuple, url: str, params: dict) -> None:
+        with self.refreshingLock:
+            startRefresh: bool = key not in self.refreshing
+            self.refreshing.add(key)
+        if startRefresh:
+            self.refreshExecutor.submit(self.refresh, key, url, dict(params or {}))
+
+    def stream(self, url: str, params: dict = None, chunkSize: int = 65536):
+        if not hasattr(self.transport, "stream"):
+            return (json.dumps(self.get(url, params=params), separators=(",", ":")).encode(),)
+
+        ttl: float = self.cache.ttlFor(url)
+        if ttl:
+            key: tuple = self.cache.keyFor(url, params)
+            body, isStale = self.cache.lookupBody(key, ttl)
+            if body is not None:
+                if isStale:
+                    self.startRefresh(key, url, params)
+                return (body[start:start + chunkSize] for start in range(0, len(body), chunkSize))
+
+        return self.transport.stream(url, params=params, chunkSize=chunkSize)
+
+    def close(self) -> None:
+        self.refreshExecutor.shutdown(wait=True)
+        self.transport.close()
+
+    def __enter__(self) -> "CachingTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncCachingTransport:
+    def __init__(self, transport, cache: ResponseCache = None):
+        self.transport = transport
+        self.cache: ResponseCache = cache or ResponseCache()
+        self.refreshing: dict = {}
+
+    async def refresh(self, key: tuple, url: str, params: dict) -> None:
+        try:
+            self.cache.store(key, await self.transport.get(url, params=params))
+        except Exception as e:
+            print(f"Error refreshing cached response: {e}")
+        finally:
+            self.refreshing.pop(key, None)
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        ttl: float = self.cache.ttlFor(url)
+        if not ttl:
+            return await self.transport.get(url, params=params)
+
+        key: tuple = self.cache.keyFor(url, params)
+        payload, isStale = self.cache.lookup(key, ttl)
+
+        if payload is None:
+            payload = await self.transport.get(url, params=params)
+            self.cache.store(key, payload)
+            return payload
+
+        if isStale and key not in self.refreshing:
+            self.refreshing[key] = asyncio.ensure_future(self.refresh(key, url, dict(params or {})))
+        return payload
+
+    async def open(self) -> None:
+        await self.transport.open()
+
+    async def close(self) -> None:
+        tasks: list = list(self.refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncCachingTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the HTTP Service
+#
+# `WeatherService` serves the forecasts over HTTP with aiohttp, so frontends can poll them instead of running the interactive script. Every route takes either `?city=Tehran,IR` or `?lat=35.69&lon=51.39` and returns `{"location": ..., "data": ...}`, where `data` is what the matching async fetch class (see `weatherAsync.py`) returns:
+#
+# - `/weather/current`, `/forecast/hourly`, `/forecast/daily`, `/forecast/3hour`
+# - `/air-pollution/current`, `/air-pollution/forecast`, `/air-pollution/history` (`start` and `end` Unix timestamps, by default the 7 days up to the start of the current hour, so default requests share one cache entry and ETag for the hour, and `downsampling`)
+# - `/health` answers `{"status": "ok"}`.
+#
+# Requests for the same route and location share work at three levels:
+#
+# - Rendered responses are cached per route and location (coordinates rounded to `coordinatePrecision` decimals) for the TTL of their endpoint (`endpointTtls` in `weatherResponseCache.py`), together with their gzip body and ETag, so a cache hit does no processing, serializing or compressing at all. Concurrent misses for the same key wait for one render; failed renders are not cached.
+# - Below that, one shared `AsyncCachingTransport(AsyncSingleFlightTransport(AsyncHttpTransport()))` keeps the upstream connection pool and the raw response cache, and coalesces identical upstream calls.
+# - City names are geocoded once per process, keeping up to `maxEntries` of them (and through `geocodeCache`, when given).
+#
+# Responses carry a strong `ETag` and `Cache-Control: max-age` (the entry's remaining TTL). A conditional GET whose `If-None-Match` matches gets `304 Not Modified` without a body. Bodies of at least `minimumGzipBytes` are sent gzip-compressed to clients that accept it. Connections are kept alive for `keepaliveTimeout` seconds.
+#
+# Bad parameters answer 400, a city the geocoder does not know 404 and a failed upstream call (the geocoding call included) 502, each with `{"error": ...}`.
+#
+# From the command line: `python weatherService.py [--host 127.0.0.1] [--port 8080] [--geocode-cache]`.
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+
+from weatherAsync import (
+    AsyncAirPollutionData,
+    AsyncAirPollutionForecast,
+    AsyncAirPollutionHistory,
+    AsyncCurrentWeather,
+    AsyncDailyWeatherForecast,
+    AsyncFiveDaysThreeHoursWeatherForecast,
+    AsyncGeolocationDataFetcher,
+    AsyncHourlyWeatherForecast,
+    AsyncHttpTransport,
+    asyncConstructUrl,
+)
+from weatherForcastingProject import AirPollutionHistory
+from weatherResponseCache import AsyncCachingTransport, endpointTtls
+from weatherSingleFlight import AsyncSingleFlightTransport
+
+
+class RenderedResponse:
+    __slots__ = ("body", "gzipBody", "etag", "expiresAt")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body: bytes = body
+        self.gzipBody: bytes = None
+        self.etag: str = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.expiresAt: float = time.monotonic() + ttl
+
+    def compressed(self) -> bytes:
+        if self.gzipBody is None:
+            self.gzipBody = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self.gzipBody
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def parseTimestamp(value: str, default: int) -> int:
+    return default if value is None else int(value)
+
+
+async def fetchThreeHourForecast(latitude: float, longitude: float, transport) -> list:
+    # The 3-hour forecast class returns an empty list when the request fails; the other classes return None
+    forecast: AsyncFiveDaysThreeHoursWeatherForecast = AsyncFiveDaysThreeHoursWeatherForecast(latitude, longitude, transport)
+    forecastList: list = await forecast.fiveDaysThreeHoursForcast()
+    return forecast.processForecastedData(forecastList) if forecastList else None
+
+
+class WeatherService:
+    # route -> (upstream endpoint, whose TTL applies; coroutine function fetching the data)
+    routes: dict = {
+        "/weather/current": ("data/2.5/weather", lambda latitude, longitude, transport, query: AsyncCurrentWeather(latitude, longitude, transport).currentWeather()),
+        "/forecast/hourly": ("data/2.5/forecast/hourly", lambda latitude, longitude, transport, query: AsyncHourlyWeatherForecast(latitude, longitude, transport).hourlyForecast()),
+        "/forecast/daily": ("data/2.5/forecast/daily", lambda latitude, longitude, transport, query: AsyncDailyWeatherForecast(latitude, longitude, transport).dailyForecast()),
+        "/forecast/3hour": ("data/2.5/forecast", lambda latitude, longitude, transport, query: fetchThreeHourForecast(latitude, longitude, transport)),
+        "/air-pollution/current": ("data/2.5/air_pollution", lambda latitude, longitude, transport, query: AsyncAirPollutionData(latitude, longitude, transport).currentAirPollution()),
+        "/air-pollution/forecast": ("data/2.5/air_pollution/forecast", lambda latitude, longitude, transport, query: AsyncAirPollutionForecast(latitude, longitude, transport).airPollutionForecast()),
+        "/air-pollution/history": ("data/2.5/air_pollution/history", lambda latitude, longitude, transport, query: AsyncAirPollutionHistory(
+            latitude, longitude, query["start"], query["end"], transport, query["downsampling"]
+        ).airPollutionHistory()),
+    }
+
+    def __init__(
+        self,
+        transport=None,
+        geocodeCache=None,
+        maxEntries: int = 4096,
+        coordinatePrecision: int = 2,
+        minimumGzipBytes: int = 1024,
+        keepaliveTimeout: float = 75.0
+    ):
+        self.transport = transport or AsyncCachingTransport(AsyncSingleFlightTransport(AsyncHttpTransport()))
+        self.geocodeCache = geocodeCache
+        self.maxEntries: int = maxEntries
+        self.coordinatePrecision: int = coordinatePrecision
+        self.minimumGzipBytes: int = minimumGzipBytes
+        self.keepaliveTimeout: float = keepaliveTimeout
+
+        self.rendered: OrderedDict = OrderedDict()
+        self.rendering: dict = {}
+        self.geolocations: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.notModified: int = 0
+
+    def application(self) -> web.Application:
+        app: web.Application = web.Application()
+        for path in self.routes:
+            app.router.add_get(path, lambda request, path=path: self.handle(request, path))
+        app.router.add_get("/health", self.health)
+        app.on_startup.append(lambda app: self.transport.open())
+        app.on_cleanup.append(lambda app: self.transport.close())
+        return app
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    @staticmethod
+    def errorResponse(status: int, message: str) -> web.Response:
+        return web.json_response({"error": message}, status=status)
+
+    async def geocode(self, city: str) -> dict:
+        # Unlike getGeolocationData, tells a city the geocoder does not know apart from a failed geocoding call
+        fetcher: AsyncGeolocationDataFetcher = AsyncGeolocationDataFetcher(self.transport, self.geocodeCache)
+        if self.geocodeCache is not None:
+            cachedGeolocation: dict = self.geocodeCache.get(city)
+            if cachedGeolocation:
+                return cachedGeolocation
+
+        geoData = await asyncConstructUrl(**fetcher.geolocationRequest(city), transport=self.transport)
+        if not isinstance(geoData, list):
+            raise UpstreamError(f"Geocoding {city} failed")
+        geolocationData: dict = fetcher.processGeolocationData(geoData)
+        if not geolocationData:
+            raise LookupError(f"Unknown city: {city}")
+
+        if self.geocodeCache is not None:
+            self.geocodeCache.put(city, geolocationData)
+        return geolocationData
+
+    async def resolveLocation(self, query) -> dict:
+        if "city" in query:
+            city: str = query["city"].strip()
+            if not city:
+                raise ValueError("city is empty")
+            geolocationData: dict = self.geolocations.get(city)
+            if geolocationData is None:
+                geolocationData = await self.geocode(city)
+                self.geolocations[city] = geolocationData
+                if len(self.geolocations) > self.maxEntries:
+                    self.geolocations.popitem(last=False)
+            return {**geolocationData, "lat": round(geolocationData["lat"], self.coordinatePrecision),
+                    "lon": round(geolocationData["lon"], self.coordinatePrecision)}
+
+        if "lat" not in query or "lon" not in query:
+            raise ValueError("give city, or lat and lon")
+        latitude: float = float(query["lat"])
+        longitude: float = float(query["lon"])
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+        return {"lat": round(latitude, self.coordinatePrecision), "lon": round(longitude, self.coordinatePrecision)}
+
+    @staticmethod
+    def routeQuery(path: str, query) -> dict:
+        if path != "/air-pollution/history":
+            return {}
+
+        # Rounded down to the hour, so the cache keys and the ETag of default requests stay the same for an hour
+        now: int = int(time.time()) // 3600 * 3600
+        routeQuery: dict = {
+            "end": parseTimestamp(query.get("end"), now),
+            "start": parseTimestamp(query.get("start"), now - 7 * 24 * 3600),
+            "downsampling": query.get("downsampling", "every24Hours"),
+        }
+        if routeQuery["downsampling"] not in AirPollutionHistory.downsamplingModes:
+            raise ValueError(f"downsampling must be one of {', '.join(AirPollutionHistory.downsamplingModes)}")
+        if routeQuery["start"] >= routeQuery["end"]:
+            raise ValueError("start must be before end")
+        return routeQuery
+
+    async def render(self, path: str, location: dict, routeQuery: dict) -> RenderedResponse:
+        endpoint, fetch = self.routes[path]
+        data = await fetch(location["lat"], location["lon"], self.transport, routeQuery)
+        if data is None:
+            raise UpstreamError(f"Upstream request for {endpoint} failed")
+        body: bytes = json.dumps({"location": location, "data": data}, ensure_ascii=False, separators=(",", ":")).encode()
+        return RenderedResponse(body, endpointTtls.get(endpoint, 0))
+
+    async def lookup(self, path: str, location: dict, routeQuery: dict) -> RenderedResponse:
+        key: tuple = (path, location["lat"], location["lon"], tuple(sorted(routeQuery.items())))
+
+        rendered: RenderedResponse = self.rendered.get(key)
+        if rendered is not None and rendered.expiresAt > time.monotonic():
+            self.hits += 1
+            self.rendered.move_to_end(key)
+            return rendered
+
+        self.misses += 1
+        pending: asyncio.Future = self.rendering.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self.render(path, location, routeQuery))
+            self.rendering[key] = pending
+            try:
+                rendered = await asyncio.shield(pending)
+            finally:
+                self.rendering.pop(key, None)
+
+            self.rendered[key] = rendered
+            self.rendered.move_to_end(key)
+            while len(self.rendered) > self.maxEntries:
+                self.rendered.popitem(last=False)
+            return rendered
+
+        return await asyncio.shield(pending)
+
+    def respond(self, request: web.Request, rendered: RenderedResponse) -> web.Response:
+        headers: dict = {
+            "ETag": rendered.etag,
+            "Cache-Control": f"max-age={max(0, int(rendered.expiresAt - time.monotonic()))}",
+            "Vary": "Accept-Encoding",
+        }
+
+        ifNoneMatch: str = request.headers.get("If-None-Match")
+        if ifNoneMatch:
+            tags: set = {tag.strip().removeprefix("W/") for tag in ifNoneMatch.split(",")}
+            if "*" in tags or rendered.etag in tags:
+                self.notModified += 1
+                return web.Response(status=304, headers=headers)
+
+        body: bytes = rendered.body
+        if len(body) >= self.minimumGzipBytes and "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = rendered.compressed()
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+    async def handle(self, request: web.Request, path: str) -> web.Response:
+        try:
+            location: dict = await self.resolveLocation(request.query)
+            routeQuery: dict = self.routeQuery(path, request.query)
+        except ValueError as e:
+            return self.errorResponse(400, str(e))
+        except LookupError as e:
+            return self.errorResponse(404, str(e))
+        except UpstreamError as e:
+            return self.errorResponse(502, str(e))
+
+        try:
+            rendered: RenderedResponse = await self.lookup(path, location, routeQuery)
+        except UpstreamError as e:
+            return self.errorResponse(502, str(e))
+        return self.respond(request, rendered)
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "notModified": self.notModified, "entries": len(self.rendered)}
+
+    def run(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        web.run_app(self.application(), host=host, port=port, keepalive_timeout=self.keepaliveTimeout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the forecasts over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--geocode-cache", action="store_true", help="use the on-disk geocoding cache")
+    arguments = parser.parse_args()
+
+    geocodeCache = None
+    if arguments.geocode_cache:
+        from weatherGeocodeCache import GeocodeCache
+        geocodeCache = GeocodeCache()
+
+    WeatherService(geocodeCache=geocodeCache).run(arguments.host, arguments.port)
+
+
+if __name__ == "__main__":
+    main()
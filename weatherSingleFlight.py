@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Request Coalescing (Single-Flight)
+#
+# When many callers ask for the same city at once, each would send its own identical request upstream. `SingleFlightTransport` (threads) and `AsyncSingleFlightTransport` (asyncio) wrap a transport so that concurrent calls with the same URL and parameters share one in-flight request and all receive its result.
+#
+# - The first caller (the leader) sends the request; the others wait for it. If it fails, every waiting caller gets the same error.
+# - The response is serialized once and every waiting caller decodes its own copy, because the `process...` methods modify the response they are given.
+# - `upstreamCalls` counts the requests actually sent and `sharedCalls` the calls answered by another caller's request.
+# - They compose with the other transports, e.g. `CachingTransport(SingleFlightTransport(HttpTransport()))` coalesces the cache misses.
+
+import asyncio
+import json
+import threading
+
+
+def requestKey(url: str, params: dict = None) -> tuple:
+    return (url, tuple(sorted((name, str(value)) for name, value in (params or {}).items())))
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done: threading.Event = threading.Event()
+        self.body: bytes = None
+        self.error: BaseException = None
+
+
+class SingleFlightTransport:
+    def __init__(self, transport=None):
+        from weatherTransport import getDefaultTransport
+
+        self.transport = transport or getDefaultTransport()
+        self.calls: dict = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.upstreamCalls: int = 0
+        self.sharedCalls: int = 0
+
+    def get(self, url: str, params: dict = None) -> dict:
+        key: tuple = requestKey(url, params)
+
+        with self.lock:
+            call: InFlightCall = self.calls.get(key)
+            isLeader: bool = call is None
+            if isLeader:
+                call = InFlightCall()
+                self.calls[key] = call
+                self.upstreamCalls += 1
+            else:
+                self.sharedCalls += 1
+
+        if not isLeader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return json.loads(call.body)
+
+        try:
+            payload = self.transport.get(url, params=params)
+            call.body = json.dumps(payload).encode()
+            return payload
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call.done.set()
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self) -> "SingleFlightTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncSingleFlightTransport:
+    def __init__(self, transport):
+        self.transport = transport
+        self.calls: dict = {}
+        self.upstreamCalls: int = 0
+        self.sharedCalls: int = 0
+
+    async def fetch(self, key: tuple, url: str, params: dict) -> bytes:
+        try:
+            payload = await self.transport.get(url, params=params)
+            return json.dumps(payload).encode()
+        finally:
+            self.calls.pop(key, None)
+
+    async def get(self, url: str, params: dict = None) -> dict:
+        key: tuple = requestKey(url, params)
+
+        call: asyncio.Future = self.calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(self.fetch(key, url, params))
+            self.calls[key] = call
+            self.upstreamCalls += 1
+        else:
+            self.sharedCalls += 1
+
+        return json.loads(await asyncio.shield(call))
+
+    async def open(self) -> None:
+        await self.transport.open()
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    async def __aenter__(self) -> "AsyncSingleFlightTransport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Binary Report Snapshots
+#
+# A versioned binary file format for processed city reports, i.e. the dictionaries of `fetchCityReport` / `fetchLocationReport` (current weather, hourly, daily and 3-hour forecasts, air pollution) or of `BatchRunner.run`, for shipping between services and for cold storage. It is several times smaller than the same reports as JSON, and one city can be read without parsing the others.
+#
+# - Every part of a report is stored column by column: each key path of its dictionaries (e.g. `temperature` / `day` of the daily forecast, or one component of an air pollution entry) becomes one little-endian array. Integers are `int32` (`int64` when they do not fit), numbers are `float32` (`float64` when `float32` cannot give the value back exactly), formatted times are `int32` seconds from the first one and dates are `int32` days. Strings such as "Clouds - few clouds" go to one string table shared by the whole snapshot, and the columns hold their indexes.
+# - Reading a report back gives dictionaries equal to the ones written (`float32` values are rounded back to the number of decimals of their column, e.g. 21.4, and numbers written as `21` in a number column come back as `21.0`). Values of any other type are kept as JSON strings.
+# - With `compression="zlib"`, every column and index block is compressed separately, so reading one city still only decompresses that city's blocks.
+#
+# ##### File layout (version 1)
+#
+# - A 32-byte header: the magic `b"WXSNAP\0\0"`, the version, the flags (1 = zlib) and the offset and length of the index.
+# - Per city, the column arrays, each aligned to 8 bytes, followed by the city's index block: JSON with, per part, the number of rows and the type, offset and length of each column.
+# - The index: JSON with the string table and the offset and length of the index block of each city.
+#
+# ##### `SnapshotWriter(path, compression, level)` / `writeSnapshot(path, reports, compression)`
+#
+# - `add(name, report)` appends the columns of one city as it comes (e.g. from `BatchRunner.run`); `close()` writes the index. The file is written next to `path` and moved into place when complete. `writeSnapshot` writes a dictionary (or pairs) of name → report in one call.
+#
+# ##### `SnapshotReader(path)`
+#
+# - Memory-maps the file and only decodes the header and the index; the index block of a city is decoded when the city is read. `series(name, part)` returns a `SnapshotSeries`, and `report(name)` the whole report of one city as dictionaries again.
+# - `SnapshotSeries.column(*path)` is the stored NumPy array of one column: for an uncompressed snapshot, a read-only view of the mapped file, without any copy. `values(*path)` decodes it (formatted times, strings, ...) and `to_list()` rebuilds the dictionaries of the part.
+# - Release the arrays of `column` before `close()`; the mapping is only unmapped once no array uses it.
+
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from weatherTime import utcFormatter
+
+snapshotMagic: bytes = b"WXSNAP\0\0"
+snapshotVersion: int = 1
+headerFormat: str = "<8sHHIQQ"
+headerSize: int = struct.calcsize(headerFormat)
+compressedFlag: int = 1
+
+columnDtypes: dict = {
+    "int32": "<i4", "int64": "<i8", "float32": "<f4", "float64": "<f8",
+    "time": "<i4", "date": "<i4", "string": "<i4", "json": "<i4",
+}
+missingIntegers: dict = {"<i4": -2 ** 31, "<i8": -2 ** 63}
+
+absent = object()
+
+
+def flattenRow(row: dict, prefix: tuple, values: dict) -> None:
+    for key, value in row.items():
+        path: tuple = prefix + (key,)
+        if isinstance(value, dict) and value:
+            flattenRow(value, path, values)
+        else:
+            values[path] = value
+
+
+def numbersColumnType(values: list) -> tuple:
+    if all(type(value) is int for value in values):
+        return "int32" if all(-2 ** 31 < value < 2 ** 31 for value in values) else "int64", None
+
+    numbers: np.ndarray = np.array(values, dtype=np.float64)
+    narrowed: np.ndarray = numbers.astype(np.float32)
+    widened: np.ndarray = narrowed.astype(np.float64)
+    # Most API values have a few decimals, which np.round restores from float32 exactly
+    for decimals in range(7):
+        if np.array_equal(np.round(widened, decimals), numbers, equal_nan=True):
+            return "float32", decimals
+    if np.array_equal(narrowed.astype(str).astype(np.float64), numbers, equal_nan=True):
+        return "float32", None
+    return "float64", None
+
+
+def textColumnType(values: list) -> str:
+    lengths: set = {len(value) for value in values}
+    if lengths == {19} or lengths == {10}:
+        try:
+            parsed: np.ndarray = np.array(values, dtype="datetime64[s]").astype(np.int64)
+        except ValueError:
+            return "string"
+        if lengths == {19}:
+            if utcFormatter.formatMany(parsed).tolist() == values and parsed.max() - parsed.min() < 2 ** 31:
+                return "time"
+        elif np.datetime_as_string(parsed.astype("datetime64[s]"), unit="D").tolist() == values:
+            return "date"
+    return "string"
+
+
+def columnType(values: list) -> tuple:
+    # The type of the column, how missing values are read back ("absent", "null" or None) and the decimals of float32 values
+    present: list = [value for value in values if value is not absent and value is not None]
+    hasAbsent: bool = any(value is absent for value in values)
+    hasNone: bool = any(value is None for value in values)
+    missing: str = "absent" if hasAbsent else "null" if hasNone else None
+
+    if hasAbsent and hasNone or not present:
+        return "json", missing, None
+    if all(type(value) is str for value in present):
+        return textColumnType(present), missing, None
+    if all(type(value) in (int, float) for value in present):
+        kind, decimals = numbersColumnType(present)
+        if missing and kind.startswith("float") and any(value != value for value in present):
+            # A NaN value could not be told apart from a missing one
+            return "json", missing, None
+        return kind, missing, decimals
+    return "json", missing, None
+
+
+class SnapshotWriter:
+    def __init__(self, path: str, compression: str = None, level: int = 6):
+        if compression not in (None, "zlib"):
+            raise ValueError(f"Unknown snapshot compression: {compression}")
+
+        self.path: str = path
+        self.temporaryPath: str = f"{path}.tmp"
+        self.compression: str = compression
+        self.level: int = level
+        self.strings: list = []
+        self.stringIndexes: dict = {}
+        self.cities: dict = {}
+        self.file = open(self.temporaryPath, "wb")
+        self.file.write(bytes(headerSize))
+
+    def stringIndex(self, value: str) -> int:
+        index: int = self.stringIndexes.get(value)
+        if index is None:
+            index = self.stringIndexes[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def writeBlock(self, data: bytes) -> tuple:
+        if self.compression == "zlib":
+            data = zlib.compress(data, self.level)
+        offset: int = self.file.tell()
+        self.file.write(data)
+        self.file.write(bytes(-len(data) % 8))
+        return offset, len(data)
+
+    def encodeColumn(self, path: tuple, values: list) -> dict:
+        kind, missing, decimals = columnType(values)
+        dtype: str = columnDtypes[kind]
+        column: dict = {"path": list(path), "type": kind, "missing": missing}
+        if kind == "float32":
+            column["decimals"] = decimals
+
+        if kind in ("string", "json"):
+            encode = self.stringIndex if kind == "string" else lambda value: self.stringIndex(json.dumps(value, ensure_ascii=False))
+            encoded: list = [-1 if value is absent or (value is None and missing == "null") else encode(value) for value in values]
+            array: np.ndarray = np.array(encoded, dtype=dtype)
+        else:
+            present: np.ndarray = np.array([value is not absent and value is not None for value in values], dtype=bool)
+            fill = values[int(np.argmax(present))]
+            filled: list = [value if keep else fill for value, keep in zip(values, present)]
+            if kind == "time":
+                timestamps: np.ndarray = np.array(filled, dtype="datetime64[s]").astype(np.int64)
+                column["base"] = int(timestamps[present].min())
+                array = (timestamps - column["base"]).astype(dtype)
+            elif kind == "date":
+                array = np.array(filled, dtype="datetime64[D]").astype(np.int64).astype(dtype)
+            else:
+                array = np.array(filled, dtype=dtype)
+
+            if not present.all():
+                array[~present] = np.nan if kind.startswith("float") else missingIntegers[dtype]
+
+        column["offset"], column["length"] = self.writeBlock(array.tobytes())
+        return column
+
+    def encodeSeries(self, part) -> dict:
+        if part is None:
+            return None
+        single: bool = isinstance(part, dict)
+        rows: list = [part] if single else part
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return {"json": part}
+
+        flattened: list = []
+        paths: dict = {}
+        for row in rows:
+            values: dict = {}
+            flattenRow(row, (), values)
+            flattened.append(values)
+            paths.update(dict.fromkeys(values))
+
+        columns: list = [
+            self.encodeColumn(path, [values.get(path, absent) for values in flattened])
+            for path in paths
+        ]
+        return {"rows": len(rows), "single": single, "columns": columns}
+
+    def add(self, name: str, report: dict) -> None:
+        cityIndex: dict = {key: self.encodeSeries(part) for key, part in report.items()}
+        self.cities[name] = self.writeBlock(json.dumps(cityIndex, ensure_ascii=False, separators=(",", ":")).encode())
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+
+        index: bytes = json.dumps(
+            {"version": snapshotVersion, "strings": self.strings, "cities": self.cities},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode()
+        indexOffset, indexLength = self.writeBlock(index)
+        flags: int = compressedFlag if self.compression == "zlib" else 0
+
+        self.file.seek(0)
+        self.file.write(struct.pack(headerFormat, snapshotMagic, snapshotVersion, flags, 0, indexOffset, indexLength))
+        self.file.close()
+        os.replace(self.temporaryPath, self.path)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, excType, *exc_info) -> None:
+        if excType is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.temporaryPath)
+
+
+def writeSnapshot(path: str, reports, compression: str = None, level: int = 6) -> None:
+    with SnapshotWriter(path, compression, level) as writer:
+        for name, report in (reports.items() if isinstance(reports, dict) else reports):
+            writer.add(name, report)
+
+
+class SnapshotSeries:
+    def __init__(self, reader: "SnapshotReader", meta: dict):
+        self.reader: SnapshotReader = reader
+        self.rows: int = meta["rows"]
+        self.single: bool = meta["single"]
+        self.columns: dict = {tuple(column["path"]): column for column in meta["columns"]}
+
+    @property
+    def paths(self) -> list:
+        return list(self.columns)
+
+    def column(self, *path) -> np.ndarray:
+        column: dict = self.columns[path]
+        dtype: str = columnDtypes[column["type"]]
+        if self.reader.compressed:
+            data: bytes = zlib.decompress(self.reader.mapping[column["offset"]:column["offset"] + column["length"]])
+            return np.frombuffer(data, dtype=dtype, count=self.rows)
+        return np.frombuffer(self.reader.mapping, dtype=dtype, count=self.rows, offset=column["offset"])
+
+    def values(self, *path) -> list:
+        column: dict = self.columns[path]
+        kind: str = column["type"]
+        stored: np.ndarray = self.column(*path)
+        marker = absent if column["missing"] == "absent" else None
+
+        if kind in ("string", "json"):
+            strings: list = self.reader.strings
+            decode = strings.__getitem__ if kind == "string" else lambda index: json.loads(strings[index])
+            return [marker if index < 0 else decode(index) for index in stored.tolist()]
+
+        if kind.startswith("float"):
+            missingMask: np.ndarray = np.isnan(stored) if column["missing"] else None
+            if kind == "float64":
+                decoded: list = stored.tolist()
+            elif column["decimals"] is None:
+                decoded = stored.astype(str).astype(np.float64).tolist()
+            else:
+                decoded = np.round(stored.astype(np.float64), column["decimals"]).tolist()
+        else:
+            missingMask = stored == missingIntegers[stored.dtype.str] if column["missing"] else None
+            if kind == "time":
+                decoded = utcFormatter.formatMany(stored.astype(np.int64) + column["base"]).tolist()
+            elif kind == "date":
+                decoded = np.datetime_as_string(stored.astype("datetime64[D]")).tolist()
+            else:
+                decoded = stored.tolist()
+
+        if missingMask is not None:
+            for index in np.flatnonzero(missingMask).tolist():
+                decoded[index] = marker
+        return decoded
+
+    def to_list(self):
+        columns: list = [(path, self.values(*path)) for path in self.columns]
+        if not columns:
+            rows: list = [{} for _ in range(self.rows)]
+        elif any(column["missing"] == "absent" for column in self.columns.values()):
+            rows = self.assembleRows(columns)
+        else:
+            tree: dict = {}
+            for path, values in columns:
+                target: dict = tree
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = values
+            rows = self.assembleColumns(tree)
+        return rows[0] if self.single else rows
+
+    @staticmethod
+    def assembleColumns(tree: dict) -> list:
+        # Every row has every key: build the dictionaries of each nesting level column-wise
+        keys: list = list(tree)
+        columns: list = [SnapshotSeries.assembleColumns(node) if isinstance(node, dict) else node for node in tree.values()]
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    def assembleRows(self, columns: list) -> list:
+        rows: list = []
+        for index in range(self.rows):
+            row: dict = {}
+            for path, values in columns:
+                value = values[index]
+                if value is absent:
+                    continue
+                target: dict = row
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = value
+            rows.append(row)
+        return rows
+
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.mapping: mmap.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, _, indexOffset, indexLength = struct.unpack_from(headerFormat, self.mapping, 0)
+        if magic != snapshotMagic:
+            self.close()
+            raise ValueError(f"{path} is not a weather report snapshot")
+        if version > snapshotVersion:
+            self.close()
+            raise ValueError(f"{path} is a version {version} snapshot; this reader supports up to version {snapshotVersion}")
+
+        self.version: int = version
+        self.compressed: bool = bool(flags & compressedFlag)
+        index: bytes = self.mapping[indexOffset:indexOffset + indexLength]
+        index = json.loads(zlib.decompress(index) if self.compressed else index)
+        self.strings: list = index["strings"]
+        self.cities: dict = index["cities"]
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.cities
+
+    def names(self) -> list:
+        return list(self.cities)
+
+    def cityIndex(self, name: str) -> dict:
+        offset, length = self.cities[name]
+        block: bytes = self.mapping[offset:offset + length]
+        return json.loads(zlib.decompress(block) if self.compressed else block)
+
+    def series(self, name: str, part: str) -> SnapshotSeries:
+        meta: dict = self.cityIndex(name).get(part)
+        if meta is None or "json" in meta:
+            return None
+        return SnapshotSeries(self, meta)
+
+    def report(self, name: str) -> dict:
+        report: dict = {}
+        for part, meta in self.cityIndex(name).items():
+            if meta is None:
+                report[part] = None
+            elif "json" in meta:
+                report[part] = meta["json"]
+            else:
+                report[part] = SnapshotSeries(self, meta).to_list()
+        return report
+
+    def reports(self):
+        for name in self.cities:
+            yield name, self.report(name)
+
+    def close(self) -> None:
+        try:
+            self.mapping.close()
+        except BufferError:
+            # Arrays from column() still use the mapping; it is unmapped when they are released
+            pass
+        self.file.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Streaming JSON Decoding
+#
+# `constructUrl` decodes the whole response before any processing starts, so a long `/data/2.5/air_pollution/history` range is held in memory twice (body and object tree) and nothing comes out until the last byte has arrived. `JsonListStream` decodes the "list" array of a response item by item while the body is still being received, so memory stays flat however large the response is.
+#
+# ##### `JsonListStream(chunks, key="list")`
+#
+# - `chunks` is any iterable of `bytes` (or `str`) pieces of a JSON object, e.g. `HttpTransport.stream(url, params)`.
+# - Iterating it yields the items of the `key` array one at a time. The other members of the object (`"coord"`, `"city"`, `"cnt"`, ...) are collected in `fields`; members that come after the array are only there once the iteration has finished.
+# - `close()` (or leaving a `with` block) stops reading and releases the connection, e.g. after the first 25 hours of the hourly forecast.
+# - Invalid or truncated JSON raises `json.JSONDecodeError` while iterating.
+#
+# ##### `streamConstructUrl(endpoint, baseUrl, extraParameters, transport)`
+#
+# - The streaming counterpart of `constructUrl`: same arguments, returns a `JsonListStream`, or `None` (after printing the error) when the request fails.
+# - Only `HttpTransport` streams the body. Other transports (the caching, single-flight, rate-limited and recording wrappers) have no `stream` method, so their decoded `get` response is wrapped instead.
+# - Connection errors while the body is being read are raised during iteration.
+#
+# The fetch classes use it in `AirPollutionHistory.streamAirPollutionHistory`, `HourlyWeatherForecast.streamHourlyForecast` and `FiveDaysThreeHoursWeatherForecast.streamForecastedData`, which feed the stream straight into their `iter...` processors.
+
+import codecs
+import json
+
+whitespace: str = " \t\n\r"
+numberCharacters: str = "0123456789.eE+-"
+
+
+class JsonListStream:
+    def __init__(self, chunks, key: str = "list"):
+        self.chunks = iter(chunks)
+        self.key: str = key
+        self.fields: dict = {}
+        self.buffer: str = ""
+        self.position: int = 0
+        self.exhausted: bool = False
+        self.decoder: json.JSONDecoder = json.JSONDecoder()
+        self.textDecoder = codecs.getincrementaldecoder("utf-8")()
+        self.items = self.iterItems()
+
+    @classmethod
+    def fromPayload(cls, payload: dict, key: str = "list") -> "JsonListStream":
+        if not payload:
+            return None
+
+        stream: JsonListStream = cls((), key)
+        stream.fields = {name: value for name, value in payload.items() if name != key}
+        stream.items = iter(payload.get(key, []))
+        return stream
+
+    def readMore(self) -> bool:
+        if self.exhausted:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            chunk = b""
+
+        text: str = chunk if isinstance(chunk, str) else self.textDecoder.decode(chunk, final=self.exhausted)
+        # Drop the part that has been decoded already, so the buffer never holds more than one chunk and one item
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in whitespace:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.readMore():
+                raise json.JSONDecodeError("Unexpected end of the response", self.buffer, self.position)
+
+    def expect(self, characters: str) -> str:
+        character: str = self.peek()
+        if character not in characters:
+            raise json.JSONDecodeError(f"Expected one of {characters!r}", self.buffer, self.position)
+        self.position += 1
+        return character
+
+    def decodeValue(self):
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number cut by the end of the buffer (e.g. "-0." of "-0.25") may continue in the next chunk
+                if self.exhausted or (end < len(self.buffer) and self.buffer[end] not in numberCharacters):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self.readMore()
+
+    def iterItems(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            name: str = self.decodeValue()
+            self.expect(":")
+            if name == self.key and self.peek() == "[":
+                self.position += 1
+                if self.peek() == "]":
+                    self.position += 1
+                else:
+                    while True:
+                        yield self.decodeValue()
+                        if self.expect(",]") == "]":
+                            break
+            else:
+                self.fields[name] = self.decodeValue()
+
+            if self.expect(",}") == "}":
+                return
+
+    def __iter__(self):
+        return self.items
+
+    def close(self) -> None:
+        if hasattr(self.items, "close"):
+            self.items.close()
+        if hasattr(self.chunks, "close"):
+            self.chunks.close()
+
+    def __enter__(self) -> "JsonListStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def streamConstructUrl(endpoint: str, baseUrl: str = "http://api.openweathermap.org", extraParameters: dict = None, transport=None) -> JsonListStream:
+    import requests
+    from weatherForcastingProject import apiKey
+    from weatherTransport import getDefaultTransport
+
+    parameters: dict = {"appId": apiKey, **(extraParameters or {})}
+    url: str = f"{baseUrl}/{endpoint}"
+
+    transport = transport or getDefaultTransport()
+    try:
+        if hasattr(transport, "stream"):
+            return JsonListStream(transport.stream(url, params=parameters))
+        return JsonListStream.fromPayload(transport.get(url, params=parameters))
+    except requests.exceptions.RequestException as e:
+        print(f"Error making API request: {e}")
+        return None
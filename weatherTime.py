@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for Timestamp Formatting
+#
+# Every processed result turns Unix timestamps into "YYYY-MM-DD HH:MM:SS" strings, and forecast and history timestamps are regular hourly or 3-hourly steps, so calling `strftime` for each of them redoes the same calendar arithmetic again and again. `TimestampFormatter` formats them from cached parts instead.
+#
+# - The "YYYY-MM-DD" date of each day is built once and kept in a bounded cache (cleared when it reaches `cacheSize` days); the " HH:" and "MM:SS" parts come from 24- and 3600-entry tables. Formatting a timestamp is two `divmod`s, three lookups and a concatenation.
+# - `offsetSeconds` shifts the output to local time, e.g. the `timezone` field of `/data/2.5/weather` or `city.timezone` of the forecasts (see `forResponse`). With `showOffset`, the offset is appended as "+03:30". The default formatter, `utcFormatter`, gives the same strings as `datetime.utcfromtimestamp(timestamp).strftime(...)`.
+#
+# ##### `format(timestamp)` / `date(timestamp)`
+#
+# - "YYYY-MM-DD HH:MM:SS" and "YYYY-MM-DD" respectively, plus the offset when `showOffset` is set.
+#
+# ##### `formatMany(timestamps)`
+#
+# - The batch mode: formats a sequence (or NumPy array) of timestamps and returns a NumPy array of fixed-width strings. Each distinct day is formatted once (through the same day cache), and the time of day is written as digit code points with vectorized arithmetic, so there is no per-timestamp Python call at all. NumPy is only imported by this method.
+#
+# ##### `TimestampFormatter.forResponse(payload, showOffset)`
+#
+# - A formatter for the local time of a response: it reads `timezone` (current weather) or `city.timezone` (forecasts) and falls back to UTC. Formatters are kept per offset, so successive responses of a location share one day cache; an offset of 0 gives `utcFormatter`.
+# - The forecast classes of `weatherForcastingProject.py` use it for their `process...` methods when created with `localTime=True`.
+
+import time
+
+secondsPerDay: int = 86400
+
+
+def offsetSuffix(offsetSeconds: int) -> str:
+    sign: str = "-" if offsetSeconds < 0 else "+"
+    hours, minutes = divmod(abs(offsetSeconds) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+class TimestampFormatter:
+    hoursOfDay: tuple = tuple(f" {hour:02d}:" for hour in range(24))
+    minutesSeconds: tuple = tuple(f"{minute:02d}:{second:02d}" for minute in range(60) for second in range(60))
+
+    def __init__(self, offsetSeconds: int = 0, showOffset: bool = False, cacheSize: int = 65536):
+        self.offsetSeconds: int = int(offsetSeconds)
+        self.suffix: str = offsetSuffix(self.offsetSeconds) if showOffset else ""
+        self.cacheSize: int = cacheSize
+        self.days: dict = {}
+
+    @classmethod
+    def forResponse(cls, payload: dict, showOffset: bool = False) -> "TimestampFormatter":
+        offsetSeconds = (payload or {}).get("timezone")
+        if offsetSeconds is None:
+            offsetSeconds = ((payload or {}).get("city") or {}).get("timezone", 0)
+        key: tuple = (int(offsetSeconds or 0), showOffset)
+        formatter: TimestampFormatter = responseFormatters.get(key)
+        if formatter is None:
+            formatter = responseFormatters[key] = cls(*key)
+        return formatter
+
+    def dayPrefix(self, day: int) -> str:
+        prefix: str = self.days.get(day)
+        if prefix is None:
+            if len(self.days) >= self.cacheSize:
+                self.days.clear()
+            prefix = time.strftime("%Y-%m-%d", time.gmtime(day * secondsPerDay))
+            self.days[day] = prefix
+        return prefix
+
+    def format(self, timestamp: int) -> str:
+        day, secondOfDay = divmod(int(timestamp) + self.offsetSeconds, secondsPerDay)
+        hour, secondOfHour = divmod(secondOfDay, 3600)
+        return (self.days.get(day) or self.dayPrefix(day)) + self.hoursOfDay[hour] + self.minutesSeconds[secondOfHour] + self.suffix
+
+    def date(self, timestamp: int) -> str:
+        return self.dayPrefix((int(timestamp) + self.offsetSeconds) // secondsPerDay) + self.suffix
+
+    def formatMany(self, timestamps):
+        import numpy as np
+
+        local: np.ndarray = np.asarray(timestamps, dtype=np.int64).ravel() + self.offsetSeconds
+        days, secondsOfDay = np.divmod(local, secondsPerDay)
+        firstDay: int = int(days.min()) if len(days) else 0
+        dayIndexes: np.ndarray = days - firstDay
+        dayCount: int = int(dayIndexes.max()) + 1 if len(days) else 0
+        if dayCount <= 2 * len(days):
+            # Forecasts and history cover a contiguous range of days: format the whole range
+            dayRange: list = range(firstDay, firstDay + dayCount)
+        else:
+            dayRange, dayIndexes = np.unique(days, return_inverse=True)
+        dates: np.ndarray = np.array([self.dayPrefix(int(day)) for day in dayRange], dtype="U10")
+
+        # Write the code points of each string into one row, then view the rows as fixed-width strings
+        width: int = 19 + len(self.suffix)
+        characters: np.ndarray = np.empty((len(local), width), dtype=np.uint32)
+        characters[:, :10] = dates.view(np.uint32).reshape(-1, 10)[dayIndexes.ravel()]
+        characters[:, 10] = ord(" ")
+        characters[:, 13] = characters[:, 16] = ord(":")
+        hours, secondsOfHour = np.divmod(secondsOfDay, 3600)
+        minutes, seconds = np.divmod(secondsOfHour, 60)
+        for column, values in ((11, hours), (14, minutes), (17, seconds)):
+            characters[:, column] = values // 10 + ord("0")
+            characters[:, column + 1] = values % 10 + ord("0")
+        if self.suffix:
+            characters[:, 19:] = [ord(character) for character in self.suffix]
+        return characters.view(f"U{width}").ravel()
+
+
+utcFormatter: TimestampFormatter = TimestampFormatter()
+# (offset, showOffset) -> the formatter forResponse gives for it
+responseFormatters: dict = {(0, False): utcFormatter}
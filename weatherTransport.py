@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Guide for the HTTP Transport
+#
+# The `HttpTransport` class is the shared transport behind `constructUrl`. It keeps one `requests.Session` with a keep-alive connection pool per host, so repeated calls to api.openweathermap.org and pro.openweathermap.org reuse their TCP connections instead of opening a new one per request.
+#
+# ##### `HttpTransport(...)`
+#
+# - `poolConnections` is the number of per-host pools kept alive and `poolMaxSize` the number of connections kept in each pool.
+# - `connectTimeout` and `readTimeout` are passed to every request, in seconds.
+# - `retries` and `backoffFactor` retry a request on 429 and 5xx responses with exponential backoff, honouring the `Retry-After` header.
+# - `baseUrlOverride` sends every request to another scheme and host (for example a local stub server) while keeping the path and parameters.
+#
+# ##### `get`
+#
+# - Sends a GET request and returns the decoded JSON body. It raises `requests.exceptions.RequestException` on failure, which `constructUrl` reports and turns into `None`.
+# - It is split into `request` (send and receive) and `decode` (parse the JSON body), which `weatherMetrics.py` times separately.
+#
+# ##### `stream`
+#
+# - Sends the same request but returns the body as an iterator of byte chunks while it is being received, for `JsonListStream` (see `weatherStreaming.py`). Errors in the status line are raised right away; the connection goes back to the pool once the iterator is exhausted or closed.
+#
+# ##### `getDefaultTransport` / `setDefaultTransport`
+#
+# - Every fetch class accepts a `transport` argument. When none is given, the process-wide default transport is used; it is created on first use so importing this module performs no I/O.
+
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpTransport:
+    retryStatusCodes: tuple = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        poolConnections: int = 4,
+        poolMaxSize: int = 10,
+        connectTimeout: float = 3.05,
+        readTimeout: float = 10.0,
+        retries: int = 3,
+        backoffFactor: float = 0.5,
+        baseUrlOverride: str = None
+    ):
+        self.poolConnections: int = poolConnections
+        self.poolMaxSize: int = poolMaxSize
+        self.timeout: tuple = (connectTimeout, readTimeout)
+        self.baseUrlOverride: str = baseUrlOverride
+
+        retry: Retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoffFactor,
+            status_forcelist=self.retryStatusCodes,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=True
+        )
+        adapter: HTTPAdapter = HTTPAdapter(
+            pool_connections=poolConnections,
+            pool_maxsize=poolMaxSize,
+            max_retries=retry,
+            pool_block=False
+        )
+
+        self.session: requests.Session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def resolveUrl(self, url: str) -> str:
+        if not self.baseUrlOverride:
+            return url
+
+        target = urlsplit(url)
+        override = urlsplit(self.baseUrlOverride)
+        return urlunsplit((override.scheme, override.netloc, target.path, target.query, target.fragment))
+
+    def request(self, url: str, params: dict = None, stream: bool = False) -> requests.Response:
+        return self.session.get(self.resolveUrl(url), params=params, timeout=self.timeout, stream=stream)
+
+    @staticmethod
+    def decode(response: requests.Response) -> dict:
+        return response.json()
+
+    def get(self, url: str, params: dict = None) -> dict:
+        response: requests.Response = self.request(url, params)
+        response.raise_for_status()
+        return self.decode(response)
+
+    def stream(self, url: str, params: dict = None, chunkSize: int = 65536):
+        response: requests.Response = self.request(url, params, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return self.iterBody(response, chunkSize)
+
+    @staticmethod
+    def iterBody(response: requests.Response, chunkSize: int):
+        with response:
+            yield from response.iter_content(chunk_size=chunkSize)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "HttpTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_defaultTransport: HttpTransport = None
+_defaultTransportLock: threading.Lock = threading.Lock()
+
+
+def getDefaultTransport() -> HttpTransport:
+    global _defaultTransport
+
+    if _defaultTransport is None:
+        with _defaultTransportLock:
+            if _defaultTransport is None:
+                _defaultTransport = HttpTransport()
+    return _defaultTransport
+
+
+def setDefaultTransport(transport: HttpTransport) -> None:
+    global _defaultTransport
+
+    with _defaultTransportLock:
+        _defaultTransport = transport